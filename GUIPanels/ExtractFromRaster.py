@@ -15,24 +15,139 @@ Copyright (C) 2025  Nikolaos Andreakos
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
 import sys
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QGroupBox, QPushButton, 
                              QSplitter, QWidget, QLabel, QLineEdit, QFileDialog, 
-                             QSlider, QHBoxLayout, QFrame,  QSizePolicy, QMessageBox)
+                             QSlider, QHBoxLayout, QFrame,  QSizePolicy, QMessageBox, QProgressBar,
+                             QFormLayout, QDoubleSpinBox, QComboBox)
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 
 import rasterio
-from GUIPanels.raster_extract import RasterLineApp
+from GUIPanels.raster_extract import RasterLineApp, canvas_shape, initial_limits, read_view
+from Processing.tile_cache import TileCache, basemap_image
+from Processing.tile_catalogue import TileCatalogue
+from Processing.batch_extract import read_lines
+from Processing.sampling import profile_table
+from Processing.xbeach_export import export_profiles
+
+
+class RasterLoader(QThread):
+    """
+    Load a raster, or a directory of tiles, in stages off the GUI thread: open, read the
+    initial view, fetch the basemap.
+    The dataset and the view are handed over with view_ready, the canvas can show them while
+    the basemap is still downloading. Rendering happens on the GUI thread.
+    """
+    progress = pyqtSignal(int, str)
+    view_ready = pyqtSignal(object, object)
+    basemap_ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, canvas_size, tile_cache):
+        super().__init__()
+        self.file_path = file_path
+        self.canvas_size = canvas_size
+        self.tile_cache = tile_cache
+
+    def run(self):
+        src = None
+        try:
+            if os.path.isdir(self.file_path):
+                self.progress.emit(0, 'Indexing tiles')
+                src = TileCatalogue.scan(self.file_path)
+            else:
+                self.progress.emit(0, 'Opening raster')
+                src = rasterio.open(self.file_path, mode='r')
+            if self.isInterruptionRequested():
+                src.close()
+                return
+
+            self.progress.emit(25, 'Reading overview')
+            bounds = src.bounds
+            xlim, ylim = initial_limits([bounds.left, bounds.right, bounds.bottom, bounds.top])
+            crs = src.crs
+            view = read_view(src, xlim, ylim, self.canvas_size)
+            if self.isInterruptionRequested():
+                src.close()
+                return
+            # From here on the dataset belongs to the GUI thread
+            self.view_ready.emit(src, view)
+            src = None
+
+            self.progress.emit(50, 'Fetching basemap')
+            basemap = basemap_image(self.tile_cache, (xlim[0], ylim[0], xlim[1], ylim[1]), crs,
+                                    cancelled=self.isInterruptionRequested)
+            if basemap is not None and not self.isInterruptionRequested():
+                self.basemap_ready.emit(basemap)
+        except Exception as e:
+            if src is not None:
+                src.close()
+            self.failed.emit(str(e))
+
+
+class ExportWorker(QThread):
+    """
+    Export extraction lines as XBeach-G profiles off the GUI thread.
+    The worker reads through its own handle of the raster, so unloading the raster in the
+    panel does not affect it. Cancel stops it after the chunk of lines in progress.
+    """
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, src, lines, out_dir, point_interval_max, method):
+        super().__init__()
+        self.src = src
+        self.lines = lines
+        self.out_dir = out_dir
+        self.point_interval_max = point_interval_max
+        self.method = method
+
+    def _open_source(self):
+        if isinstance(self.src, TileCatalogue):
+            return TileCatalogue(self.src.directory, self.src.tiles, self.src.crs, max_open=self.src.max_open)
+        return rasterio.open(self.src.name, mode='r')
+
+    def run(self):
+        try:
+            src = self._open_source()
+            try:
+                writer = export_profiles(src, self.lines, self.out_dir, self.point_interval_max, method=self.method,
+                                         progress=self.on_progress)
+            finally:
+                src.close()
+            self.done.emit(writer)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def on_progress(self, done):
+        self.progress.emit(done, len(self.lines))
+        return self.isInterruptionRequested()
 
 
 class ExtractRaster(QWidget):
+    # Chainage/Elevation DataFrame and a description of where it comes from
+    profile_ready = pyqtSignal(object, str)
+
     def __init__(self):
         super().__init__()
         self.file_path = None
         self.raster = None
+        # Lines of an opened project, drawn once its raster is loaded
+        self._pending_state = None
+        # (label, xy) of the line of the last profile sent to the Profile panel
+        self.profile_line = None
+        # Shared by every raster loaded in this panel, so the cache index is built once
+        self.tile_cache = TileCache.from_config()
+        self.loader = None
+        self.exporter = None
+        # Cancelled loaders kept until their thread ends
+        self._stopped_loaders = set()
+        self.raster_app = None
 
         main_layout = QVBoxLayout(self)
 
@@ -47,11 +162,30 @@ class ExtractRaster(QWidget):
         self.textbox = QLineEdit()
         top_button = QPushButton("Browse")
         top_button.clicked.connect(self.load_raster)
+        folder_button = QPushButton("Tile folder")
+        folder_button.setToolTip("Use every GeoTIFF in a folder as one raster")
+        folder_button.clicked.connect(self.load_tile_folder)
+        # Controls that replace or unload the raster, disabled during an export
+        self.raster_controls = [top_button, folder_button]
         top_layout.addWidget(label)
         top_layout.addWidget(self.textbox)
         top_layout.addWidget(top_button)
+        top_layout.addWidget(folder_button)
         main_layout.addLayout(top_layout)
 
+        # Loading progress
+        progress_layout = QHBoxLayout()
+        self.progress_lbl = QLabel("")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        progress_layout.addWidget(self.progress_lbl)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        main_layout.addLayout(progress_layout)
+        self.set_loading(False)
+
         # Split interface
         splitter = QSplitter()
         main_layout.addWidget(splitter)
@@ -89,11 +223,58 @@ class ExtractRaster(QWidget):
         button2 = QPushButton("Unload raster")
         btn_layout.addWidget(button2)
         button2.clicked.connect(self.close_raster)
+        self.raster_controls += [button1, button2]
         controls_layout.addLayout(btn_layout)
 
+        line_layout = QHBoxLayout()
+        self.draw_polyline_btn = QPushButton("Draw polyline")
+        self.draw_polyline_btn.setCheckable(True)
+        self.draw_polyline_btn.toggled.connect(self.on_draw_polyline)
+        line_layout.addWidget(self.draw_polyline_btn)
+        send_button = QPushButton("Send to Profile")
+        send_button.setToolTip("Use the selected line, or the first one, as the model profile")
+        send_button.clicked.connect(self.send_to_profile)
+        line_layout.addWidget(send_button)
+        export_button = QPushButton("Export XBeach-G")
+        export_button.setToolTip("Write every line and transect as x.grd/bed.dep in its own folder")
+        export_button.clicked.connect(self.export_xbeach)
+        line_layout.addWidget(export_button)
+        self.raster_controls.append(export_button)
+        controls_layout.addLayout(line_layout)
+
         # Add controls frame to the left layout before the Usage label
         left_layout.addWidget(controls_frame)
 
+        # Shore-normal transects
+        transect_box = QGroupBox("Transects from shoreline")
+        transect_layout = QVBoxLayout(transect_box)
+        form = QFormLayout()
+        self.spacing_spin = self._spin_box(50, 1, 10000)
+        self.offshore_spin = self._spin_box(200, 0, 100000)
+        self.onshore_spin = self._spin_box(50, 0, 100000)
+        self.smoothing_spin = self._spin_box(0, 0, 100000)
+        self.sea_side_combo = QComboBox()
+        self.sea_side_combo.addItems(['left', 'right'])
+        form.addRow("Alongshore spacing", self.spacing_spin)
+        form.addRow("Offshore length", self.offshore_spin)
+        form.addRow("Onshore length", self.onshore_spin)
+        form.addRow("Smoothing window", self.smoothing_spin)
+        form.addRow("Sea side", self.sea_side_combo)
+        transect_layout.addLayout(form)
+        shoreline_layout = QHBoxLayout()
+        self.draw_shoreline_btn = QPushButton("Draw shoreline")
+        self.draw_shoreline_btn.setCheckable(True)
+        self.draw_shoreline_btn.toggled.connect(self.on_draw_shoreline)
+        load_shoreline_btn = QPushButton("Load shoreline")
+        load_shoreline_btn.clicked.connect(self.load_shoreline)
+        generate_btn = QPushButton("Generate")
+        generate_btn.clicked.connect(self.generate_transects)
+        shoreline_layout.addWidget(self.draw_shoreline_btn)
+        shoreline_layout.addWidget(load_shoreline_btn)
+        shoreline_layout.addWidget(generate_btn)
+        transect_layout.addLayout(shoreline_layout)
+        left_layout.addWidget(transect_box)
+
         # Help
         
         group_box = QGroupBox("Usage")
@@ -107,7 +288,8 @@ class ExtractRaster(QWidget):
 • To create the line Single click on the next point\n
 • To select a line single click on top of it\n
 • To delete a selected line press DELETE\n
-• To extract the lines npress SHIFT+ENTER\n""")
+• To extract the lines npress SHIFT+ENTER\n
+• For many transects, draw or load a shoreline and press Generate\n""")
         # label2 = QLabel("")
         # label3 = QLabel("")
         
@@ -157,6 +339,14 @@ class ExtractRaster(QWidget):
         return None
     
     def close_raster(self):
+        self.cancel_loading()
+        self.draw_shoreline_btn.setChecked(False)
+        self.draw_polyline_btn.setChecked(False)
+        if self.raster_app:
+            self.raster_app.disconnect()
+            self.raster_app = None
+            self.ax.clear()
+            self.canvas.draw_idle()
         if self.raster:
             self.raster.close()
             self.raster = None
@@ -165,12 +355,236 @@ class ExtractRaster(QWidget):
 
     def load_raster(self):
         self.file_path, _ = QFileDialog.getOpenFileName(self, "Open raster", "", "GeoTIFF (*.tif *.tiff)")
+        self._pending_state = None
+        self.start_loading()
+
+    def load_tile_folder(self):
+        self.file_path = QFileDialog.getExistingDirectory(self, "Open tile folder", "")
+        self._pending_state = None
+        self.start_loading()
+
+    def start_loading(self):
         if self.file_path:
             self.textbox.setText(self.file_path)
-            self.open_raster()
-            self.raster_app = RasterLineApp(raster_src=self.raster, fig=self.fig, ax=self.ax, point_interval=self.slider.value())
-            self.canvas.draw()
+            self.close_raster()
+            self.loader = RasterLoader(self.file_path, canvas_shape(self.ax), self.tile_cache)
+            self.loader.progress.connect(self.on_load_progress)
+            self.loader.view_ready.connect(self.on_view_ready)
+            self.loader.basemap_ready.connect(self.on_basemap_ready)
+            self.loader.failed.connect(self.on_load_failed)
+            self.loader.finished.connect(self.on_load_finished)
+            self.set_loading(True)
+            self.loader.start()
+
+    def cancel_loading(self):
+        if self.exporter is not None:
+            self.exporter.requestInterruption()
+        if self.loader is not None:
+            # The loader stops after the tile or read in progress, without blocking the GUI.
+            # Its results are dropped, a dataset it still hands over is closed by on_view_ready
+            loader = self.loader
+            loader.requestInterruption()
+            for signal in (loader.progress, loader.basemap_ready, loader.failed):
+                signal.disconnect()
+            self._stopped_loaders.add(loader)
+            loader.finished.connect(lambda: self._release_loader(loader))
+            if loader.isFinished():
+                # Ended before the connection, its finished signal is already gone
+                self._release_loader(loader)
+            self.loader = None
+            self.set_loading(False)
+
+    def _release_loader(self, loader):
+        loader.wait()
+        self._stopped_loaders.discard(loader)
+
+    def set_loading(self, loading):
+        self.progress_bar.setVisible(loading)
+        self.cancel_button.setVisible(loading)
+        if loading:
+            self.progress_bar.setValue(0)
+        else:
+            self.progress_lbl.setText("")
+
+    def on_load_progress(self, value, stage):
+        if self.sender() is self.loader:
+            self.progress_bar.setValue(value)
+            self.progress_lbl.setText(stage)
+
+    def on_view_ready(self, src, view):
+        if self.sender() is not self.loader:
+            src.close()  # Loading was cancelled after the dataset was handed over
+            return
+        self.progress_lbl.setText('Rendering')
+        self.raster = src
+        self.raster_app = RasterLineApp(raster_src=self.raster, fig=self.fig, ax=self.ax, point_interval=self.slider.value(),
+                                        tile_cache=self.tile_cache, view=view, basemap=False)
+        if self._pending_state is not None:
+            self.raster_app.set_state(self._pending_state)
+            self._pending_state = None
+        self.canvas.draw_idle()
+
+    def on_basemap_ready(self, basemap):
+        if self.sender() is self.loader and self.raster_app:
+            self.raster_app.show_basemap(*basemap)
+            self.canvas.draw_idle()
+
+    def on_load_failed(self, message):
+        if self.sender() is self.loader:
+            QMessageBox.critical(self, "Error", f"Could not load the raster.\n{message}")
+
+    def on_load_finished(self):
+        if self.sender() is self.loader:
+            self.loader = None
+            self.set_loading(False)
     
+    def _spin_box(self, value, minimum, maximum):
+        spin = QDoubleSpinBox()
+        spin.setRange(minimum, maximum)
+        spin.setValue(value)
+        spin.setSuffix(' m')
+        return spin
+
+    def on_draw_shoreline(self, checked):
+        if not self.raster_app:
+            self.draw_shoreline_btn.setChecked(False)
+            return
+        if checked:
+            self.draw_polyline_btn.setChecked(False)
+            self.draw_shoreline_btn.setText("Finish shoreline")
+            self.raster_app.start_shoreline()
+        else:
+            self.draw_shoreline_btn.setText("Draw shoreline")
+            self.raster_app.finish_shoreline()
+
+    def on_draw_polyline(self, checked):
+        if not self.raster_app:
+            self.draw_polyline_btn.setChecked(False)
+            return
+        if checked:
+            self.draw_shoreline_btn.setChecked(False)
+            self.draw_polyline_btn.setText("Finish polyline")
+            self.raster_app.start_polyline()
+        else:
+            self.draw_polyline_btn.setText("Draw polyline")
+            self.raster_app.finish_polyline()
+
+    def send_to_profile(self):
+        if not self.raster_app:
+            return
+        label = self.raster_app.selected_label()
+        if label is None:
+            if not self.raster_app.lines and self.raster_app.transects is None:
+                QMessageBox.critical(self, "Error", "No extraction lines are created.")
+                return
+            label = (self.raster_app.lines[0][1].get_text() if self.raster_app.lines
+                     else self.raster_app.transects['labels'][0])
+        profiles = self.raster_app.profiles
+        if profiles is None or label not in profiles['label']:
+            self.raster_app.extract_gdf()
+            profiles = self.raster_app.profiles
+        df = profile_table(profiles, label)
+        if df.empty:
+            QMessageBox.critical(self, "Error", f"Line {label} has no raster data.")
+            return
+        self.profile_line = next((line for line in self.raster_app.extraction_lines(verbose=False)
+                                  if line[0] == label), None)
+        self.profile_ready.emit(df, f'{self.file_path} [{label}]')
+
+    def export_xbeach(self):
+        if not self.raster_app:
+            return
+        if not self.raster_app.lines and self.raster_app.transects is None:
+            QMessageBox.critical(self, "Error", "No extraction lines are created.")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Export XBeach-G profiles")
+        if not out_dir:
+            return
+        lines = self.raster_app.extraction_lines(verbose=False)
+        self.exporter = ExportWorker(self.raster_app.src, lines, out_dir, self.raster_app.point_interval_max,
+                                     self.raster_app.interpolation)
+        self.exporter.progress.connect(self.on_export_progress)
+        self.exporter.done.connect(self.on_export_done)
+        self.exporter.failed.connect(self.on_export_failed)
+        self.exporter.finished.connect(self.on_export_finished)
+        for control in self.raster_controls:
+            control.setEnabled(False)
+        self.set_loading(True)
+        self.exporter.start()
+
+    def on_export_progress(self, done, total):
+        self.progress_bar.setValue(int(100 * done / max(total, 1)))
+        self.progress_lbl.setText(f"Exporting {done}/{total}")
+
+    def on_export_done(self, writer):
+        if writer.skipped:
+            QMessageBox.warning(self, "Export", f"{writer.written} profiles written, {len(writer.skipped)} "
+                                f"without raster data skipped: {', '.join(map(str, writer.skipped[:10]))}")
+
+    def on_export_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Could not export the profiles.\n{message}")
+
+    def on_export_finished(self):
+        self.exporter = None
+        for control in self.raster_controls:
+            control.setEnabled(True)
+        self.set_loading(self.loader is not None)
+
+    def project_data(self):
+        """ Raster reference and extraction lines as a project part (arrays, meta) """
+        meta = {'raster': self.file_path if (self.raster_app or self._pending_state is not None) else None,
+                'point_interval': self.slider.value()}
+        if self._pending_state is not None:
+            return self._pending_state, meta
+        return (self.raster_app.get_state() if self.raster_app else {}), meta
+
+    def set_project_data(self, arrays=None, meta=None):
+        """ Reload the raster of a project part and draw its lines once it is shown """
+        self.close_raster()
+        self._pending_state = None
+        self.file_path = None
+        self.textbox.setText("")
+        if meta is None:
+            return
+        self.slider.setValue(int(meta.get('point_interval', self.slider.value())))
+        if meta.get('raster'):
+            if not os.path.exists(meta['raster']):
+                QMessageBox.warning(self, "Project", f"The raster of the project was not found:\n{meta['raster']}")
+                return
+            self._pending_state = arrays
+            self.file_path = meta['raster']
+            self.start_loading()
+
+    def load_shoreline(self):
+        if not self.raster_app:
+            return
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open shoreline", "", "Lines (*.csv *.gpkg *.shp *.geojson)")
+        if file_path:
+            try:
+                lines = read_lines(file_path)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Could not read the shoreline.\n{e}")
+                return
+            if not lines:
+                QMessageBox.critical(self, "Error", "The file has no lines.")
+                return
+            self.raster_app.set_shoreline(lines[0][1])
+
+    def generate_transects(self):
+        if not self.raster_app:
+            return
+        if self.draw_shoreline_btn.isChecked():
+            self.draw_shoreline_btn.setChecked(False)
+        try:
+            n = self.raster_app.generate_transects(self.spacing_spin.value(), self.offshore_spin.value(),
+                                                   self.onshore_spin.value(), self.smoothing_spin.value(),
+                                                   self.sea_side_combo.currentText())
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        if n == 0:
+            QMessageBox.critical(self, "Error", "Draw or load a shoreline first.")
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Delete:
             self.on_delete_pressed()
@@ -179,7 +593,7 @@ class ExtractRaster(QWidget):
 
     def on_shift_enter_pressed(self):
         # Call your RasterLineApp's extraction logic, e.g.:
-        if hasattr(self, 'raster_app') and self.raster_app:
+        if self.raster_app:
             success = self.raster_app.extract_gdf()
             if isinstance(success, int) :
                 if int(success) == 0:
@@ -187,7 +601,7 @@ class ExtractRaster(QWidget):
 
     def on_delete_pressed(self):
         # Call your RasterLineApp's delete logic, e.g.:
-        if hasattr(self, 'raster_app') and self.raster_app:
+        if self.raster_app:
             self.raster_app.delete_selected()  # You need to implement this in RasterLineApp
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import time
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QPushButton, QWidget, QLabel, QFileDialog, QHBoxLayout,
+                             QSizePolicy, QMessageBox, QFormLayout, QDoubleSpinBox, QComboBox)
+from pyqtgraph import PlotWidget, mkPen
+
+from Processing.grid import CRITERIA, ORIENTATIONS, grid_from_settings, write_grid
+
+# Spin box settings: (label, minimum, maximum, decimals, default)
+SETTINGS = {
+    'dx_min': ('Min cell size (m)', 0.001, 1000, 3, 0.05),
+    'dx_max': ('Max cell size (m)', 0.001, 1000, 3, 1.0),
+    'water_level': ('Water level (m)', -1000, 1000, 2, 0.0),
+    'max_ratio': ('Max growth ratio', 1.0, 2.0, 3, 1.05),
+}
+
+
+class GridPanel(QWidget):
+    """
+    Cross-shore grid of the profile of the Profile panel. The grid is rebuilt whenever
+    the profile or a setting changes, and written as x.grd / bed.dep.
+    """
+    # Emitted after every build, with or without a grid
+    grid_built = pyqtSignal()
+
+    def __init__(self, name, profile_panel):
+        super().__init__()
+        self.page_name = name
+        self.profile_panel = profile_panel
+        self.grid = None
+        # Chainage of the grid nodes on the profile, to sample other data along the transect
+        self.grid_chainage = None
+        # Rebuild once a burst of changes is over
+        self._build_timer = QTimer(self)
+        self._build_timer.setSingleShot(True)
+        self._build_timer.setInterval(50)
+        self._build_timer.timeout.connect(self.build)
+        model = self.profile_panel.model
+        for signal in (model.dataChanged, model.rowsInserted, model.rowsRemoved, model.modelReset,
+                       model.layoutChanged):
+            signal.connect(self.request_build)
+
+        main_layout = QVBoxLayout(self)
+        page_lbl = QLabel(self.page_name)
+        page_lbl.setStyleSheet("QLabel{font-size: 16pt;}")
+        page_lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        main_layout.addWidget(page_lbl)
+
+        content_layout = QHBoxLayout()
+        main_layout.addLayout(content_layout)
+
+        # Settings
+        form = QFormLayout()
+        self.criterion_combo = QComboBox()
+        self.criterion_combo.addItems(list(CRITERIA))
+        self.criterion_combo.setCurrentText('Wavelength')
+        form.addRow("Cell size from:", self.criterion_combo)
+        self.spins = {}
+        for key, (label, low, high, decimals, default) in SETTINGS.items():
+            self.spins[key] = self._spin(low, high, decimals, default)
+            form.addRow(label + ":", self.spins[key])
+        self.param_labels = []
+        self.param_spins = []
+        for _ in range(2):
+            self.param_labels.append(QLabel())
+            self.param_spins.append(self._spin(0.001, 1e4, 3, 1.0))
+            form.addRow(self.param_labels[-1], self.param_spins[-1])
+        self.orientation_combo = QComboBox()
+        self.orientation_combo.addItems(list(ORIENTATIONS))
+        self.orientation_combo.currentTextChanged.connect(self.request_build)
+        form.addRow("Orientation:", self.orientation_combo)
+        self.criterion_combo.currentTextChanged.connect(self.on_criterion_changed)
+        self.on_criterion_changed(self.criterion_combo.currentText())
+        self.export_button = QPushButton("Export grid")
+        self.export_button.clicked.connect(self.export_grid)
+        form.addRow(self.export_button)
+        self.stats_lbl = QLabel("No profile loaded")
+        self.stats_lbl.setWordWrap(True)
+        form.addRow(self.stats_lbl)
+        settings_widget = QWidget()
+        settings_widget.setLayout(form)
+        settings_widget.setMaximumWidth(320)
+        content_layout.addWidget(settings_widget)
+
+        # Bed levels on the grid, and the cell sizes along it
+        plots_layout = QVBoxLayout()
+        self.bed_plot = PlotWidget()
+        self.size_plot = PlotWidget()
+        self.size_plot.setXLink(self.bed_plot)
+        for plot, label in ((self.bed_plot, 'Bed level (m)'), (self.size_plot, 'Cell size (m)')):
+            plot.getPlotItem().showGrid(x=True, y=True)
+            plot.getViewBox().setBackgroundColor((255, 255, 255))
+            plot.setLabel('left', label)
+            plots_layout.addWidget(plot)
+        self.size_plot.setLabel('bottom', 'Cross-shore distance (m)')
+        self.bed_curve = self.bed_plot.plot([], [], pen=mkPen(color='b', width=1))
+        self.water_line = self.bed_plot.plot([], [], pen=mkPen(color='c', width=1))
+        self.size_curve = self.size_plot.plot([], [], pen=mkPen(color='r', width=1))
+        for curve in (self.bed_curve, self.size_curve):
+            curve.setDownsampling(auto=True, method='peak')
+            curve.setClipToView(True)
+        content_layout.addLayout(plots_layout, 1)
+
+        self.setLayout(main_layout)
+
+    def _spin(self, low, high, decimals, value):
+        spin = QDoubleSpinBox()
+        spin.setRange(low, high)
+        spin.setDecimals(decimals)
+        spin.setValue(value)
+        spin.valueChanged.connect(self.request_build)
+        return spin
+
+    def on_criterion_changed(self, criterion):
+        labels, defaults = CRITERIA[criterion]
+        for i, (label, spin) in enumerate(zip(self.param_labels, self.param_spins)):
+            visible = i < len(labels)
+            label.setVisible(visible)
+            spin.setVisible(visible)
+            if visible:
+                label.setText(labels[i] + ":")
+                spin.blockSignals(True)
+                spin.setValue(defaults[i])
+                spin.blockSignals(False)
+        self.request_build()
+
+    def request_build(self, *args):
+        if not self._build_timer.isActive():
+            self._build_timer.start()
+
+    def settings(self):
+        values = {key: spin.value() for key, spin in self.spins.items()}
+        values['criterion'] = self.criterion_combo.currentText()
+        values['a'], values['b'] = (spin.value() for spin in self.param_spins)
+        values['orientation'] = self.orientation_combo.currentText()
+        return values
+
+    def set_settings(self, values):
+        for widget in [self.criterion_combo, self.orientation_combo, *self.spins.values(), *self.param_spins]:
+            widget.blockSignals(True)
+        self.criterion_combo.setCurrentText(values.get('criterion', 'Wavelength'))
+        self.on_criterion_changed(self.criterion_combo.currentText())
+        for key, spin in self.spins.items():
+            spin.setValue(values.get(key, SETTINGS[key][4]))
+        for key, spin in zip(('a', 'b'), self.param_spins):
+            if key in values:
+                spin.setValue(values[key])
+        self.orientation_combo.setCurrentText(values.get('orientation', 'Auto'))
+        for widget in [self.criterion_combo, self.orientation_combo, *self.spins.values(), *self.param_spins]:
+            widget.blockSignals(False)
+        self.request_build()
+
+    def build(self):
+        """ Build the grid of the current profile and plot it """
+        self._build_grid()
+        self.grid_built.emit()
+
+    def _build_grid(self):
+        self.grid = None
+        self.grid_chainage = None
+        model = self.profile_panel.model
+        if model.columnCount() < 2 or model.rowCount() < 2:
+            for curve in (self.bed_curve, self.water_line, self.size_curve):
+                curve.setData([], [])
+            self.stats_lbl.setText("No profile loaded")
+            return
+        s = self.settings()
+        start = time.perf_counter()
+        try:
+            x, z, dx, chainage = grid_from_settings(model.column(0), model.column(1), s)
+        except (ValueError, TypeError) as e:
+            self.stats_lbl.setText(f"No grid: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        self.grid = (x, z)
+        self.grid_chainage = chainage
+        self.bed_curve.setData(x, z)
+        self.water_line.setData([x[0], x[-1]], [s['water_level']] * 2)
+        self.size_curve.setData((x[1:] + x[:-1]) / 2, dx)
+        self.stats_lbl.setText(f"{len(dx)} cells over {x[-1]:.1f} m, cell size {dx.min():.3f} - {dx.max():.3f} m, "
+                               f"built in {elapsed * 1000:.0f} ms")
+
+    def export_grid(self):
+        if self._build_timer.isActive():
+            self._build_timer.stop()
+            self.build()
+        if self.grid is None:
+            QMessageBox.critical(self, "Error", "No grid is built.")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Export XBeach-G grid")
+        if out_dir:
+            write_grid(out_dir, *self.grid)
+            print(f'Grid of {len(self.grid[0]) - 1} cells written to {out_dir}')
+
+    def project_data(self):
+        """ The settings as a project part, the grid is rebuilt from the profile """
+        return {}, self.settings()
+
+    def set_project_data(self, arrays=None, meta=None):
+        self.set_settings(meta or {})
+
+
+if __name__ == "__main__":
+    from GUIPanels.InitialConditionsGUI import ICPanel
+    app = QApplication(sys.argv)
+    window = GridPanel('Test Page', ICPanel('Profile'))
+    window.show()
+    sys.exit(app.exec_())
@@ -16,60 +16,133 @@ Copyright (C) 2025  Nikolaos Andreakos
 """
 
 
+import os
 import sys
 from PyQt5 import QtCore
-from PyQt5.QtCore import Qt, QAbstractTableModel
-from PyQt5.QtWidgets import QApplication, QVBoxLayout, QPushButton, QSplitter, QWidget, QLabel, QLineEdit, QFileDialog, QTableView, QHBoxLayout, QSizePolicy
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QApplication, QVBoxLayout, QPushButton, QSplitter, QWidget, QLabel, QLineEdit, QFileDialog, QTableView, QHBoxLayout, QSizePolicy, QProgressBar, QMessageBox, QUndoStack, QAction, QDoubleSpinBox, QComboBox
+import numpy as np
 import pandas as pd
-from pyqtgraph import PlotWidget, mkPen
-
-class PandasModel(QAbstractTableModel):
-    """ Model for displaying pandas DataFrame in QTableView """
-    def __init__(self, data=pd.DataFrame()):
+from pyqtgraph import PlotWidget, ScatterPlotItem, mkPen
+
+from Processing.lod import SeriesPyramid
+from Processing.point_index import PointIndex
+from Processing.project import arrays_table, table_arrays
+from Processing.transforms import TRANSFORMS
+from TableModels.Commands import InsertRowsCommand, PermuteRowsCommand, RemoveRowsCommand, SetValuesCommand
+from TableModels.Models import PandasModel
+
+# Rows parsed per chunk by CsvLoader
+CSV_CHUNK_ROWS = 200_000
+# Rows read first by CsvLoader to tell numeric columns from text ones
+CSV_SAMPLE_ROWS = 1000
+
+
+def is_time_column(values):
+    """ True when the first rows of a text column hold timestamps """
+    sample = pd.Series(np.asarray(values)[:CSV_SAMPLE_ROWS], dtype=object)
+    return bool(pd.to_datetime(sample, errors='coerce').notna().any())
+
+
+def numeric_column(values, times=None):
+    """
+    A column as floats for the plot. Text is read as timestamps, in seconds since 1970, when
+    times (by default when the first rows hold timestamps), as numbers otherwise, NaN where
+    it is neither. Every value is converted on its own, so rows can be converted in parts.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iufb':
+        return values.astype(float, copy=False)
+    if times is None:
+        times = is_time_column(values)
+    series = pd.Series(values, dtype=object)
+    if times:
+        stamps = pd.to_datetime(series, errors='coerce', utc=True)
+        return (stamps - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy(dtype=float)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+
+
+class CsvLoader(QThread):
+    """
+    Read a CSV file off the GUI thread, in chunks of CSV_CHUNK_ROWS rows.
+    Columns numeric in the first rows are parsed straight to dtype by the C parser, others
+    (e.g. timestamps) are kept as text. The column names come first with header, then
+    every parsed chunk with chunk, so the table fills while the file is read. Progress is
+    the share of the file read. A column with text after numeric first rows makes the
+    loader start over with one read of the whole file, types inferred by pandas.
+    """
+    header = pyqtSignal(object)
+    chunk = pyqtSignal(object)
+    progress = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, dtype='float64'):
         super().__init__()
-        self.df = data
-
-    def rowCount(self, parent=None):
-        return self.df.shape[0]
-
-    def columnCount(self, parent=None):
-        return self.df.shape[1]
-
-    def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole:
-            return str(self.df.iloc[index.row(), index.column()])
-        return None
-
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole:
-            return self.df.columns[section] if orientation == Qt.Horizontal else str(section)
-        return None
-
-    def setData(self, index, value, role=Qt.EditRole):
-        if role == Qt.EditRole:
+        self.file_path = file_path
+        self.dtype = dtype
+
+    def run(self):
+        try:
+            sample = pd.read_csv(self.file_path, nrows=CSV_SAMPLE_ROWS, skipinitialspace=True)
+            dtypes = {c: self.dtype if sample[c].dtype.kind in 'iufb' else object for c in sample.columns}
+            self.header.emit(pd.DataFrame({c: np.empty(0, dtype=t) for c, t in dtypes.items()}))
+            size = max(os.path.getsize(self.file_path), 1)
             try:
-                # Convert value to float if necessary
-                if self.df.iloc[index.row(), index.column()].dtype == 'float64':
-                    value = float(value)
-                elif self.df.iloc[index.row(), index.column()].dtype == 'int64':
-                    value = int(value)
-
-                self.df.iloc[index.row(), index.column()] = value
-                self.dataChanged.emit(index, index)
-                return True
+                with open(self.file_path, 'rb') as f:
+                    reader = pd.read_csv(f, engine='c', dtype=dtypes, chunksize=CSV_CHUNK_ROWS,
+                                         skipinitialspace=True)
+                    for chunk in reader:
+                        if self.isInterruptionRequested():
+                            return
+                        self.chunk.emit(chunk)
+                        self.progress.emit(int(100 * f.tell() / size))
             except ValueError:
-                return False  # Prevent setting an invalid dtype
-        return False
-
-    def flags(self, index):
-        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+                if self.isInterruptionRequested():
+                    return
+                df = pd.read_csv(self.file_path, skipinitialspace=True)
+                self.header.emit(df.iloc[:0])
+                self.chunk.emit(df)
+                self.progress.emit(100)
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class ICPanel(QWidget):
-    def __init__(self, name):
+    def __init__(self, name, dtype='float64', lod=False):
         super().__init__()
         self.page_name = name
-        self.df = pd.DataFrame()
+        self.dtype = dtype
+        # Time series panels plot through a min/max pyramid and show window statistics
+        self.lod = lod
+        self._pyramid = None
+        self.loader = None
+        # Cancelled loaders kept until their thread ends
+        self._stopped_loaders = set()
+        # Values are stored as read and rounded to 2 decimals in the table only
+        self.model = PandasModel(pd.DataFrame(), decimals=2)
+        # Undo history of the table, cleared when new data is loaded
+        self.undo_stack = QUndoStack(self)
+        self.model.undo_stack = self.undo_stack
+        # Any change of the table schedules one redraw of the plot
+        self.model.dataChanged.connect(self.request_plot)
+        self.model.rowsInserted.connect(self.request_plot)
+        self.model.rowsRemoved.connect(self.request_plot)
+        self.model.modelReset.connect(self.request_plot)
+        self.model.layoutChanged.connect(self.request_plot)
+        self._plot_timer = QTimer(self)
+        self._plot_timer.setSingleShot(True)
+        self._plot_timer.setInterval(16)  # At most one redraw per frame
+        self._plot_timer.timeout.connect(self.plot_graph)
+        # Columns that are not float64 converted once for the plot and picking, (values, times) by column,
+        # and the nearest point lookup; both follow the edits of the table row by row
+        self._numeric = {}
+        self._pick_index = None
+        self.model.dataChanged.connect(self._on_data_changed)
+        self.model.rowsInserted.connect(self._on_rows_inserted)
+        self.model.rowsRemoved.connect(self._on_rows_removed)
+        self.model.modelReset.connect(self._reset_numeric)
+        self.model.layoutChanged.connect(self._reset_numeric)
 
         main_layout = QVBoxLayout(self)
         page_lbl = QLabel(self.page_name)
@@ -88,6 +161,17 @@ class ICPanel(QWidget):
         top_layout.addWidget(top_button)
         main_layout.addLayout(top_layout)
 
+        # Loading progress
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        main_layout.addLayout(progress_layout)
+        self.set_loading(False)
+
         # Split interface
         splitter = QSplitter()
         main_layout.addWidget(splitter)
@@ -119,8 +203,48 @@ class ICPanel(QWidget):
         file_controls.addWidget(self.save_csv_button)
         left_layout.addLayout(file_controls)
 
+        # Transforms of the selected rows, or of the whole column
+        transform_controls = QHBoxLayout()
+        self.transform_combo = QComboBox()
+        self.transform_combo.addItems(list(TRANSFORMS))
+        self.transform_combo.currentTextChanged.connect(self.on_transform_changed)
+        transform_controls.addWidget(self.transform_combo)
+        self.transform_column_combo = QComboBox()
+        transform_controls.addWidget(self.transform_column_combo)
+        self.transform_spins = []
+        for _ in range(2):
+            spin = QDoubleSpinBox()
+            spin.setRange(-1e9, 1e9)
+            spin.setDecimals(3)
+            self.transform_spins.append(spin)
+            transform_controls.addWidget(spin)
+        apply_button = QPushButton("Apply")
+        apply_button.clicked.connect(self.apply_transform)
+        transform_controls.addWidget(apply_button)
+        left_layout.addLayout(transform_controls)
+        self.model.modelReset.connect(self.update_transform_columns)
+        self.on_transform_changed(self.transform_combo.currentText())
+
+        # Undo & Redo, also on Ctrl+Z / Ctrl+Y while the panel has focus
+        undo_controls = QHBoxLayout()
+        for text, shortcut, stack_action, can_signal in (
+                ("Undo", QKeySequence.Undo, self.undo_stack.undo, self.undo_stack.canUndoChanged),
+                ("Redo", QKeySequence.Redo, self.undo_stack.redo, self.undo_stack.canRedoChanged)):
+            button = QPushButton(text)
+            button.setEnabled(False)
+            button.clicked.connect(stack_action)
+            can_signal.connect(button.setEnabled)
+            undo_controls.addWidget(button)
+            action = QAction(text, self)
+            action.setShortcut(shortcut)
+            action.setShortcutContext(Qt.WidgetWithChildrenShortcut)
+            action.triggered.connect(stack_action)
+            self.addAction(action)
+        left_layout.addLayout(undo_controls)
+
         # Table view
         self.csv_table = QTableView()
+        self.csv_table.setModel(self.model)
         left_layout.addWidget(self.csv_table)
         splitter.addWidget(left_widget)
 
@@ -129,20 +253,108 @@ class ICPanel(QWidget):
         right_layout = QVBoxLayout(right_widget)
         self.pygraph = PlotWidget()
         self.pygraph.scene().sigMouseClicked.connect(self.on_plot_clicked)
+        self.pygraph.scene().sigMouseMoved.connect(self.on_plot_hover)
+        self.pygraph.getPlotItem().showGrid(x=True, y=True)
+        self.pygraph.getViewBox().setBackgroundColor((255, 255, 255))
+        # One curve updated in place. Large profiles are drawn with peak preserving
+        # min/max downsampling, and only the visible part when zoomed in
+        self.curve = self.pygraph.plot([], [], pen=mkPen(color='b', width=1))
+        self.curve.setDownsampling(auto=True, method='peak')
+        self.hover_marker = ScatterPlotItem(size=12, pen=mkPen(color='r', width=2), brush=None)
+        self.pygraph.addItem(self.hover_marker)
         right_layout.addWidget(self.pygraph)
+        if self.lod:
+            self.pygraph.getViewBox().sigXRangeChanged.connect(self.update_lod_view)
+            stats_layout = QHBoxLayout()
+            stats_layout.addWidget(QLabel("Threshold:"))
+            self.threshold_spin = QDoubleSpinBox()
+            self.threshold_spin.setRange(-1e6, 1e6)
+            self.threshold_spin.setDecimals(2)
+            self.threshold_spin.valueChanged.connect(self.update_lod_view)
+            stats_layout.addWidget(self.threshold_spin)
+            self.stats_lbl = QLabel("")
+            stats_layout.addWidget(self.stats_lbl, 1)
+            right_layout.addLayout(stats_layout)
         splitter.addWidget(right_widget)
 
         self.setLayout(main_layout)
 
+    @property
+    def df(self):
+        """
+        A copy of the table as a DataFrame, writes to it do not reach the model.
+        Assign a modified frame back (panel.df = df) to change the table.
+        """
+        return self.model.to_frame()
+
+    @df.setter
+    def df(self, df):
+        self.undo_stack.clear()
+        self.model.set_frame(df)
+
+    def numeric(self, col):
+        """ A column as floats (see numeric_column), float64 ones are used as they are """
+        column = self.model.column(col)
+        if column.dtype == np.float64:
+            return column
+        if col not in self._numeric:
+            times = column.dtype.kind not in 'iufb' and is_time_column(column)
+            self._numeric[col] = (np.array(numeric_column(column, times), dtype=float), times)
+        return self._numeric[col][0]
+
+    def _convert_rows(self, col, first, last):
+        """ Rows first to last of a cached column converted again """
+        return numeric_column(self.model.column(col)[first:last + 1], self._numeric[col][1])
+
+    def _reset_numeric(self, *args):
+        self._numeric.clear()
+        self._pick_index = None
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        first, last = top_left.row(), bottom_right.row()
+        for col in range(top_left.column(), bottom_right.column() + 1):
+            if col in self._numeric:
+                self._numeric[col][0][first:last + 1] = self._convert_rows(col, first, last)
+        if self._pick_index is None or top_left.column() > 1:
+            return
+        if top_left.column() == 0:
+            if not self._pick_index.splice(first, last + 1, self.numeric(0)[first:last + 1],
+                                           self.numeric(1)[first:last + 1]):
+                self._pick_index = None
+        elif bottom_right.column() >= 1:
+            self._pick_index.update_y(np.arange(first, last + 1), self.numeric(1))
+
+    def _on_rows_inserted(self, parent, first, last):
+        for col, (values, times) in self._numeric.items():
+            self._numeric[col] = (np.insert(values, first, self._convert_rows(col, first, last)), times)
+        if self._pick_index is not None and self.model.columnCount() >= 2:
+            if not self._pick_index.splice(first, first, self.numeric(0)[first:last + 1],
+                                           self.numeric(1)[first:last + 1]):
+                self._pick_index = None
+
+    def _on_rows_removed(self, parent, first, last):
+        for col, (values, times) in self._numeric.items():
+            self._numeric[col] = (np.delete(values, np.s_[first:last + 1]), times)
+        if self._pick_index is not None and not self._pick_index.splice(first, last + 1, [], []):
+            self._pick_index = None
+
+    def nearest_row(self, scene_pos, max_pixels=None):
+        """ Row of the point closest to a scene position, measured in pixels """
+        if self.model.columnCount() < 2 or self.model.rowCount() == 0:
+            return None
+        if self._pick_index is None:
+            self._pick_index = PointIndex(self.numeric(0), self.numeric(1))
+        vb = self.pygraph.plotItem.vb
+        pos = vb.mapSceneToView(scene_pos)
+        sx, sy = vb.viewPixelSize()
+        return self._pick_index.nearest(pos.x(), pos.y(), sx, sy, max_pixels=max_pixels)
+
     def on_plot_clicked(self, event):
         """ Capture mouse click events on the plot and highlight the corresponding row in the table. """
-        pos = event.scenePos()
-        clicked_x = self.pygraph.plotItem.vb.mapSceneToView(pos).x()
-        clicked_y = self.pygraph.plotItem.vb.mapSceneToView(pos).y()
-
         # Find the closest point in the dataset
-        distances = ((self.df.iloc[:, 0] - clicked_x)**2 + (self.df.iloc[:, 1] - clicked_y)**2).pow(0.5)
-        closest_index = distances.idxmin()
+        closest_index = self.nearest_row(event.scenePos())
+        if closest_index is None:
+            return
 
         self.csv_table.selectionModel().clearSelection()
 
@@ -152,65 +364,196 @@ class ICPanel(QWidget):
         )
         self.csv_table.scrollTo(self.model.index(closest_index, 0))  # Ensure the row is visible
 
-
+    def on_plot_hover(self, scene_pos):
+        """ Mark the point under the cursor """
+        row = None
+        if self.pygraph.plotItem.vb.sceneBoundingRect().contains(scene_pos):
+            row = self.nearest_row(scene_pos, max_pixels=10)
+        if row is None:
+            self.hover_marker.setData([], [])
+            self.pygraph.setToolTip('')
+            return
+        x = float(self.numeric(0)[row])
+        y = float(self.numeric(1)[row])
+        self.hover_marker.setData([x], [y])
+        self.pygraph.setToolTip(f'Row {row}: {self.model.column(0)[row]}, {self.model.column(1)[row]}')
 
     def load_csv(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV File", "", "CSV Files (*.csv)")
         if file_path:
+            self.cancel_loading()
             self.textbox.setText(file_path)
-            self.df = pd.read_csv(file_path)
-            self.display_dataframe()
-            self.plot_graph()
+            self.loader = CsvLoader(file_path, dtype=self.dtype)
+            self.loader.header.connect(self.on_csv_header)
+            self.loader.chunk.connect(self.on_csv_chunk)
+            self.loader.progress.connect(self.progress_bar.setValue)
+            self.loader.failed.connect(self.on_csv_failed)
+            self.loader.finished.connect(self.on_csv_finished)
+            self.set_loading(True)
+            self.loader.start()
+
+    def cancel_loading(self):
+        if self.loader is not None:
+            # The loader stops after the chunk in progress, without blocking the GUI; its results are dropped
+            loader = self.loader
+            loader.requestInterruption()
+            for signal in (loader.header, loader.chunk, loader.progress, loader.failed):
+                signal.disconnect()
+            self._stopped_loaders.add(loader)
+            loader.finished.connect(lambda: self._release_loader(loader))
+            if loader.isFinished():
+                # Ended before the connection, its finished signal is already gone
+                self._release_loader(loader)
+            self.loader = None
+            self.set_loading(False)
+            # A partly read file is not kept as model input
+            self.df = pd.DataFrame()
+            self.textbox.setText("")
+
+    def _release_loader(self, loader):
+        loader.wait()
+        self._stopped_loaders.discard(loader)
+
+    def set_loading(self, loading):
+        self.progress_bar.setVisible(loading)
+        self.cancel_button.setVisible(loading)
+        if loading:
+            self.progress_bar.setValue(0)
+
+    def on_csv_header(self, empty):
+        if self.sender() is self.loader:
+            self.df = empty
+
+    def on_csv_chunk(self, chunk):
+        if self.sender() is self.loader:
+            self.model.insert_rows(self.model.rowCount(), len(chunk), chunk)
+
+    def on_csv_failed(self, message):
+        if self.sender() is self.loader:
+            QMessageBox.critical(self, "Error", f"Could not read the file.\n{message}")
+            self.df = pd.DataFrame()
+
+    def on_csv_finished(self):
+        if self.sender() is self.loader:
+            self.loader = None
+            self.set_loading(False)
+
+    def request_plot(self, *args):
+        """ Redraw the plot once the current burst of edits is over """
+        if not self._plot_timer.isActive():
+            self._plot_timer.start()
 
-    def display_dataframe(self):
-        self.df = self.df.round(2)
-        self.model = PandasModel(self.df)
-        self.csv_table.setModel(self.model)
-        self.model.dataChanged.connect(self.plot_graph)
-        
     def plot_graph(self):
-        self.pygraph.clear()
-        if len(self.df) < 20:
-            self.pygraph.plot(self.df.iloc[:, 0].astype(float), self.df.iloc[:, 1].astype(float), pen=mkPen(color='b', width=2), symbol='o')
+        self._pyramid = None
+        if self.model.columnCount() < 2:
+            self.curve.setData([], [])
+            return
+        x = self.numeric(0)
+        y = self.numeric(1)
+        if len(x) < 20:
+            self.curve.setPen(mkPen(color='b', width=2))
+            self.curve.setSymbol('o')
         else:
-            self.pygraph.plot(self.df.iloc[:, 0].astype(float), self.df.iloc[:, 1].astype(float), pen=mkPen(color='b', width=1))
-        self.pygraph.getPlotItem().showGrid(x=True, y=True)
+            self.curve.setPen(mkPen(color='b', width=1))
+            self.curve.setSymbol(None)
+        increasing = bool(np.all(x[1:] >= x[:-1]))
+        if self.lod and increasing:
+            # The pyramid already gives the points the view needs
+            self._pyramid = SeriesPyramid(x, y)
+            self.curve.setDownsampling(auto=False, ds=1)
+            self.curve.setClipToView(False)
+            self.update_lod_view()
+            return
+        self.curve.setDownsampling(auto=True, method='peak')
+        # Clipping to the view needs increasing x, e.g. not before the table is sorted
+        self.curve.setClipToView(increasing)
+        self.curve.setData(x, y)
+        if self.lod:
+            self.stats_lbl.setText("Sort the series for window statistics")
+
+    def update_lod_view(self, *args):
+        """ Plot the visible window at the resolution of the screen and show its statistics """
+        if self._pyramid is None or len(self._pyramid) == 0:
+            return
         vb = self.pygraph.getViewBox()
-        vb.setBackgroundColor((255, 255, 255))
+        if vb.autoRangeEnabled()[0]:
+            x0, x1 = self._pyramid.x[0], self._pyramid.x[-1]
+        else:
+            x0, x1 = vb.viewRange()[0]
+        x, y = self._pyramid.query(x0, x1, max(int(vb.width()), 100) * 2)
+        self.curve.setData(x, y)
+        stats = self._pyramid.stats(x0, x1, self.threshold_spin.value())
+        self.stats_lbl.setText(f"Window: {stats['samples']} samples, peak {stats['peak']:.2f}, "
+                               f"min {stats['min']:.2f}, mean {stats['mean']:.2f}, "
+                               f"above threshold {stats['duration_above']:g}")
 
     def add_row(self):
-        """ Add an empty row above or below the selected cell based on the button clicked. """
+        """
+        Add empty rows above or below the selected rows based on the button clicked,
+        as many rows as are selected.
+        """
         sender_button = self.sender()  # Get the button that triggered the function
 
-        selected_indexes = self.csv_table.selectionModel().selectedRows()
-        if selected_indexes:
-            row_index = selected_indexes[0].row()  # Get selected row
+        selected_rows = sorted(index.row() for index in self.csv_table.selectionModel().selectedRows())
+        if selected_rows:
+            row_index = selected_rows[0]
             if sender_button.text() == "Add Row Below":
-                row_index += 1  # Adjust to insert below
+                row_index = selected_rows[-1] + 1  # Adjust to insert below
         else:
-            row_index = len(self.df)  # Default to the bottom
-
-        # Insert an empty row in the DataFrame
-        new_row = pd.Series([0] * self.df.shape[1], index=self.df.columns)
-        self.df = pd.concat([self.df.iloc[:row_index], new_row.to_frame().T, self.df.iloc[row_index:]], ignore_index=True)
-
-        # Refresh table display
-        self.display_dataframe()
-        self.plot_graph()
+            row_index = self.model.rowCount()  # Default to the bottom
 
+        # The model moves the rows after the new ones, the view keeps its scroll and selection
+        count = max(len(selected_rows), 1)
+        self.undo_stack.push(InsertRowsCommand(self.model, row_index, count, text=f'Insert {count} rows'))
 
     def delete_row(self):
-        selected_indexes = self.csv_table.selectionModel().selectedRows()
-        if selected_indexes:
-            row_index = selected_indexes[0].row()
-            self.df = self.df.drop(index=row_index).reset_index(drop=True)
-            self.display_dataframe()
-            self.plot_graph()
+        selected_rows = [index.row() for index in self.csv_table.selectionModel().selectedRows()]
+        if selected_rows:
+            self.undo_stack.push(RemoveRowsCommand(self.model, selected_rows, text=f'Delete {len(selected_rows)} rows'))
+
+    def update_transform_columns(self):
+        self.transform_column_combo.clear()
+        self.transform_column_combo.addItems([str(self.model.headerData(i, Qt.Horizontal))
+                                              for i in range(self.model.columnCount())])
+        self.transform_column_combo.setCurrentIndex(min(1, self.model.columnCount() - 1))
+
+    def on_transform_changed(self, name):
+        labels = TRANSFORMS[name][0]
+        for spin, label in zip(self.transform_spins, labels):
+            spin.setPrefix(f'{label}: ')
+            spin.setVisible(True)
+        for spin in self.transform_spins[len(labels):]:
+            spin.setVisible(False)
+        if name == 'Scale':
+            self.transform_spins[0].setValue(1)
+        if name == 'Re-zero':
+            self.transform_column_combo.setCurrentIndex(0)
+
+    def apply_transform(self):
+        """
+        Apply the chosen transform to the selected rows of a column, or to the whole column
+        without a selection, as one array operation and one undoable edit.
+        """
+        col = self.transform_column_combo.currentIndex()
+        if col < 0 or self.model.rowCount() == 0:
+            return
+        column = self.model.column(col)
+        if column.dtype.kind != 'f':
+            QMessageBox.critical(self, "Error", "Transforms apply to numeric columns only.")
+            return
+        rows = np.unique([index.row() for index in self.csv_table.selectionModel().selectedIndexes()])
+        rows = rows.astype(int) if rows.size else np.arange(len(column))
+        name = self.transform_combo.currentText()
+        a, b = (spin.value() for spin in self.transform_spins)
+        x = self.numeric(0)[rows]
+        values = TRANSFORMS[name][1](x, column[rows], a, b)
+        self.undo_stack.push(SetValuesCommand(self.model, rows, col, values, text=name))
 
     def sort_csv(self):
-        self.df = self.df.sort_values(by=self.df.columns[0]).reset_index(drop=True)
-        self.display_dataframe()
-        self.plot_graph()
+        if self.model.columnCount() == 0:
+            return
+        order = np.argsort(self.model.column(0), kind='stable')
+        self.undo_stack.push(PermuteRowsCommand(self.model, order, text='Sort'))
 
     def save_csv(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save CSV File", "", "CSV Files (*.csv)")
@@ -220,6 +563,25 @@ class ICPanel(QWidget):
     def get_data(self):
         return self.df
 
+    def project_data(self):
+        """ The table as a project part (arrays, meta) """
+        arrays, meta = table_arrays(self.df)
+        meta['source'] = self.textbox.text()
+        return arrays, meta
+
+    def set_project_data(self, arrays=None, meta=None):
+        """ Show the table of a project part, or an empty table """
+        if meta is None:
+            self.set_data(pd.DataFrame())
+        else:
+            self.set_data(arrays_table(arrays, meta), meta.get('source', ''))
+
+    def set_data(self, df, source=''):
+        """ Replace the table with a DataFrame produced elsewhere, e.g. an extracted profile """
+        self.cancel_loading()
+        self.textbox.setText(source)
+        self.df = df.reset_index(drop=True)
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
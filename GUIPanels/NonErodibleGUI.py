@@ -0,0 +1,263 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QPushButton, QWidget, QLabel, QLineEdit, QFileDialog,
+                             QHBoxLayout, QSizePolicy, QMessageBox, QFormLayout, QDoubleSpinBox, QComboBox)
+import numpy as np
+import pandas as pd
+from pyqtgraph import PlotWidget, mkPen
+
+from Processing.grid import write_grid
+from Processing.nonerodible import SOURCES, layer_thickness, profile_levels, raster_levels, write_layer
+from Processing.sampling import INTERPOLATION_METHODS
+
+
+class NEPanel(QWidget):
+    """
+    Non-erodible layer on the grid of the Grid panel, from a constant depth below the bed,
+    a second profile (CSV with chainage and level columns) or a raster of the hard layer
+    sampled along the transect of the profile.
+    """
+    def __init__(self, name, grid_panel, raster_panel=None):
+        super().__init__()
+        self.page_name = name
+        self.grid_panel = grid_panel
+        self.raster_panel = raster_panel
+        self.thickness = None
+        self.src = None
+        self.second_profile = None
+        # Vertices of the line of the last profile sent from the raster panel
+        self._profile_vertices = None
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(50)
+        self._update_timer.timeout.connect(self.update_layer)
+        self.grid_panel.grid_built.connect(self.request_update)
+        if self.raster_panel is not None:
+            self.raster_panel.profile_ready.connect(self.on_profile_sent)
+
+        main_layout = QVBoxLayout(self)
+        page_lbl = QLabel(self.page_name)
+        page_lbl.setStyleSheet("QLabel{font-size: 16pt;}")
+        page_lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        main_layout.addWidget(page_lbl)
+
+        content_layout = QHBoxLayout()
+        main_layout.addLayout(content_layout)
+
+        form = QFormLayout()
+        self.source_combo = QComboBox()
+        self.source_combo.addItems(SOURCES)
+        self.source_combo.currentTextChanged.connect(self.on_source_changed)
+        form.addRow("Layer from:", self.source_combo)
+        self.depth_spin = QDoubleSpinBox()
+        self.depth_spin.setRange(0, 1000)
+        self.depth_spin.setDecimals(2)
+        self.depth_spin.setValue(1.0)
+        self.depth_spin.valueChanged.connect(self.request_update)
+        form.addRow("Depth below bed (m):", self.depth_spin)
+        file_layout = QHBoxLayout()
+        self.file_edit = QLineEdit()
+        self.file_edit.setReadOnly(True)
+        file_button = QPushButton("Browse")
+        file_button.clicked.connect(self.browse_file)
+        file_layout.addWidget(self.file_edit)
+        file_layout.addWidget(file_button)
+        form.addRow("File:", file_layout)
+        self.transect_edit = QLineEdit()
+        self.transect_edit.setPlaceholderText("x0, y0, x1, y1")
+        self.transect_edit.editingFinished.connect(self.request_update)
+        form.addRow("Transect:", self.transect_edit)
+        self.method_combo = QComboBox()
+        self.method_combo.addItems(INTERPOLATION_METHODS)
+        self.method_combo.setCurrentText('bilinear')
+        self.method_combo.currentTextChanged.connect(self.request_update)
+        form.addRow("Interpolation:", self.method_combo)
+        export_button = QPushButton("Export grid and layer")
+        export_button.clicked.connect(self.export_layer)
+        form.addRow(export_button)
+        self.stats_lbl = QLabel("No grid")
+        self.stats_lbl.setWordWrap(True)
+        form.addRow(self.stats_lbl)
+        settings_widget = QWidget()
+        settings_widget.setLayout(form)
+        settings_widget.setMaximumWidth(360)
+        content_layout.addWidget(settings_widget)
+
+        self.pygraph = PlotWidget()
+        self.pygraph.getPlotItem().showGrid(x=True, y=True)
+        self.pygraph.getViewBox().setBackgroundColor((255, 255, 255))
+        self.pygraph.setLabel('left', 'Level (m)')
+        self.pygraph.setLabel('bottom', 'Cross-shore distance (m)')
+        self.bed_curve = self.pygraph.plot([], [], pen=mkPen(color='b', width=1))
+        self.ne_curve = self.pygraph.plot([], [], pen=mkPen(color='k', width=2))
+        for curve in (self.bed_curve, self.ne_curve):
+            curve.setDownsampling(auto=True, method='peak')
+            curve.setClipToView(True)
+        content_layout.addWidget(self.pygraph, 1)
+
+        self.setLayout(main_layout)
+        self.on_source_changed(self.source_combo.currentText())
+
+    def on_source_changed(self, source):
+        # A file of the other source type does not apply any more
+        if self.file_edit.text():
+            self.set_file('')
+        self.depth_spin.setEnabled(source == 'Constant depth')
+        self.file_edit.setEnabled(source != 'Constant depth')
+        self.transect_edit.setEnabled(source == 'Raster')
+        self.method_combo.setEnabled(source == 'Raster')
+        self.request_update()
+
+    def on_profile_sent(self, *args):
+        """ Sample the raster along the line of a profile sent from the raster panel """
+        line = self.raster_panel.profile_line
+        if line is not None:
+            (x0, y0), (x1, y1) = line[1][0], line[1][-1]
+            self.transect_edit.setText(f"{x0:.3f}, {y0:.3f}, {x1:.3f}, {y1:.3f}")
+            self._profile_vertices = np.asarray(line[1], dtype=float)
+            self.request_update()
+
+    def transect(self):
+        """ Vertices of the transect, the full polyline when it came from the raster panel """
+        try:
+            x0, y0, x1, y1 = (float(v) for v in self.transect_edit.text().split(','))
+        except ValueError:
+            return None
+        vertices = self._profile_vertices
+        if vertices is not None and np.allclose(vertices[[0, -1]].ravel(), [x0, y0, x1, y1], atol=1e-3):
+            return vertices
+        return np.array([[x0, y0], [x1, y1]])
+
+    def browse_file(self):
+        if self.source_combo.currentText() == 'Constant depth':
+            return
+        if self.source_combo.currentText() == 'Raster':
+            file_path, _ = QFileDialog.getOpenFileName(self, "Open non-erodible layer raster", "",
+                                                       "GeoTIFF Files (*.tif *.tiff)")
+        else:
+            file_path, _ = QFileDialog.getOpenFileName(self, "Open non-erodible layer profile", "",
+                                                       "CSV Files (*.csv)")
+        if file_path:
+            self.set_file(file_path)
+
+    def set_file(self, file_path):
+        self.close_file()
+        self.file_edit.setText(file_path or "")
+        if not file_path:
+            return
+        try:
+            if self.source_combo.currentText() == 'Raster':
+                import rasterio
+                self.src = rasterio.open(file_path, mode='r')
+            else:
+                df = pd.read_csv(file_path)
+                self.second_profile = (df.iloc[:, 0].to_numpy(dtype=float), df.iloc[:, 1].to_numpy(dtype=float))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not read {file_path}.\n{e}")
+            self.file_edit.setText("")
+        self.request_update()
+
+    def close_file(self):
+        if self.src is not None:
+            self.src.close()
+        self.src = None
+        self.second_profile = None
+
+    def request_update(self, *args):
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
+    def ne_levels(self, chainage, z):
+        """ Levels of the non-erodible layer at the grid nodes, None when the source is not set """
+        source = self.source_combo.currentText()
+        if source == 'Constant depth':
+            return z - self.depth_spin.value()
+        if source == 'Profile' and self.second_profile is not None:
+            return profile_levels(chainage, *self.second_profile)
+        if source == 'Raster' and self.src is not None:
+            vertices = self.transect()
+            if vertices is not None:
+                return raster_levels(self.src, [vertices], np.zeros(len(chainage), dtype=int), chainage,
+                                     self.method_combo.currentText())
+        return None
+
+    def update_layer(self):
+        self.thickness = None
+        grid = self.grid_panel.grid
+        if grid is None:
+            self.bed_curve.setData([], [])
+            self.ne_curve.setData([], [])
+            self.stats_lbl.setText("No grid, build one in the Grid panel")
+            return
+        x, z = grid
+        self.bed_curve.setData(x, z)
+        levels = self.ne_levels(self.grid_panel.grid_chainage, z)
+        if levels is None:
+            self.ne_curve.setData([], [])
+            self.stats_lbl.setText("Select the source of the layer")
+            return
+        self.thickness = layer_thickness(z, levels)
+        self.ne_curve.setData(x, np.where(np.isnan(levels), np.nan, np.minimum(levels, z)))
+        exposed = np.count_nonzero(self.thickness == 0)
+        self.stats_lbl.setText(f"{len(x)} nodes, {exposed} with the layer exposed, "
+                               f"{np.count_nonzero(np.isnan(levels))} without layer data")
+
+    def export_layer(self):
+        if self._update_timer.isActive():
+            self._update_timer.stop()
+            self.update_layer()
+        if self.thickness is None:
+            QMessageBox.critical(self, "Error", "No non-erodible layer is built.")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Export XBeach-G grid and non-erodible layer")
+        if out_dir:
+            write_grid(out_dir, *self.grid_panel.grid)
+            write_layer(out_dir, self.thickness)
+            print(f'Grid and non-erodible layer written to {out_dir}')
+
+    def project_data(self):
+        """ The settings as a project part, the layer is rebuilt from the grid """
+        vertices = self.transect()
+        return ({} if vertices is None else {'vertices': vertices}), {'source': self.source_combo.currentText(), 'depth': self.depth_spin.value(),
+                        'file': self.file_edit.text(), 'transect': self.transect_edit.text(),
+                        'method': self.method_combo.currentText()}
+
+    def set_project_data(self, arrays=None, meta=None):
+        meta = meta or {}
+        self.source_combo.setCurrentText(meta.get('source', SOURCES[0]))
+        self.depth_spin.setValue(meta.get('depth', 1.0))
+        self.method_combo.setCurrentText(meta.get('method', 'bilinear'))
+        self.transect_edit.setText(meta.get('transect', ''))
+        self._profile_vertices = (arrays or {}).get('vertices')
+        file_path = meta.get('file', '')
+        if file_path and not os.path.exists(file_path):
+            QMessageBox.warning(self, "Project", f"The non-erodible layer file was not found:\n{file_path}")
+            file_path = ''
+        self.set_file(file_path)
+
+
+if __name__ == "__main__":
+    from GUIPanels.GridGUI import GridPanel
+    from GUIPanels.InitialConditionsGUI import ICPanel
+    app = QApplication(sys.argv)
+    window = NEPanel('Test Page', GridPanel('Grid', ICPanel('Profile')))
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,208 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QPushButton, QWidget, QLabel, QFileDialog, QHBoxLayout,
+                             QSizePolicy, QMessageBox, QTreeWidget, QTreeWidgetItem, QComboBox, QListWidget,
+                             QSplitter)
+
+from Processing.params import (active_params, compiled_schema, diff_params, format_diff, format_value, parse_value,
+                               read_params, validate_params, write_params)
+
+LIST_SEPARATOR = ', '
+
+
+class ParamsPanel(QWidget):
+    """
+    Editor of the XBeach-G parameters of some sections of the schema.
+    Panels created with shared=another panel edit the same parameter set, e.g. the
+    Parameters and the Output configuration pages. Every parameter of the schema is kept,
+    the ones without effect are shown greyed and left out of params.txt.
+    """
+    params_changed = pyqtSignal()
+
+    def __init__(self, name, sections, shared=None):
+        super().__init__()
+        self.page_name = name
+        self.sections = list(sections)
+        self.schema = compiled_schema()
+        self.params = shared.params if shared is not None else self.schema.defaults(active=False)
+        if shared is not None:
+            shared.params_changed.connect(self.refresh)
+            self.params_changed.connect(shared.refresh)
+        self.items = {}
+
+        main_layout = QVBoxLayout(self)
+        page_lbl = QLabel(self.page_name)
+        page_lbl.setStyleSheet("QLabel{font-size: 16pt;}")
+        page_lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        main_layout.addWidget(page_lbl)
+
+        file_controls = QHBoxLayout()
+        for text, slot in (("Load params.txt", self.load_params), ("Save params.txt", self.save_params),
+                           ("Compare with file", self.compare_params), ("Reset to defaults", self.reset_params)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            file_controls.addWidget(button)
+        main_layout.addLayout(file_controls)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(3)
+        self.tree.setHeaderLabels(["Parameter", "Value", "Description"])
+        for section in self.sections:
+            section_item = QTreeWidgetItem(self.tree, [section])
+            section_item.setFlags(Qt.ItemIsEnabled)
+            for param_name in self.schema.order:
+                param = self.schema.params[param_name]
+                if param.section != section:
+                    continue
+                item = QTreeWidgetItem(section_item, [param_name, "", param.help])
+                if param.kind == 'choice':
+                    combo = QComboBox()
+                    combo.addItems([str(c) for c in param.choices])
+                    combo.currentTextChanged.connect(lambda text, n=param_name: self.set_value(n, text))
+                    self.tree.setItemWidget(item, 1, combo)
+                else:
+                    item.setFlags(item.flags() | Qt.ItemIsEditable)
+                self.items[param_name] = item
+        self.tree.expandAll()
+        self.tree.itemChanged.connect(self.on_item_changed)
+        splitter.addWidget(self.tree)
+        self.issues_list = QListWidget()
+        splitter.addWidget(self.issues_list)
+        splitter.setStretchFactor(0, 4)
+        main_layout.addWidget(splitter)
+
+        self.setLayout(main_layout)
+        self.refresh()
+        for column in range(2):
+            self.tree.resizeColumnToContents(column)
+
+    def _text(self, name):
+        value = self.params.get(name)
+        if name in self.schema.lists:
+            return LIST_SEPARATOR.join(map(str, value or []))
+        return '' if value is None else format_value(value)
+
+    def refresh(self):
+        """ Show the values of the parameter set and its issues """
+        self.tree.blockSignals(True)
+        active = active_params(self.params)
+        for name, item in self.items.items():
+            combo = self.tree.itemWidget(item, 1)
+            if combo is not None:
+                combo.blockSignals(True)
+                combo.setCurrentText(self._text(name))
+                combo.blockSignals(False)
+            else:
+                item.setText(1, self._text(name))
+            # Parameters without effect are greyed, they are not written
+            color = QBrush() if name in active else QBrush(QColor('gray'))
+            for column in range(3):
+                item.setForeground(column, color)
+            if combo is not None:
+                combo.setEnabled(name in active)
+        self.tree.blockSignals(False)
+        self.show_issues()
+
+    def show_issues(self):
+        self.issues_list.clear()
+        mine = set(self.items)
+        for issue in validate_params(active_params(self.params)):
+            if issue.name in mine or (issue.name not in self.schema.params and self.sections[0] != 'Output'):
+                self.issues_list.addItem(f"{issue.severity.capitalize()}: {issue.name}: {issue.message}")
+                if issue.severity == 'error':
+                    self.issues_list.item(self.issues_list.count() - 1).setForeground(QBrush(QColor('red')))
+
+    def on_item_changed(self, item, column):
+        if column == 1 and item.text(0) in self.items:
+            self.set_value(item.text(0), item.text(1))
+
+    def set_value(self, name, text):
+        if name in self.schema.lists:
+            value = [part.strip() for part in text.split(LIST_SEPARATOR.strip()) if part.strip()]
+        else:
+            try:
+                value = parse_value(name, text)
+            except ValueError:
+                # Kept as typed, reported by the validation
+                value = text.strip()
+        self.params[name] = value
+        self.refresh()
+        self.params_changed.emit()
+
+    def replace_params(self, params):
+        """ Defaults for every parameter, overwritten by params, in the same shared dict """
+        self.params.clear()
+        self.params.update(self.schema.defaults(active=False))
+        self.params.update(params)
+        self.refresh()
+        self.params_changed.emit()
+
+    def load_params(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open params.txt", "", "Parameter files (*.txt);;All files (*)")
+        if file_path:
+            try:
+                self.replace_params(read_params(file_path))
+            except (OSError, ValueError) as e:
+                QMessageBox.critical(self, "Error", f"Could not read {file_path}.\n{e}")
+
+    def save_params(self):
+        errors = [i for i in validate_params(active_params(self.params)) if i.severity == 'error']
+        if errors and QMessageBox.question(self, "Save params.txt", f"{len(errors)} parameters have errors. "
+                                           "Save anyway?") != QMessageBox.Yes:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save params.txt", "params.txt", "Parameter files (*.txt)")
+        if file_path:
+            write_params(file_path, active_params(self.params))
+
+    def compare_params(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Compare with params.txt", "",
+                                                   "Parameter files (*.txt);;All files (*)")
+        if not file_path:
+            return
+        try:
+            other = read_params(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not read {file_path}.\n{e}")
+            return
+        text = format_diff(diff_params(other, active_params(self.params)))
+        box = QMessageBox(QMessageBox.Information, "Compare", f"Changes from {file_path} to the current parameters:")
+        box.setDetailedText(text or "No differences")
+        box.setInformativeText(f"{len(text.splitlines())} differences" if text else "No differences")
+        box.exec_()
+
+    def reset_params(self):
+        self.replace_params({})
+
+    def project_data(self):
+        """ The parameter set as a project part """
+        # A copy, the project compares it with the next save
+        return {}, {'params': {name: list(v) if isinstance(v, list) else v for name, v in self.params.items()}}
+
+    def set_project_data(self, arrays=None, meta=None):
+        self.replace_params((meta or {}).get('params', {}))
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = ParamsPanel('Test Page', compiled_schema().sections)
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,300 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import time
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QBrush, QColor
+from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QPushButton, QWidget, QLabel, QLineEdit, QFileDialog,
+                             QHBoxLayout, QSizePolicy, QMessageBox, QSpinBox, QFormLayout, QTableWidget,
+                             QTableWidgetItem, QAbstractItemView, QPlainTextEdit, QSplitter, QHeaderView)
+
+from Processing.runs import FINISHED, RunManager, read_log
+
+COLUMNS = ["Run", "Status", "Progress", "Elapsed", "Folder"]
+STATUS_COLORS = {'running': 'blue', 'done': 'darkgreen', 'failed': 'red', 'cancelled': 'gray'}
+# Lines of the log view, older ones are dropped
+LOG_LINES = 5000
+
+
+class RunPanel(QWidget):
+    """
+    Queue of model runs started with a command in every run folder, as many at once
+    as the cores and the memory allow. The queue is kept on disk, runs interrupted
+    by closing the GUI are queued again the next time. The log of the selected run
+    is streamed below the queue. When another instance runs the queue, the page only
+    follows it.
+    """
+    def __init__(self, name, manager=None):
+        super().__init__()
+        self.page_name = name
+        self.manager = manager if manager is not None else RunManager.from_config()
+        self.rows = {}
+        self.log_job = None
+        self.log_offset = 0
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(500)
+        self._poll_timer.timeout.connect(self.poll)
+        # Runs left going would be queued again, and run twice, at the next start
+        QApplication.instance().aboutToQuit.connect(self.manager.stop)
+
+        main_layout = QVBoxLayout(self)
+        page_lbl = QLabel(self.page_name)
+        page_lbl.setStyleSheet("QLabel{font-size: 16pt;}")
+        page_lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        main_layout.addWidget(page_lbl)
+
+        form = QFormLayout()
+        command_layout = QHBoxLayout()
+        self.command_edit = QLineEdit(self.manager.command)
+        self.command_edit.setToolTip("Run in every run folder, {dir} is replaced by the folder")
+        self.command_edit.editingFinished.connect(self.apply_settings)
+        command_button = QPushButton("Browse")
+        command_button.clicked.connect(self.browse_command)
+        command_layout.addWidget(self.command_edit)
+        command_layout.addWidget(command_button)
+        form.addRow("Model command:", command_layout)
+        limits_layout = QHBoxLayout()
+        self.cores_spin = QSpinBox()
+        self.cores_spin.setRange(1, os.cpu_count() or 1)
+        self.cores_spin.setValue(min(self.manager.max_cores, self.cores_spin.maximum()))
+        self.cores_per_run_spin = QSpinBox()
+        self.cores_per_run_spin.setRange(1, os.cpu_count() or 1)
+        self.cores_per_run_spin.setValue(self.manager.cores_per_run)
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(0, 1_000_000)
+        self.memory_spin.setSuffix(" MB")
+        self.memory_spin.setSpecialValueText("No limit")
+        self.memory_spin.setValue(int(self.manager.memory_per_run_mb))
+        for label, spin in (("Cores:", self.cores_spin), ("Cores per run:", self.cores_per_run_spin),
+                            ("Memory per run:", self.memory_spin)):
+            spin.valueChanged.connect(self.apply_settings)
+            limits_layout.addWidget(QLabel(label))
+            limits_layout.addWidget(spin)
+        limits_layout.addStretch(1)
+        form.addRow(limits_layout)
+        main_layout.addLayout(form)
+
+        queue_controls = QHBoxLayout()
+        self.queue_buttons = []
+        for text, slot in (("Add scenario set", self.add_scenarios), ("Add run folder", self.add_folder),
+                           ("Cancel selected", self.cancel_selected), ("Retry selected", self.retry_selected),
+                           ("Remove finished", self.remove_finished)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            queue_controls.addWidget(button)
+            self.queue_buttons.append(button)
+        queue_controls.addStretch(1)
+        self.start_button = QPushButton("Start")
+        self.start_button.clicked.connect(self.toggle_running)
+        queue_controls.addWidget(self.start_button)
+        self.queue_buttons.append(self.start_button)
+        main_layout.addLayout(queue_controls)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(len(COLUMNS) - 1, QHeaderView.Stretch)
+        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        splitter.addWidget(self.table)
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(LOG_LINES)
+        self.log_view.setPlaceholderText("Select a run to follow its log")
+        splitter.addWidget(self.log_view)
+        splitter.setStretchFactor(0, 3)
+        main_layout.addWidget(splitter)
+        self.status_lbl = QLabel()
+        main_layout.addWidget(self.status_lbl)
+
+        self.setLayout(main_layout)
+        self.rebuild_table()
+        self.update_status()
+        if self.manager.queue.read_only:
+            for button in self.queue_buttons:
+                button.setEnabled(False)
+            self._follow_timer = QTimer(self)
+            self._follow_timer.setInterval(2000)
+            self._follow_timer.timeout.connect(self.follow)
+            self._follow_timer.start()
+        elif self.running_ids():
+            # Runs of an earlier session still alive, polled until they end
+            self._poll_timer.start()
+
+    def follow(self):
+        """ Show the queue as saved by the instance running it """
+        self.manager.queue.load()
+        # The jobs were read again, the followed log is found by its id
+        if self.log_job is not None:
+            self.log_job = self.manager.queue.job(self.log_job['id'])
+            if self.log_job is None:
+                self.log_view.clear()
+        self.rebuild_table()
+        self.stream_log()
+
+    def running_ids(self):
+        return {job['id'] for job in self.manager.queue.jobs if job['status'] == 'running'}
+
+    def apply_settings(self, *args):
+        self.manager.command = self.command_edit.text().strip()
+        self.manager.max_cores = self.cores_spin.value()
+        self.manager.cores_per_run = self.cores_per_run_spin.value()
+        self.manager.memory_per_run_mb = self.memory_spin.value()
+        self.update_status()
+
+    def browse_command(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "XBeach-G executable", "", "All files (*)")
+        if file_path:
+            self.command_edit.setText(f'"{file_path}"' if ' ' in file_path else file_path)
+            self.apply_settings()
+
+    def add_scenarios(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open scenario set", "", "Scenario index (scenarios.csv)")
+        if file_path:
+            try:
+                added = self.manager.queue.add_index(file_path)
+            except (OSError, KeyError, ValueError) as e:
+                QMessageBox.critical(self, "Error", f"Could not read {file_path}.\n{e}")
+                return
+            print(f'{len(added)} runs queued from {file_path}')
+            self.rebuild_table()
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Run folder with params.txt")
+        if folder:
+            self.manager.queue.add([folder])
+            self.rebuild_table()
+
+    def selected_ids(self):
+        jobs = self.manager.queue.jobs
+        return {jobs[index.row()]['id'] for index in self.table.selectionModel().selectedRows()}
+
+    def cancel_selected(self):
+        self.manager.cancel(self.selected_ids())
+        self.refresh_rows()
+
+    def retry_selected(self):
+        self.manager.queue.retry(self.selected_ids())
+        self.refresh_rows()
+
+    def remove_finished(self):
+        self.manager.queue.remove({job['id'] for job in self.manager.queue.jobs if job['status'] in FINISHED})
+        self.rebuild_table()
+
+    def toggle_running(self):
+        if self.manager.running:
+            self.manager.pause()
+        else:
+            self.apply_settings()
+            if not self.manager.command:
+                QMessageBox.critical(self, "Error", "Set the command of the model.")
+                return
+            self.manager.start()
+            self._poll_timer.start()
+            self.poll()
+        self.update_status()
+
+    def poll(self):
+        changed = self.manager.poll()
+        running = self.running_ids()
+        if not self.manager.running and not running:
+            self._poll_timer.stop()
+        # Running rows update their progress on every poll, the others when they change
+        self.refresh_rows(changed | running)
+        self.stream_log()
+        self.update_status()
+
+    def rebuild_table(self):
+        self.table.setRowCount(len(self.manager.queue.jobs))
+        self.rows = {job['id']: row for row, job in enumerate(self.manager.queue.jobs)}
+        self.refresh_rows()
+
+    def refresh_rows(self, job_ids=None):
+        jobs = self.manager.queue.jobs
+        rows = range(len(jobs)) if job_ids is None else sorted(self.rows[i] for i in job_ids if i in self.rows)
+        now = time.time()
+        for row in rows:
+            job = jobs[row]
+            progress = self.manager.progress(job)
+            elapsed = (job['finished'] or now) - job['started'] if job['started'] else None
+            status = job['status'] + (f" ({job['message']})" if job['message'] else '')
+            values = [job['label'], status, '' if progress is None else f"{progress:.0f}%",
+                      '' if elapsed is None else time.strftime('%H:%M:%S', time.gmtime(elapsed)), job['directory']]
+            color = QBrush(QColor(STATUS_COLORS[job['status']])) if job['status'] in STATUS_COLORS else QBrush()
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, column, item)
+                item.setText(value)
+                item.setForeground(color)
+        self.update_status()
+
+    def update_status(self):
+        counts = self.manager.queue.counts()
+        self.start_button.setText("Pause" if self.manager.running else "Start")
+        if self.manager.queue.read_only:
+            self.status_lbl.setText(f"The queue is run by another instance (process {self.manager.queue.owner}): "
+                                    f"{counts['running']} running, {counts['queued']} queued, {counts['done']} done, "
+                                    f"{counts['failed']} failed")
+            return
+        self.status_lbl.setText(f"{counts['running']} running, {counts['queued']} queued, {counts['done']} done, "
+                                f"{counts['failed']} failed, {counts['cancelled']} cancelled. Up to "
+                                f"{self.manager.slots()} runs at once on {self.manager.max_cores} cores")
+
+    def on_selection_changed(self):
+        rows = self.table.selectionModel().selectedRows()
+        job = self.manager.queue.jobs[rows[0].row()] if rows else None
+        if job is not self.log_job:
+            self.log_job = job
+            self.log_offset = 0
+            self.log_view.clear()
+            self.stream_log()
+
+    def stream_log(self):
+        """ Append what the selected run wrote to its log since the last read """
+        if self.log_job is None:
+            return
+        text, self.log_offset = read_log(self.log_job['directory'], self.log_offset)
+        if text:
+            self.log_view.moveCursor(self.log_view.textCursor().End)
+            self.log_view.insertPlainText(text)
+            self.log_view.ensureCursorVisible()
+
+    def project_data(self):
+        """ The run settings as a project part, the queue is kept in its own file """
+        return {}, {'command': self.command_edit.text(), 'cores': self.cores_spin.value(),
+                    'cores_per_run': self.cores_per_run_spin.value(), 'memory_per_run_mb': self.memory_spin.value()}
+
+    def set_project_data(self, arrays=None, meta=None):
+        meta = meta or {}
+        self.command_edit.setText(meta.get('command', self.manager.command))
+        self.cores_spin.setValue(meta.get('cores', self.cores_spin.maximum()))
+        self.cores_per_run_spin.setValue(meta.get('cores_per_run', 1))
+        self.memory_spin.setValue(meta.get('memory_per_run_mb', 0))
+        self.apply_settings()
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = RunPanel('Test Page')
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,292 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+from pathlib import Path
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QVBoxLayout, QPushButton, QWidget, QLabel, QLineEdit, QFileDialog,
+                             QHBoxLayout, QSizePolicy, QMessageBox, QListWidget, QListWidgetItem, QGroupBox,
+                             QPlainTextEdit, QSpinBox, QComboBox, QFormLayout, QProgressBar)
+
+from Processing.scenarios import LINK_MODES, generate_scenarios, parse_sweep
+
+
+class ScenarioWorker(QThread):
+    """ Run generate_scenarios off the GUI thread, Cancel stops it between chunks of runs """
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, out_dir, kwargs):
+        super().__init__()
+        self.out_dir = out_dir
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            summary = generate_scenarios(self.out_dir, progress=self.on_progress, **self.kwargs)
+            self.done.emit(summary)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def on_progress(self, done, total):
+        self.progress.emit(done, total)
+        return self.isInterruptionRequested()
+
+
+class ScenarioPanel(QWidget):
+    """
+    Sets of profiles, storms and water levels, and parameter sweeps, written as one
+    XBeach-G run folder per combination with the parameters of the Parameters page.
+    An input is a file, or the table currently shown in its input page.
+    """
+    def __init__(self, name, params_panel, grid_panel, input_panels):
+        super().__init__()
+        self.page_name = name
+        self.params_panel = params_panel
+        self.grid_panel = grid_panel
+        # {'profiles': ICPanel, 'storms': ICPanel, 'water_levels': ICPanel}
+        self.input_panels = input_panels
+        self.worker = None
+
+        main_layout = QVBoxLayout(self)
+        page_lbl = QLabel(self.page_name)
+        page_lbl.setStyleSheet("QLabel{font-size: 16pt;}")
+        page_lbl.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        main_layout.addWidget(page_lbl)
+
+        # One list per input set
+        sets_layout = QHBoxLayout()
+        self.lists = {}
+        for key, title, filter in (('profiles', "Profiles", "Profiles (*.csv)"),
+                                   ('storms', "Storms", "Storms (*.csv *.txt)"),
+                                   ('water_levels', "Water levels", "Water levels (*.csv)")):
+            box = QGroupBox(title)
+            box_layout = QVBoxLayout(box)
+            items = QListWidget()
+            items.setSelectionMode(QListWidget.ExtendedSelection)
+            box_layout.addWidget(items)
+            buttons = QHBoxLayout()
+            add_button = QPushButton("Add files")
+            add_button.clicked.connect(lambda checked, k=key, f=filter: self.add_files(k, f))
+            buttons.addWidget(add_button)
+            if key == 'profiles':
+                folder_button = QPushButton("Add folder")
+                folder_button.setToolTip("A folder with x.grd and bed.dep, e.g. from Export XBeach-G")
+                folder_button.clicked.connect(self.add_profile_folder)
+                buttons.addWidget(folder_button)
+            current_button = QPushButton("Add current")
+            current_button.setToolTip("The table of the input page")
+            current_button.clicked.connect(lambda checked, k=key: self.add_current(k))
+            buttons.addWidget(current_button)
+            remove_button = QPushButton("Remove")
+            remove_button.clicked.connect(lambda checked, k=key: self.remove_selected(k))
+            buttons.addWidget(remove_button)
+            box_layout.addLayout(buttons)
+            sets_layout.addWidget(box)
+            self.lists[key] = items
+        main_layout.addLayout(sets_layout)
+
+        form = QFormLayout()
+        self.sweep_edit = QPlainTextEdit()
+        self.sweep_edit.setPlaceholderText("One swept parameter per line, e.g.\nD50 = 0.005, 0.01\nmorfac = 1, 5")
+        self.sweep_edit.setMaximumHeight(90)
+        form.addRow("Parameter sweeps:", self.sweep_edit)
+        self.sample_spin = QSpinBox()
+        self.sample_spin.setRange(0, 10_000_000)
+        self.sample_spin.setSpecialValueText("All combinations")
+        form.addRow("Random sample:", self.sample_spin)
+        self.link_combo = QComboBox()
+        self.link_combo.addItems(LINK_MODES)
+        self.link_combo.setToolTip("How the run folders get their input files, each file is stored once")
+        form.addRow("Input files:", self.link_combo)
+        out_layout = QHBoxLayout()
+        self.out_edit = QLineEdit()
+        out_button = QPushButton("Browse")
+        out_button.clicked.connect(self.browse_output)
+        out_layout.addWidget(self.out_edit)
+        out_layout.addWidget(out_button)
+        form.addRow("Output folder:", out_layout)
+        main_layout.addLayout(form)
+
+        run_layout = QHBoxLayout()
+        self.count_lbl = QLabel()
+        run_layout.addWidget(self.count_lbl, 1)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        run_layout.addWidget(self.progress_bar)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setVisible(False)
+        self.cancel_button.clicked.connect(self.cancel_generation)
+        run_layout.addWidget(self.cancel_button)
+        self.generate_button = QPushButton("Generate runs")
+        self.generate_button.clicked.connect(self.generate)
+        run_layout.addWidget(self.generate_button)
+        main_layout.addLayout(run_layout)
+        self.result_lbl = QLabel()
+        self.result_lbl.setWordWrap(True)
+        main_layout.addWidget(self.result_lbl)
+
+        self.sweep_edit.textChanged.connect(self.update_count)
+        self.sample_spin.valueChanged.connect(self.update_count)
+        for items in self.lists.values():
+            items.model().rowsInserted.connect(self.update_count)
+            items.model().rowsRemoved.connect(self.update_count)
+        self.setLayout(main_layout)
+        self.update_count()
+
+    def _add_item(self, key, label, source):
+        item = QListWidgetItem(label)
+        item.setData(Qt.UserRole, source)
+        item.setToolTip(source if isinstance(source, str) else "Table of the input page")
+        self.lists[key].addItem(item)
+
+    def add_files(self, key, filter):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Add inputs", "", filter)
+        for file_path in file_paths:
+            self._add_item(key, Path(file_path).stem, file_path)
+
+    def add_profile_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Add profile folder")
+        if folder:
+            self._add_item('profiles', Path(folder).name, folder)
+
+    def add_current(self, key):
+        panel = self.input_panels[key]
+        df = panel.get_data()
+        if df.shape[0] < 2 or df.shape[1] < 2:
+            QMessageBox.critical(self, "Error", f"{panel.page_name} has no table.")
+            return
+        source = panel.textbox.text()
+        label = Path(source.split(' [')[0]).stem if source else panel.page_name.split(': ')[-1]
+        self._add_item(key, f"{label} (current)", df.copy())
+
+    def remove_selected(self, key):
+        items = self.lists[key]
+        for item in items.selectedItems():
+            items.takeItem(items.row(item))
+
+    def browse_output(self):
+        folder = QFileDialog.getExistingDirectory(self, "Output folder of the runs")
+        if folder:
+            self.out_edit.setText(folder)
+
+    def inputs(self, key):
+        items = self.lists[key]
+        return [(items.item(i).text(), items.item(i).data(Qt.UserRole)) for i in range(items.count())]
+
+    def sweep(self):
+        return parse_sweep(self.sweep_edit.toPlainText())
+
+    def update_count(self, *args):
+        try:
+            sizes = [len(values) for values in self.sweep().values()]
+        except ValueError:
+            self.count_lbl.setText("Sweeps need one 'name = v1, v2' per line")
+            return
+        sizes += [self.lists[key].count() for key in ('storms', 'water_levels') if self.lists[key].count()]
+        total = self.lists['profiles'].count()
+        for size in sizes:
+            total *= size
+        sample = self.sample_spin.value()
+        self.count_lbl.setText(f"{min(total, sample) if sample else total} runs of {total} combinations")
+
+    def generate(self):
+        if not self.lists['profiles'].count():
+            QMessageBox.critical(self, "Error", "Add at least one profile.")
+            return
+        if not self.out_edit.text():
+            self.browse_output()
+            if not self.out_edit.text():
+                return
+        try:
+            sweep = self.sweep()
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", f"Could not read the sweeps.\n{e}")
+            return
+        kwargs = {'profiles': self.inputs('profiles'), 'storms': self.inputs('storms'),
+                  'water_levels': self.inputs('water_levels'), 'sweep': sweep,
+                  'base': dict(self.params_panel.params), 'sample': self.sample_spin.value() or None,
+                  'grid_settings': self.grid_panel.settings(), 'link': self.link_combo.currentText()}
+        self.worker = ScenarioWorker(self.out_edit.text(), kwargs)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.done.connect(self.on_done)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.finished.connect(self.on_finished)
+        self.set_running(True)
+        self.result_lbl.setText("Preparing the inputs")
+        self.worker.start()
+
+    def set_running(self, running):
+        self.progress_bar.setVisible(running)
+        self.cancel_button.setVisible(running)
+        self.generate_button.setEnabled(not running)
+        if running:
+            self.progress_bar.setValue(0)
+
+    def cancel_generation(self):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+
+    def on_progress(self, done, total):
+        self.progress_bar.setValue(int(100 * done / max(total, 1)))
+        self.result_lbl.setText(f"{done}/{total} run folders written")
+
+    def on_done(self, s):
+        self.result_lbl.setText(f"{s['runs']} runs ({s['unique_runs']} unique), {s['written']} folders written in "
+                                f"{s['seconds']:.1f} s ({s['runs_per_second']:.0f} runs/s). {s['files_stored']} "
+                                f"input files stored once for {s['files_referenced']} references"
+                                + (". Cancelled" if s['cancelled'] else ""))
+
+    def on_failed(self, message):
+        self.result_lbl.setText("")
+        QMessageBox.critical(self, "Error", f"Could not generate the runs.\n{message}")
+
+    def on_finished(self):
+        self.worker = None
+        self.set_running(False)
+
+    def project_data(self):
+        """ File inputs and settings as a project part, tables of the input pages are not kept """
+        return {}, {key: [(label, source) for label, source in self.inputs(key) if isinstance(source, str)]
+                    for key in self.lists} | {'sweep': self.sweep_edit.toPlainText(),
+                                              'sample': self.sample_spin.value(),
+                                              'link': self.link_combo.currentText(), 'output': self.out_edit.text()}
+
+    def set_project_data(self, arrays=None, meta=None):
+        meta = meta or {}
+        for key, items in self.lists.items():
+            items.clear()
+            for label, source in meta.get(key, []):
+                self._add_item(key, label, source)
+        self.sweep_edit.setPlainText(meta.get('sweep', ''))
+        self.sample_spin.setValue(meta.get('sample', 0))
+        self.link_combo.setCurrentText(meta.get('link', LINK_MODES[0]))
+        self.out_edit.setText(meta.get('output', ''))
+
+
+if __name__ == "__main__":
+    from GUIPanels.GridGUI import GridPanel
+    from GUIPanels.InitialConditionsGUI import ICPanel
+    from GUIPanels.ParametersGUI import ParamsPanel
+    from Processing.params import compiled_schema
+    app = QApplication(sys.argv)
+    profile = ICPanel('Profile')
+    window = ScenarioPanel('Test Page', ParamsPanel('Parameters', compiled_schema().sections), GridPanel('Grid', profile),
+                           {'profiles': profile, 'storms': ICPanel('Storm'), 'water_levels': ICPanel('Water level')})
+    window.show()
+    sys.exit(app.exec_())
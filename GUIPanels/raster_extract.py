@@ -16,29 +16,132 @@ Copyright (C) 2025  Nikolaos Andreakos
 """
 
 import os
+import time
+import tracemalloc
 from tkinter import messagebox
 import rasterio
 import contextily as ctx
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
 from rasterio.warp import Resampling
-from shapely.geometry import Point
-import geopandas as gpd
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import bounds as window_bounds
 
+from Processing.sampling import extract_profiles, profiles_to_gdf, read_window_float
+from Processing.tile_catalogue import TileCatalogue
+from Processing.transects import arc_length, shore_normal_transects
+from Processing.tile_cache import TileCache, add_basemap, show_basemap
+from Processing.xbeach_export import export_profiles
+
+
+
+def initial_limits(extent):
+    """ Axes limits of a freshly loaded raster, its extent with a 1km margin """
+    return (extent[0] - 1000, extent[1] + 1000), (extent[2] - 1000, extent[3] + 1000)
+
+
+def read_band(src):
+    """
+    Read the whole of band 1 as float32 with NaN for nodata, in a single allocation.
+    Peak memory of the read is measured and reported against the size of the band on disk.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    band = read_window_float(src, None, dtype='float32')
+    _, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+    raw = src.width * src.height * np.dtype(src.dtypes[0]).itemsize
+    print(f'Band {raw / 1e6:.1f}MB ({src.dtypes[0]}), peak memory of the read {(peak - start) / 1e6:.1f}MB '
+          f'({(peak - start) / raw:.2f}x)')
+    return band
+
+
+def canvas_shape(ax):
+    """ Size of the axes on screen in pixels (width, height) """
+    bbox = ax.get_window_extent()
+    return max(int(np.ceil(bbox.width)), 1), max(int(np.ceil(bbox.height)), 1)
+
+
+def read_view(src, xlim, ylim, canvas_size, band=None):
+    """
+    Read the part of the raster that is inside the axes limits xlim, ylim.
+    The window is decimated to the canvas size (width, height in pixels), so GDAL serves
+    the read from the closest internal overview, or subsamples the band when there are none.
+    When the band is already in memory (see read_band), the view is a strided slice of it.
+    Returns (float32 data with NaN for nodata, (left, right, bottom, top), pixel size of the
+    read), or None when the view does not overlap the raster. src can also be a TileCatalogue.
+    """
+    if isinstance(src, TileCatalogue):
+        return src.read_view(xlim, ylim, canvas_size)
+    bounds = src.bounds
+    xlim = sorted(xlim)
+    ylim = sorted(ylim)
+    left = max(xlim[0], bounds.left)
+    right = min(xlim[1], bounds.right)
+    bottom = max(ylim[0], bounds.bottom)
+    top = min(ylim[1], bounds.top)
+    if left >= right or bottom >= top:
+        return None
+
+    win = from_bounds(left, bottom, right, top, transform=src.transform)
+    col_off = max(int(np.floor(win.col_off)), 0)
+    row_off = max(int(np.floor(win.row_off)), 0)
+    col_end = min(int(np.ceil(win.col_off + win.width)), src.width)
+    row_end = min(int(np.ceil(win.row_off + win.height)), src.height)
+    win = Window(col_off, row_off, max(col_end - col_off, 1), max(row_end - row_off, 1))
+
+    # Decimate the window proportionally to the visible fraction of the canvas
+    canvas_w, canvas_h = canvas_size
+    view_w = (right - left) / (xlim[1] - xlim[0]) * canvas_w
+    view_h = (top - bottom) / (ylim[1] - ylim[0]) * canvas_h
+    out_w = int(min(win.width, max(np.ceil(view_w), 1)))
+    out_h = int(min(win.height, max(np.ceil(view_h), 1)))
+
+    if band is not None:
+        # A view of the band, matplotlib only copies the decimated pixels
+        step = max(int(win.width // out_w), int(win.height // out_h), 1)
+        data = band[row_off:row_off + win.height:step, col_off:col_off + win.width:step]
+        win = Window(col_off, row_off, data.shape[1] * step, data.shape[0] * step)
+        out_w = data.shape[1]
+    else:
+        data = read_window_float(src, win, dtype='float32', out_shape=(out_h, out_w), resampling=Resampling.nearest)
+    w_left, w_bottom, w_right, w_top = window_bounds(win, src.transform)
+    return data, (w_left, w_right, w_bottom, w_top), (w_right - w_left) / out_w
 
 
 class RasterLineApp:
-    def __init__(self, raster_src=None, raster_path=None, fig=None, ax=None, point_interval=10):
+    def __init__(self, raster_src=None, raster_path=None, tile_dir=None, fig=None, ax=None, point_interval=10, viewport_display=True, interpolation='nearest', tile_cache=None,
+                 view=None, basemap=True, max_fps=60):
         os.system('cls' if os.name == 'nt' else 'clear')
         if raster_src:
             self.src = raster_src
         elif raster_path:
             self.raster_path = raster_path
             self.src = rasterio.open(self.raster_path, mode='r')
+        elif tile_dir:
+            self.src = TileCatalogue.scan(tile_dir)
 
         self.CRS = self.src.crs
         self.lines = []
+        # Columnar result of the last extraction, see sampling.extract_profiles
+        self.profiles = None
+        # Generated transects, drawn as one collection, see add_transects
+        self.transects = None
+        self._picked_transect = None
+        # Vertices while digitising a shoreline or a polyline, None when not digitising
+        self._digitising = None
+        self._digitise_target = None
+        self.shoreline = None
+        self._shoreline_artist = None
+        self._sketch_artist = None
         self.point_interval_max = point_interval
+        self.interpolation = interpolation
+        self.tile_cache = tile_cache if tile_cache is not None else TileCache.from_config()
         print(f'Max interval = {self.point_interval_max}')
         if fig is None and ax is None:
             self.fig, self.ax = plt.subplots(figsize=(10, 10))
@@ -50,6 +153,28 @@ class RasterLineApp:
         self._pan_start = None
         self._orig_xlim = None
         self._orig_ylim = None
+        # When True only the visible window is read, decimated to the canvas size, otherwise
+        # the whole band is read once. A tile catalogue has no single band to read
+        self.viewport_display = viewport_display or isinstance(self.src, TileCatalogue)
+        self.raster_im = None
+        self._view_bounds = None
+        self._view_res = None
+        # Data prepared by a background loader, see read_view and tile_cache.basemap_image
+        self._preloaded_view = view
+        self.draw_basemap = basemap
+        self._cids = []
+        # Rendering: the raster layers are cached as a pixel background and the overlay
+        # artists (lines, labels, selection) are blitted on top of it, at most max_fps times
+        # per second. See _request_frame.
+        self._overlays = []
+        self._background = None
+        self._background_limits = None
+        self._frame_interval = 1 / max_fps
+        self._last_frame = 0
+        self._pending_frame = None
+        self._frame_timer = self.fig.canvas.new_timer()
+        self._frame_timer.single_shot = True
+        self._frame_timer.add_callback(self._render_frame)
 
         self._setup_raster()
         self._setup_plot()
@@ -58,83 +183,193 @@ class RasterLineApp:
     def _setup_raster(self):
         bounds = self.src.bounds
         self.extent = [bounds.left, bounds.right, bounds.bottom, bounds.top]
-        self.data = self.src.read(1, resampling=Resampling.nearest)
-        if self.src.nodata is not None:
-            self.data = np.ma.masked_equal(self.data, self.src.nodata)
-        else:
-            self.data = np.ma.masked_invalid(self.data)
+        self.overviews = self.src.overviews(1)
+        print(f'Raster size = {self.src.width}x{self.src.height}, overviews = {self.overviews}')
+        # With viewport_display off the band is kept in memory and views are sliced from it
+        self.band = None if self.viewport_display else read_band(self.src)
+
+    def _canvas_shape(self):
+        """ Size of the axes on screen in pixels (width, height) """
+        return canvas_shape(self.ax)
+
+    def _read_view(self):
+        """ Load the window under the current axes limits, False when the view misses the raster """
+        view = read_view(self.src, self.ax.get_xlim(), self.ax.get_ylim(), self._canvas_shape(), band=self.band)
+        if view is None:
+            return False
+        self.data, self._view_bounds, self._view_res = view
+        return True
+
+    def _view_needs_update(self):
+        """ True when the axes show area or detail that is not in the loaded window """
+        if self._view_bounds is None:
+            return True
+        xlim = sorted(self.ax.get_xlim())
+        ylim = sorted(self.ax.get_ylim())
+        left, right, bottom, top = self._view_bounds
+        # Only the part of the view that overlaps the raster needs to be loaded
+        if (max(xlim[0], self.extent[0]) < left or min(xlim[1], self.extent[1]) > right or
+                max(ylim[0], self.extent[2]) < bottom or min(ylim[1], self.extent[3]) > top):
+            return True
+        canvas_w, _ = self._canvas_shape()
+        screen_res = (xlim[1] - xlim[0]) / canvas_w
+        native_res = self.src.res[0]
+        return self._view_res > max(screen_res, native_res) * 1.01
+
+    def update_view(self, force=False):
+        """ Re-read the visible window of the raster and refresh the image """
+        if self.raster_im is None:
+            return
+        if not force and not self._view_needs_update():
+            return
+        if self._read_view():
+            self.raster_im.set_data(self.data)
+            self.raster_im.set_extent(self._view_bounds)
+            self.raster_im.set_visible(True)
 
     def _setup_plot(self):
-        self.ax.set_xlim(self.extent[0] - 1000, self.extent[1] + 1000)
-        self.ax.set_ylim(self.extent[2] - 1000, self.extent[3] + 1000)
-        ctx.add_basemap(self.ax, crs=self.CRS, zoom="auto", source=ctx.providers.Esri.WorldImagery, alpha=0.5)
-        im = self.ax.imshow(
+        xlim, ylim = initial_limits(self.extent)
+        self.ax.set_xlim(*xlim)
+        self.ax.set_ylim(*ylim)
+        if self.draw_basemap:
+            add_basemap(self.ax, self.CRS, self.tile_cache, source=ctx.providers.Esri.WorldImagery, gray=True, alpha=0.5)
+        if self._preloaded_view is not None:
+            self.data, self._view_bounds, self._view_res = self._preloaded_view
+            self._preloaded_view = None
+        else:
+            self._read_view()
+        self.raster_im = self.ax.imshow(
             self.data,
-            extent=self.extent,
+            extent=self._view_bounds,
             cmap='viridis',
             origin='upper',
             alpha=0.8
         )
-        # Convert basemap to grayscale if needed
-        for im in self.ax.get_images():
-            arr = im.get_array()
-            if arr.ndim == 3 and arr.shape[2] == 4:  # Select only the basemap
-                gray = np.dot(arr[..., :3], [0.2989, 0.5870, 0.1140])
-                im.set_data(gray)
-                im.set_cmap('gray')
+        # Keep the colour scale of the full extent when zooming in
+        if np.isfinite(self.data).any():
+            self.raster_im.set_clim(np.nanmin(self.data), np.nanmax(self.data))
         self.ax.set_xlabel('Easting [m]')
         self.ax.set_ylabel('Northing [m]')
 
+    def show_basemap(self, img, extent):
+        """ Add a basemap prepared with tile_cache.basemap_image """
+        show_basemap(self.ax, img, extent, alpha=0.5)
+
 
     def _connect_events(self):
-        self.fig.canvas.mpl_connect('button_press_event', self.on_click)
-        self.fig.canvas.mpl_connect('pick_event', self.on_pick)
-        self.fig.canvas.mpl_connect('key_press_event', self.on_key)
-        self.fig.canvas.mpl_connect('scroll_event',self.zoom_fun)
-        self.fig.canvas.mpl_connect('button_press_event', self.on_pan_press)
-        self.fig.canvas.mpl_connect('motion_notify_event', self.on_pan_motion)
-        self.fig.canvas.mpl_connect('button_release_event', self.on_pan_release)
+        self._cids = [
+            self.fig.canvas.mpl_connect('button_press_event', self.on_click),
+            self.fig.canvas.mpl_connect('pick_event', self.on_pick),
+            self.fig.canvas.mpl_connect('key_press_event', self.on_key),
+            self.fig.canvas.mpl_connect('scroll_event',self.zoom_fun),
+            self.fig.canvas.mpl_connect('button_press_event', self.on_pan_press),
+            self.fig.canvas.mpl_connect('motion_notify_event', self.on_pan_motion),
+            self.fig.canvas.mpl_connect('button_release_event', self.on_pan_release),
+            self.fig.canvas.mpl_connect('draw_event', self._on_draw),
+        ]
+
+    def disconnect(self):
+        """ Stop handling canvas events, used when the figure is reused for another raster """
+        for cid in self._cids:
+            self.fig.canvas.mpl_disconnect(cid)
+        self._cids = []
+        self._frame_timer.stop()
+
+    def extraction_lines(self, verbose=True):
+        """ The drawn lines and the generated transects as a list of (label, xy) """
+        lines = [(line[1].get_text(), line[0].get_xydata()) for line in self.lines]
+        if verbose:
+            for label, xy in lines:
+                (x0, y0), (x1, y1) = xy[0], xy[-1]
+                print(f"Line {label} from ({x0:.2f}, {y0:.2f}) to ({x1:.2f}, {y1:.2f}), Distance = {np.hypot(x1 - x0, y1 - y0)}")
+        if self.transects is not None:
+            t = self.transects
+            lines += list(zip(t['labels'], np.stack([t['starts'], t['ends']], axis=1)))
+            if verbose:
+                print(f"{len(t['labels'])} generated transects")
+        return lines
 
     def extract_gdf(self):
-        gdf_points = []
-        if len(self.lines)<1:
+        if len(self.lines)<1 and self.transects is None:
             print("no lines")
             return 0
-        
-        for line in self.lines:
-            label = line[1].get_text()
-            xy = line[0].get_xydata()
-            x0, y0 = xy[0]
-            x1, y1 = xy[1]
-            dist = np.hypot(x1 - x0, y1 - y0)
-            point_interval = min(np.round(dist/10, 1), self.point_interval_max)
-            print(f'{point_interval=}')
-            num_points = int(np.floor(dist)/point_interval) + 1
-            xs = np.linspace(x0, x1, num_points)
-            ys = np.linspace(y0, y1, num_points)
-            points = list(zip(xs, ys))
-            print(f"Line {label} from ({x0:.2f}, {y0:.2f}) to ({x1:.2f}, {y1:.2f}), {len(points)} points, Distance = {dist}")
-            for pt in points:
-                gdf_points.append({'label': label, 'geometry': Point(pt)})
-        gdf = gpd.GeoDataFrame(gdf_points, crs=self.CRS)
-        no_data = self.src.nodata
-        coord_list = [(x, y) for x, y in zip(gdf["geometry"].x, gdf["geometry"].y)]
-        gdf["value"] = [x[0] if x[0] != no_data else np.nan for x in self.src.sample(coord_list)]
+
+        lines = self.extraction_lines()
+        self.profiles = extract_profiles(self.src, lines, self.point_interval_max, method=self.interpolation)
+        gdf = profiles_to_gdf(self.profiles, self.CRS)
         print(gdf.head())
-        return gdf    
-        
+        return gdf
+
+    def export_xbeach(self, out_dir, progress=None):
+        """
+        Write every line and transect as an XBeach-G profile (x.grd, bed.dep) under out_dir.
+        The profiles are extracted and written in chunks, see xbeach_export.export_profiles.
+        """
+        lines = self.extraction_lines(verbose=False)
+        if not lines:
+            print("no lines")
+            return None
+        return export_profiles(self.src, lines, out_dir, self.point_interval_max, method=self.interpolation,
+                               progress=progress)
+
+    def get_state(self):
+        """ Lines, shoreline and transects as named arrays, e.g. to save them in a project """
+        state = {}
+        if self.lines:
+            xy = [line[0].get_xydata() for line in self.lines]
+            state['line_labels'] = np.array([line[1].get_text() for line in self.lines], dtype=str)
+            state['line_counts'] = np.array([len(v) for v in xy])
+            state['line_vertices'] = np.concatenate(xy)
+        if self.shoreline is not None:
+            state['shoreline'] = self.shoreline
+        if self.transects is not None:
+            state['transect_labels'] = np.asarray(self.transects['labels'], dtype=str)
+            state['transect_starts'] = self.transects['starts']
+            state['transect_ends'] = self.transects['ends']
+        return state
+
+    def set_state(self, state):
+        """ Draw the lines, shoreline and transects of get_state """
+        if 'line_labels' in state:
+            vertices = np.split(state['line_vertices'], np.cumsum(state['line_counts'])[:-1])
+            for label, xy in zip(state['line_labels'], vertices):
+                self.add_polyline(str(label), xy)
+        if 'shoreline' in state:
+            self.set_shoreline(state['shoreline'])
+        if 'transect_labels' in state:
+            self.add_transects([str(label) for label in state['transect_labels']],
+                               state['transect_starts'], state['transect_ends'])
+
+    def selected_label(self):
+        """ Label of the picked line or transect, None when nothing is picked """
+        picked = getattr(self.ax, 'picked_object', None)
+        if picked is None:
+            return None
+        if self.transects is not None and picked is self.transects['collection']:
+            return self.transects['labels'][self._picked_transect]
+        for line in self.lines:
+            if picked in line:
+                return line[1].get_text()
+        return None
+
     def draw_line_advanced(self, label, startx, starty, endx, endy):
-        x = [startx, endx]
-        y = [starty, endy]
-        line = self.ax.plot(x, y, '-r', picker=5)
-        scatter1 = self.ax.scatter(startx, starty, color='red', s=50)
-        scatter2 = self.ax.scatter(endx, endy, color='red', s=50, marker='X')
-        mid_x = (x[0] + x[1]) / 2
-        mid_y = (y[0] + y[1]) / 2
+        self.add_polyline(label, [(startx, starty), (endx, endy)])
+
+    def add_polyline(self, label, xy):
+        """ Add an extraction line through any number of vertices """
+        xy = np.asarray(xy, dtype=float)
+        line = self.ax.plot(xy[:, 0], xy[:, 1], '-r', picker=5)
+        scatter1 = self.ax.scatter(xy[0, 0], xy[0, 1], color='red', s=50)
+        scatter2 = self.ax.scatter(xy[-1, 0], xy[-1, 1], color='red', s=50, marker='X')
+        # Label at half the length of the line
+        s = arc_length(xy)
+        mid_x = np.interp(s[-1] / 2, s, xy[:, 0])
+        mid_y = np.interp(s[-1] / 2, s, xy[:, 1])
         label_text = self.ax.text(mid_x, mid_y, label, fontsize=9, color='blue', fontweight='bold',
                                   bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
-        self.ax.figure.canvas.draw()
         self.lines.append([line[0], label_text, scatter1, scatter2])
+        self._add_overlay(*self.lines[-1])
+        self._request_frame('blit')
 
     def draw_line(self, startx, starty):
         xy = plt.ginput(1)
@@ -151,19 +386,225 @@ class RasterLineApp:
             if startX and startY and endX and endY:
                 self.draw_line_advanced(name, startX, startY, endX, endY)
     
+    def start_shoreline(self):
+        """ Start digitising a shoreline, every single left click adds a vertex """
+        self._digitising = []
+        self._digitise_target = 'shoreline'
+        self._draw_sketch()
+
+    def finish_shoreline(self):
+        """ Stop digitising and keep the shoreline, returns its vertices """
+        if self._digitise_target == 'shoreline':
+            if len(self._digitising) > 1:
+                self.shoreline = np.array(self._digitising)
+            self._digitising = None
+            self._digitise_target = None
+        return self.shoreline
+
+    def set_shoreline(self, xy):
+        self._digitising = None
+        self._digitise_target = None
+        self.shoreline = np.asarray(xy, dtype=float)[:, :2]
+        self._draw_shoreline(self.shoreline)
+        self._request_frame('blit')
+
+    def start_polyline(self):
+        """ Start digitising a multi-vertex extraction line, every single left click adds a vertex """
+        self._digitising = []
+        self._digitise_target = 'polyline'
+        self._draw_sketch()
+
+    def finish_polyline(self, label=None):
+        """ Stop digitising and add the polyline as an extraction line, returns its label """
+        if self._digitise_target != 'polyline':
+            return None
+        xy = np.array(self._digitising)
+        self._digitising = None
+        self._digitise_target = None
+        self._sketch_artist.set_data([], [])
+        if len(xy) < 2:
+            self._request_frame('blit')
+            return None
+        label = label or f'P{len(self.lines)+1}'
+        self.add_polyline(label, xy)
+        return label
+
+    def _draw_sketch(self):
+        xy = np.array(self._digitising).reshape(-1, 2)
+        if self._digitise_target == 'shoreline':
+            self._draw_shoreline(xy)
+            return
+        if self._sketch_artist is None:
+            self._sketch_artist = self._add_overlay(self.ax.plot([], [], '--r', marker='.')[0])
+        self._sketch_artist.set_data(xy[:, 0], xy[:, 1])
+
+    def _draw_shoreline(self, xy):
+        if self._shoreline_artist is None:
+            self._shoreline_artist = self._add_overlay(self.ax.plot([], [], '-c', lw=2, marker='.')[0])
+        self._shoreline_artist.set_data(xy[:, 0], xy[:, 1])
+
+    def generate_transects(self, spacing, offshore, onshore, smoothing=0, sea_side='left'):
+        """ Replace the generated transects with shore normals of the current shoreline """
+        if self.shoreline is None:
+            print("no shoreline")
+            return 0
+        labels, starts, ends, _ = shore_normal_transects(self.shoreline, spacing, offshore, onshore,
+                                                         smoothing=smoothing, sea_side=sea_side)
+        self.add_transects(labels, starts, ends)
+        print(f'{len(labels)} transects every {spacing}m')
+        return len(labels)
+
+    def add_transects(self, labels, starts, ends):
+        """
+        Show many transects at once. They are drawn as one LineCollection and two scatter
+        artists for the start and end markers, instead of one set of artists per line.
+        """
+        self.clear_transects()
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        collection = LineCollection(np.stack([starts, ends], axis=1), colors='r', picker=5)
+        self.ax.add_collection(collection, autolim=False)
+        self.transects = {
+            'labels': np.asarray(labels, dtype=object),
+            'starts': starts,
+            'ends': ends,
+            'collection': collection,
+            'start_markers': self.ax.scatter(starts[:, 0], starts[:, 1], color='red', s=20),
+            'end_markers': self.ax.scatter(ends[:, 0], ends[:, 1], color='red', s=20, marker='X'),
+            'label_text': self.ax.text(0, 0, '', fontsize=9, color='blue', fontweight='bold', visible=False,
+                                       bbox=dict(facecolor='white', alpha=0.7, edgecolor='none')),
+        }
+        self._add_overlay(*(self.transects[k] for k in ('collection', 'start_markers', 'end_markers', 'label_text')))
+        self._request_frame('blit')
+
+    def clear_transects(self):
+        if self.transects is not None:
+            for key in ('collection', 'start_markers', 'end_markers', 'label_text'):
+                self._remove_overlay(self.transects[key])
+            self.transects = None
+            self.ax.picked_object = None
+
+    def _delete_transects(self, ind):
+        t = self.transects
+        keep = np.ones(len(t['labels']), dtype=bool)
+        keep[ind] = False
+        if not keep.any():
+            self.clear_transects()
+            return
+        for key in ('labels', 'starts', 'ends'):
+            t[key] = t[key][keep]
+        t['collection'].set_segments(np.stack([t['starts'], t['ends']], axis=1))
+        t['collection'].set_color('r')
+        t['start_markers'].set_offsets(t['starts'])
+        t['end_markers'].set_offsets(t['ends'])
+        t['label_text'].set_visible(False)
+
     def delete_selected(self):
         ax = self.ax
+        if self.transects is not None and getattr(ax, 'picked_object', None) is self.transects['collection']:
+            self._delete_transects(self._picked_transect)
+            ax.picked_object = None
+            self._request_frame('blit')
+            return
         if hasattr(ax, 'picked_object') and ax.picked_object:
-            ax.picked_object.remove()
             for line in self.lines:
                 if ax.picked_object in line:
-                    line[1].remove()
-                    line[2].remove()
-                    line[3].remove()
+                    for artist in line:
+                        self._remove_overlay(artist)
                     self.lines.remove(line)
                     break
             ax.picked_object = None
-            ax.figure.canvas.draw()
+            self._request_frame('blit')
+
+    # Rendering
+    def _add_overlay(self, *artists):
+        """ Draw the artists by blitting, they are left out of the cached background """
+        for artist in artists:
+            artist.set_animated(True)
+            self._overlays.append(artist)
+        return artists[0]
+
+    def _remove_overlay(self, artist):
+        artist.remove()
+        if artist in self._overlays:
+            self._overlays.remove(artist)
+
+    def _draw_overlays(self):
+        for artist in self._overlays:
+            self.ax.draw_artist(artist)
+
+    def _on_draw(self, event):
+        """ After every full draw, keep the raster layers as background and add the overlays """
+        self._background = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        self._background_limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        self._draw_overlays()
+
+    def _request_frame(self, kind):
+        """
+        Ask for a redraw, bursts of requests are merged into one frame per frame interval.
+        'blit' redraws the overlays on the cached background, shifted when the view was panned.
+        'full' re-renders everything, needed after zooming and when the view was re-read.
+        """
+        if self._pending_frame != 'full':
+            self._pending_frame = kind
+        wait = self._last_frame + self._frame_interval - time.perf_counter()
+        if wait <= 0:
+            self._frame_timer.stop()
+            self._render_frame()
+        else:
+            self._frame_timer.interval = int(wait * 1000) + 1
+            self._frame_timer.start()
+
+    def _render_frame(self):
+        kind = self._pending_frame
+        self._pending_frame = None
+        if kind is None:
+            return
+        self._last_frame = time.perf_counter()
+        if kind == 'blit' and self._blit_frame():
+            return
+        self.update_view()
+        self.fig.canvas.draw()
+
+    def _blit_frame(self):
+        """
+        Restore the cached background, shifted by the pan since it was captured, and draw the
+        overlays over it. Returns False when a full draw is needed instead: nothing cached
+        yet, the scale changed, or the pan exposed too much of the view.
+        """
+        if self._background is None:
+            return False
+        (bx, by) = self._background_limits
+        xlim = self.ax.get_xlim()
+        ylim = self.ax.get_ylim()
+        if not (np.isclose(xlim[1] - xlim[0], bx[1] - bx[0]) and np.isclose(ylim[1] - ylim[0], by[1] - by[0])):
+            return False
+        bbox = self.ax.bbox
+        # Shift in display pixels, y up
+        sx = int(round((bx[0] - xlim[0]) / (bx[1] - bx[0]) * bbox.width))
+        sy = int(round((by[0] - ylim[0]) / (by[1] - by[0]) * bbox.height))
+        if abs(sx) > bbox.width / 4 or abs(sy) > bbox.height / 4:
+            return False
+
+        canvas = self.fig.canvas
+        if sx == 0 and sy == 0:
+            canvas.restore_region(self._background)
+        else:
+            # Clear the axes, then paste the part of the background that is still in view.
+            # Region coordinates are image pixels, y down
+            self.ax.draw_artist(self.ax.patch)
+            x1, y1, x2, y2 = self._background.get_extents()
+            iy = -sy
+            src = (x1 + max(-sx, 0), y1 + max(-iy, 0), x2 - max(sx, 0), y2 - max(iy, 0))
+            canvas.restore_region(self._background, bbox=src, xy=(src[0] + sx, src[1] + iy))
+        self._draw_overlays()
+        canvas.blit(bbox)
+        return True
+
+    def refresh(self):
+        """ Full redraw, e.g. after a layer was added from outside """
+        self._request_frame('full')
+
     # Event handling
     def on_pan_press(self, event):
         if event.button == 3 and event.inaxes == self.ax:
@@ -179,12 +620,14 @@ class RasterLineApp:
                 ylim = self.ax.get_ylim()
                 self.ax.set_xlim(xlim[0] - dx, xlim[1] - dx)
                 self.ax.set_ylim(ylim[0] - dy, ylim[1] - dy)
-                self.fig.canvas.draw_idle()
+                # The view is re-read when the pan is released or moves too far
+                self._request_frame('blit')
 
     def on_pan_release(self, event):
         if self._is_panning:
             self._is_panning = False
             self._pan_start = None
+            self._request_frame('full')
 
     def zoom_fun(self, event):
         # get the current x and y limits
@@ -209,9 +652,16 @@ class RasterLineApp:
                      xdata + cur_xrange*scale_factor])
         self.ax.set_ylim([ydata - cur_yrange*scale_factor,
                      ydata + cur_yrange*scale_factor])
-        plt.draw() # force re-draw
+        # Scroll bursts are merged into one re-read and redraw per frame
+        self._request_frame('full')
 
     def on_click(self, event):
+        if self._digitising is not None:
+            if event.button == 1 and not event.dblclick and event.inaxes == self.ax:
+                self._digitising.append((event.xdata, event.ydata))
+                self._draw_sketch()
+                self._request_frame('blit')
+            return
         if event.dblclick:
             if event.button == 1:
                 self.draw_line(event.xdata, event.ydata)
@@ -219,13 +669,23 @@ class RasterLineApp:
     def on_pick(self, event):
         ax = self.ax
         if hasattr(ax, 'picked_object') and ax.picked_object is not None:
-            if isinstance(ax.picked_object, plt.Line2D):
+            if isinstance(ax.picked_object, (plt.Line2D, LineCollection)):
                 ax.picked_object.set_color('r')
         this_artist = event.artist
         if isinstance(this_artist, plt.Line2D):
             this_artist.set_color('y')
+        elif self.transects is not None and this_artist is self.transects['collection']:
+            # Highlight the first transect under the cursor and show its label
+            t = self.transects
+            self._picked_transect = event.ind[0]
+            colors = np.full((len(t['labels']), 4), (1.0, 0, 0, 1))
+            colors[self._picked_transect] = (1.0, 1.0, 0, 1)
+            this_artist.set_color(colors)
+            t['label_text'].set_position((t['starts'][self._picked_transect] + t['ends'][self._picked_transect]) / 2)
+            t['label_text'].set_text(t['labels'][self._picked_transect])
+            t['label_text'].set_visible(True)
         ax.picked_object = this_artist
-        ax.figure.canvas.draw_idle()
+        self._request_frame('blit')
 
     def on_key(self, event):
         ax = self.ax
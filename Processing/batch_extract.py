@@ -0,0 +1,151 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import rasterio
+
+from Processing.sampling import INTERPOLATION_METHODS, PROFILE_COLUMNS, extract_profiles
+from Processing.xbeach_export import ProfileSetWriter
+
+# Raster handle of the current worker process, opened once by _init_worker
+_worker_src = None
+
+
+def read_lines(path):
+    """
+    Read extraction lines from a file.
+    CSV files either hold one line per row (label, x0, y0, x1, y1) or one vertex per
+    row (label, x, y), in which case consecutive rows with the same label form a line.
+    Any other format is read with geopandas (GeoPackage, shapefile, ...), using the
+    'label' or 'name' attribute if present.
+    Returns a list of (label, xy) with xy an (n, 2) array.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        df = pd.read_csv(path)
+        df.columns = [c.strip().lower() for c in df.columns]
+        if {'x0', 'y0', 'x1', 'y1'}.issubset(df.columns):
+            labels = df['label'].astype(str) if 'label' in df else pd.Series(np.arange(1, len(df) + 1)).map('P{}'.format)
+            coords = df[['x0', 'y0', 'x1', 'y1']].to_numpy(dtype=float).reshape(-1, 2, 2)
+            return list(zip(labels, coords))
+        if {'label', 'x', 'y'}.issubset(df.columns):
+            # A label used again further down starts another line
+            runs = (df['label'] != df['label'].shift()).cumsum()
+            return [(str(group['label'].iloc[0]), group[['x', 'y']].to_numpy(dtype=float))
+                    for _, group in df.groupby(runs, sort=False)]
+        raise ValueError(f"{path.name}: expected columns label,x0,y0,x1,y1 or label,x,y")
+
+    import geopandas as gpd
+    gdf = gpd.read_file(path)
+    label_col = next((c for c in gdf.columns if c.lower() in ('label', 'name')), None)
+    lines = []
+    for i, geom in enumerate(gdf.geometry):
+        if geom is None or geom.geom_type != 'LineString':
+            print(f'Skipping feature {i}: not a LineString')
+            continue
+        label = str(gdf[label_col].iloc[i]) if label_col else f'P{i + 1}'
+        lines.append((label, np.asarray(geom.coords)[:, :2]))
+    return lines
+
+
+def _init_worker(raster_path):
+    global _worker_src
+    _worker_src = rasterio.open(raster_path, mode='r')
+
+
+def _extract_chunk(args):
+    lines, point_interval_max, method = args
+    return extract_profiles(_worker_src, lines, point_interval_max, method=method)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def batch_extract(raster_path, lines, out_path, point_interval_max=10, method='nearest', workers=None, chunk_size=100,
+                  xbeach=False):
+    """
+    Extract the profiles of many lines in parallel and stream them to a CSV file.
+    lines is either a path accepted by read_lines or a list of (label, xy).
+    With xbeach=True out_path is a directory that receives one XBeach-G file set per
+    profile instead (see xbeach_export.ProfileSetWriter).
+    Every worker process opens its own handle on the raster. Chunks are written in the
+    order of the input lines as soon as they are ready, so only a few chunks are held in
+    memory at any time. Returns the number of samples written.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation '{method}', use one of {INTERPOLATION_METHODS}")
+    if isinstance(lines, (str, Path)):
+        lines = read_lines(lines)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    n_samples = 0
+    n_lines = 0
+    with (ProfileSetWriter(out_path) if xbeach else open(out_path, 'w', newline='')) as f, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(raster_path),)) as pool:
+        if not xbeach:
+            f.write(','.join(PROFILE_COLUMNS) + '\n')
+        pending = deque()
+        chunks = _chunks(lines, chunk_size)
+        while True:
+            # Keep two tasks per worker in flight, results are written in submission order
+            for chunk in chunks:
+                pending.append(pool.submit(_extract_chunk, (chunk, point_interval_max, method)))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            profiles = pending.popleft().result()
+            if xbeach:
+                f.write(profiles)
+            else:
+                pd.DataFrame(profiles, columns=PROFILE_COLUMNS).to_csv(f, header=False, index=False, float_format='%.3f')
+            n_samples += len(profiles['z'])
+            n_lines = min(n_lines + chunk_size, len(lines))
+            print(f'{n_lines}/{len(lines)} lines extracted', end='\r')
+    print(f'\n{n_lines} lines, {n_samples} samples in {time.perf_counter() - start:.1f}s -> {out_path}')
+    return n_samples
+
+
+def main(argv=None):
+    """ Command line entry point, run from the repository root with `python -m Processing.batch_extract` """
+    parser = argparse.ArgumentParser(description='Extract cross-shore profiles from a DEM without the GUI.')
+    parser.add_argument('raster', help='GeoTIFF to sample')
+    parser.add_argument('lines', help='CSV, GeoPackage or shapefile with the extraction lines')
+    parser.add_argument('output', help='CSV file for the extracted profiles, or a directory with --xbeach')
+    parser.add_argument('--interval', type=float, default=10, help='Max point interval in metres (default: 10)')
+    parser.add_argument('--method', choices=INTERPOLATION_METHODS, default='nearest', help='Interpolation (default: nearest)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=100, help='Lines per task (default: 100)')
+    parser.add_argument('--xbeach', action='store_true', help='Write one XBeach-G x.grd/bed.dep set per profile')
+    args = parser.parse_args(argv)
+    batch_extract(args.raster, args.lines, args.output, point_interval_max=args.interval, method=args.method,
+                  workers=args.workers, chunk_size=args.chunk_size, xbeach=args.xbeach)
+
+
+if __name__ == "__main__":
+    main()
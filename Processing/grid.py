@@ -0,0 +1,133 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+from Processing.xbeach_export import write_profile_files
+
+G = 9.81
+# Samples of the profile per smallest cell when the cell sizes are evaluated
+SAMPLES_PER_CELL = 4
+MAX_SAMPLES = 4_000_000
+# Grids with more cells are refused, XBeach-G runs on them would not be practical anyway
+MAX_CELLS = 1_000_000
+
+# Orientation setting of build_grid, see offshore_first
+ORIENTATIONS = {'Auto': None, 'Offshore at start': True, 'Offshore at end': False}
+# Criterion: (labels of its parameters, defaults), in the order of the UI
+CRITERIA = {
+    'Uniform': ((), ()),
+    'Depth': (('Cells per m depth',), (1.0,)),
+    'Wavelength': (('Period (s)', 'Points per wavelength'), (10.0, 50.0)),
+    'Courant': (('Time step (s)', 'Courant number'), (0.01, 0.7)),
+}
+
+
+def wavelength(depth, period):
+    """ Linear wavelength for a depth, with the explicit approximation of Fenton & McKee (1990) """
+    l0 = G * period**2 / (2 * np.pi)
+    return l0 * np.tanh((2 * np.pi * np.sqrt(depth / G) / period)**1.5)**(2 / 3)
+
+
+def cell_sizes(depth, criterion, dx_min, dx_max, a=None, b=None):
+    """
+    Target cell size for every depth (m, water level minus bed, negative on land).
+    Dry samples get dx_min, every size is clipped to [dx_min, dx_max]. A uniform grid
+    has dx_max everywhere, wet or dry.
+    """
+    wet = np.maximum(depth, 0)
+    if criterion == 'Uniform':
+        return np.full(len(depth), float(dx_max))
+    if criterion == 'Depth':
+        dx = wet / a
+    elif criterion == 'Wavelength':
+        dx = wavelength(wet, a) / b
+    elif criterion == 'Courant':
+        dx = np.sqrt(G * wet) * a / b
+    else:
+        raise ValueError(f'Unknown grid criterion {criterion}')
+    dx = np.where(depth > 0, dx, dx_min)
+    return np.clip(dx, dx_min, dx_max)
+
+
+def limit_growth(s, dx, ratio):
+    """
+    Smallest cell sizes not larger than dx that grow by at most ratio from a cell to the
+    next one, i.e. dx changes at most (ratio - 1) per unit of length, in both directions.
+    Two running minima over the samples, no loop.
+    """
+    k = ratio - 1
+    forward = np.minimum.accumulate(dx - k * s) + k * s
+    backward = (np.minimum.accumulate((dx + k * s)[::-1]) - k * s[::-1])[::-1]
+    return np.minimum(forward, backward)
+
+
+def build_grid(chainage, z, dx_min, dx_max, criterion='Depth', a=None, b=None, water_level=0.0,
+               max_ratio=1.05, offshore_first=None):
+    """
+    Variable cross-shore grid of a profile. The target cell size is evaluated on a fine
+    resampling of the profile and the node positions come from the cumulative number of
+    cells along it, the integral of 1 / dx, so the whole grid is a few array operations.
+    XBeach-G expects the offshore boundary at the first node: profiles that start on land
+    are reversed, unless offshore_first says otherwise.
+    Returns the nodes (from 0), the bed levels interpolated on them, the cell sizes, and
+    the chainage of the nodes on the input profile.
+    """
+    chainage = np.asarray(chainage, dtype=float)
+    z = np.asarray(z, dtype=float)
+    valid = np.isfinite(chainage) & np.isfinite(z)
+    chainage, z = chainage[valid], z[valid]
+    order = np.argsort(chainage, kind='stable')
+    chainage, z = chainage[order], z[order]
+    if len(chainage) < 2 or chainage[-1] <= chainage[0]:
+        raise ValueError('The profile needs at least two points with different chainage')
+    if not 0 < dx_min <= dx_max:
+        raise ValueError('The cell sizes need 0 < min <= max')
+    if offshore_first is None:
+        offshore_first = z[0] <= z[-1]
+    first, last = chainage[0], chainage[-1]
+    if not offshore_first:
+        chainage, z = chainage[-1] - chainage[::-1], z[::-1]
+    chainage = chainage - chainage[0]
+    length = chainage[-1]
+
+    n_samples = int(min(max(length / dx_min * SAMPLES_PER_CELL, 2), MAX_SAMPLES)) + 1
+    s = np.linspace(0, length, n_samples)
+    dx = cell_sizes(water_level - np.interp(s, chainage, z), criterion, dx_min, dx_max, a, b)
+    dx = limit_growth(s, dx, max_ratio)
+    # Cumulative number of cells, made whole by spreading the remainder over the grid
+    cells = np.concatenate([[0], np.cumsum(np.diff(s) * 2 / (dx[1:] + dx[:-1]))])
+    if cells[-1] > MAX_CELLS:
+        raise ValueError(f'The grid would have {cells[-1]:.3g} cells, more than {MAX_CELLS}. '
+                         'Increase the min cell size')
+    # Relative tolerance for the rounding of the sum over the samples
+    n = max(int(np.ceil(cells[-1] * (1 - 1e-7))), 1)
+    x = np.interp(np.linspace(0, cells[-1], n + 1), cells, s)
+    x[-1] = length
+    return x, np.interp(x, chainage, z), np.diff(x), first + x if offshore_first else last - x
+
+
+def grid_from_settings(chainage, z, settings):
+    """ build_grid with the settings of the Grid panel (see GridPanel.settings) """
+    return build_grid(chainage, z, settings['dx_min'], settings['dx_max'], settings['criterion'],
+                      settings.get('a'), settings.get('b'), settings.get('water_level', 0.0),
+                      settings.get('max_ratio', 1.05), ORIENTATIONS[settings.get('orientation', 'Auto')])
+
+
+def write_grid(directory, x, z, fmt='%.4f'):
+    """ Write a grid as the XBeach-G inputs x.grd and bed.dep """
+    write_profile_files(directory, x, z, fmt=fmt)
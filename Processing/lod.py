@@ -0,0 +1,158 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+# Samples merged into one bucket from a level of the pyramid to the next
+FANOUT = 8
+
+
+def _reduce(values, ufunc):
+    """ ufunc over consecutive groups of FANOUT values, the last group may be shorter """
+    pad = -len(values) % FANOUT
+    if pad:
+        fill = {np.fmin: np.nan, np.fmax: np.nan, np.add: 0}[ufunc]
+        values = np.concatenate([values, np.full(pad, fill)])
+    return ufunc.reduce(values.reshape(-1, FANOUT), axis=1)
+
+
+class SeriesPyramid:
+    """
+    Multi-resolution summary of a time series with increasing x, for plotting and window
+    statistics at any zoom.
+    Level 0 is the series itself and every level above merges FANOUT buckets of the one
+    below, keeping their min, max, sum, count and the duration they cover, so the whole
+    pyramid is about 1/7 of the series. NaN samples are ignored.
+    The duration of a sample is the time to the next sample.
+    """
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(self.x) > 1 and not np.all(self.x[1:] >= self.x[:-1]):
+            raise ValueError('The series needs increasing x')
+        valid = ~np.isnan(y)
+        # Samples without a value do not count in the durations
+        dt = np.where(valid, np.append(np.diff(self.x), 0), 0)
+        self.levels = [{'min': y, 'max': y, 'sum': np.where(valid, y, 0), 'count': valid.astype(float),
+                        'dt': dt}]
+        while len(self.levels[-1]['min']) > 1:
+            below = self.levels[-1]
+            self.levels.append({'min': _reduce(below['min'], np.fmin), 'max': _reduce(below['max'], np.fmax),
+                                'sum': _reduce(below['sum'], np.add), 'count': _reduce(below['count'], np.add),
+                                'dt': _reduce(below['dt'], np.add)})
+
+    def __len__(self):
+        return len(self.x)
+
+    def index_range(self, x0, x1):
+        """ Range [i0, i1) of the samples with x0 <= x <= x1 """
+        return int(np.searchsorted(self.x, x0, side='left')), int(np.searchsorted(self.x, x1, side='right'))
+
+    def query(self, x0, x1, max_points):
+        """
+        The series between x0 and x1 with at most about max_points points.
+        Returns every sample when they fit, otherwise the min and max of every bucket of the
+        finest level that fits, in order, so peaks stay visible. One sample on each side of
+        the range is kept so the curve reaches the edges of the view.
+        """
+        i0, i1 = self.index_range(x0, x1)
+        i0 = max(i0 - 1, 0)
+        i1 = min(i1 + 1, len(self.x))
+        if i1 - i0 <= max_points:
+            return self.x[i0:i1], self.levels[0]['min'][i0:i1]
+        level = 1
+        while (i1 - i0) / FANOUT**level > max_points / 2 and level < len(self.levels) - 1:
+            level += 1
+        size = FANOUT**level
+        b0 = i0 // size
+        b1 = -(-i1 // size)
+        lows = self.levels[level]['min'][b0:b1]
+        highs = self.levels[level]['max'][b0:b1]
+        starts = self.x[np.arange(b0, b1) * size]
+        ends = self.x[np.minimum(np.arange(b0 + 1, b1 + 1) * size, len(self.x)) - 1]
+        # Each bucket as its min then its max, spread over its time span
+        x = np.column_stack([starts, (starts + ends) / 2]).ravel()
+        y = np.column_stack([lows, highs]).ravel()
+        return x, y
+
+    def _cover(self, i0, i1):
+        """
+        Buckets covering the samples [i0, i1) exactly, as (level, first, last) ranges,
+        using the coarsest buckets that fit: at most 2 * (FANOUT - 1) ranges per level.
+        """
+        ranges = []
+        level = 0
+        while i0 < i1:
+            size = FANOUT**(level + 1)
+            # Finish the partial buckets of the next level on both sides at this level
+            a = min(-(-i0 // size) * size, i1)
+            b = max(i1 // size * size, a)
+            step = FANOUT**level
+            if a > i0:
+                ranges.append((level, i0 // step, a // step))
+            if i1 > b:
+                ranges.append((level, b // step, i1 // step))
+            i0, i1 = a, b
+            level += 1
+            if level == len(self.levels) - 1:
+                step = FANOUT**level
+                if i0 < i1:
+                    ranges.append((level, i0 // step, i1 // step))
+                break
+        return ranges
+
+    def stats(self, x0, x1, threshold=None):
+        """
+        Statistics of the samples between x0 and x1: peak, minimum, mean and, with a
+        threshold, the duration spent at or above it. Runs on whole buckets of the pyramid,
+        only the buckets that cross the threshold are opened down to the samples.
+        """
+        i0, i1 = self.index_range(x0, x1)
+        ranges = self._cover(i0, i1)
+        result = {'samples': i1 - i0, 'peak': np.nan, 'min': np.nan, 'mean': np.nan, 'duration_above': np.nan}
+        if not ranges:
+            return result
+        total = count = 0.0
+        peaks = []
+        lows = []
+        for level, a, b in ranges:
+            lv = self.levels[level]
+            peaks.append(np.fmax.reduce(lv['max'][a:b], initial=-np.inf))
+            lows.append(np.fmin.reduce(lv['min'][a:b], initial=np.inf))
+            total += lv['sum'][a:b].sum()
+            count += lv['count'][a:b].sum()
+        if count:
+            result.update(peak=max(peaks), min=min(lows), mean=total / count)
+        if threshold is not None:
+            result['duration_above'] = sum(self._duration_above(level, np.arange(a, b), threshold)
+                                           for level, a, b in ranges)
+        return result
+
+    def _duration_above(self, level, buckets, threshold):
+        duration = 0.0
+        while buckets.size:
+            lv = self.levels[level]
+            if level == 0:
+                return duration + lv['dt'][buckets][lv['min'][buckets] >= threshold].sum()
+            above = lv['min'][buckets] >= threshold
+            duration += lv['dt'][buckets[above]].sum()
+            crossing = buckets[~above & (lv['max'][buckets] >= threshold)]
+            # Children of the buckets that cross the threshold
+            children = (crossing[:, None] * FANOUT + np.arange(FANOUT)).ravel()
+            level -= 1
+            buckets = children[children < len(self.levels[level]['min'])]
+        return duration
@@ -0,0 +1,183 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Processing.sampling import INTERPOLATION_METHODS, points_at_chainage, sample_raster
+from Processing.xbeach_export import BED_FILE, GRID_FILE, INDEX_FILE, WRITE_BUFFER
+
+# Thickness of the erodible layer above the non-erodible one, the ne_layer file of XBeach-G
+NE_FILE = 'nebed.dep'
+# Thickness where the level of the non-erodible layer is unknown, i.e. no hard layer
+NO_LAYER_THICKNESS = 100.0
+SOURCES = ('Constant depth', 'Profile', 'Raster')
+
+
+def layer_thickness(z, ne_level, missing=NO_LAYER_THICKNESS):
+    """ Erodible thickness of a bed z above the non-erodible levels, 0 where the layer is exposed """
+    thickness = np.asarray(z, dtype=float) - ne_level
+    return np.maximum(np.where(np.isnan(thickness), missing, thickness), 0)
+
+
+def profile_levels(chainage, profile_chainage, profile_z):
+    """ Levels of a second profile (e.g. a surveyed revetment) at chainage, NaN outside of it """
+    profile_chainage = np.asarray(profile_chainage, dtype=float)
+    profile_z = np.asarray(profile_z, dtype=float)
+    valid = np.isfinite(profile_chainage) & np.isfinite(profile_z)
+    if valid.sum() < 2:
+        return np.full(len(chainage), np.nan)
+    order = np.argsort(profile_chainage[valid], kind='stable')
+    return np.interp(chainage, profile_chainage[valid][order], profile_z[valid][order], left=np.nan, right=np.nan)
+
+
+def raster_levels(src, lines_xy, line_id, chainage, method='bilinear'):
+    """
+    Levels of a raster (e.g. a bedrock DEM) at chainages along many lines at once,
+    with one windowed read per line as for the bathymetry.
+    """
+    x, y = points_at_chainage(lines_xy, line_id, chainage)
+    if hasattr(src, 'sample_points'):
+        return src.sample_points(x, y, method=method, groups=line_id)
+    return sample_raster(src, x, y, method=method, groups=line_id)
+
+
+def write_layer(directory, thickness, fmt='%.4f'):
+    """ Write the erodible thickness on the grid nodes next to x.grd and bed.dep """
+    with open(Path(directory).joinpath(NE_FILE), 'w', buffering=WRITE_BUFFER) as f:
+        np.savetxt(f, np.asarray(thickness)[None], fmt=fmt)
+
+
+def _read_row(path):
+    return np.loadtxt(path, ndmin=1)
+
+
+def _index_lines(index, lines):
+    """
+    Geometry of every profile (row) of an export index: the line of the same label when
+    lines are given, otherwise the straight line from the first to the last sample, whose
+    chainages then start at the first node. Lines sharing a label, exported to suffixed
+    directories, go to the rows whose first and last samples lie on them.
+    """
+    if lines is not None:
+        import shapely
+        by_label = {}
+        for label, xy in lines:
+            by_label.setdefault(str(label), []).append(np.asarray(xy, dtype=float))
+        missing = [label for label in index['label'] if label not in by_label]
+        if missing:
+            raise ValueError(f'No line for the profiles {", ".join(missing[:5])}')
+        geometry = []
+        for row in index.itertuples():
+            candidates = by_label[row.label]
+            if len(candidates) == 1:
+                geometry.append(candidates[0])
+                continue
+            ends = shapely.points([[row.x_start, row.y_start], [row.x_end, row.y_end]])
+            best = int(np.argmin([shapely.distance(shapely.linestrings(xy), ends).sum() for xy in candidates]))
+            # Every line goes to one directory
+            geometry.append(candidates.pop(best))
+        return geometry
+    start = index[['x_start', 'y_start']].to_numpy(dtype=float)
+    end = index[['x_end', 'y_end']].to_numpy(dtype=float)
+    return list(np.stack([start, end], axis=1))
+
+
+def batch_ne_layers(export_dir, depth=None, raster=None, profiles=None, lines=None, method='bilinear',
+                    chunk_size=500):
+    """
+    Write the non-erodible layer of every profile of an XBeach-G export folder (see
+    xbeach_export.ProfileSetWriter), next to its bed.dep.
+    The layer is either a constant depth below the bed, the levels of a raster (path), or
+    the levels of second profiles (a CSV with label, chainage and z columns, e.g. the
+    output of batch_extract on a bedrock DEM). Raster levels are sampled at the grid
+    nodes chunk_size profiles at a time. Returns the number of profiles written.
+    """
+    if sum(source is not None for source in (depth, raster, profiles)) != 1:
+        raise ValueError('Give exactly one of depth, raster or profiles')
+    export_dir = Path(export_dir)
+    index = pd.read_csv(export_dir.joinpath(INDEX_FILE), dtype={'label': str, 'directory': str})
+    if isinstance(lines, (str, Path)):
+        from Processing.batch_extract import read_lines
+        lines = read_lines(lines)
+    src = None
+    if raster is not None:
+        import rasterio
+        src = rasterio.open(raster, mode='r')
+        lines_xy = _index_lines(index, lines)
+    if profiles is not None:
+        table = pd.read_csv(profiles, dtype={'label': str})
+        table.columns = [c.strip().lower() for c in table.columns]
+        second = {label: (group['chainage'].to_numpy(dtype=float), group['z'].to_numpy(dtype=float))
+                  for label, group in table.groupby('label', sort=False)}
+
+    start = time.perf_counter()
+    written = 0
+    try:
+        for i in range(0, len(index), chunk_size):
+            chunk = index.iloc[i:i + chunk_size]
+            dirs = [export_dir.joinpath(name) for name in chunk['directory']]
+            chainages = [_read_row(d.joinpath(GRID_FILE)) for d in dirs]
+            beds = [_read_row(d.joinpath(BED_FILE)) for d in dirs]
+            if src is not None:
+                line_id = np.repeat(np.arange(len(dirs)), [len(c) for c in chainages])
+                along = np.concatenate([c if lines is not None else c - c[0] for c in chainages])
+                levels = raster_levels(src, lines_xy[i:i + chunk_size], line_id, along, method)
+                levels = np.split(levels, np.cumsum([len(c) for c in chainages])[:-1])
+            for j, (directory, label) in enumerate(zip(dirs, chunk['label'])):
+                if depth is not None:
+                    thickness = np.full(len(beds[j]), max(depth, 0.0))
+                elif src is not None:
+                    thickness = layer_thickness(beds[j], levels[j])
+                else:
+                    if label not in second:
+                        print(f'No second profile for {label}, the whole bed is left erodible')
+                    level = profile_levels(chainages[j], *second[label]) if label in second else np.nan
+                    thickness = layer_thickness(beds[j], level)
+                write_layer(directory, thickness)
+                written += 1
+            print(f'{written}/{len(index)} layers written', end='\r')
+    finally:
+        if src is not None:
+            src.close()
+    print(f'\n{written} non-erodible layers in {time.perf_counter() - start:.1f}s -> {export_dir}')
+    return written
+
+
+def main(argv=None):
+    """ Command line entry point, run from the repository root with `python -m Processing.nonerodible` """
+    parser = argparse.ArgumentParser(description='Write the non-erodible layer of exported XBeach-G profiles.')
+    parser.add_argument('export_dir', help='Folder written by batch_extract --xbeach or Export XBeach-G')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--depth', type=float, help='Constant thickness of the erodible layer in metres')
+    source.add_argument('--raster', help='GeoTIFF with the levels of the non-erodible layer')
+    source.add_argument('--profiles', help='CSV with label,chainage,z of the non-erodible layer')
+    parser.add_argument('--lines', help='Extraction lines of the export, needed for polylines with --raster')
+    parser.add_argument('--method', choices=INTERPOLATION_METHODS, default='bilinear',
+                        help='Interpolation (default: bilinear)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Profiles per raster read (default: 500)')
+    args = parser.parse_args(argv)
+    batch_ne_layers(args.export_dir, depth=args.depth, raster=args.raster, profiles=args.profiles, lines=args.lines,
+                    method=args.method, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
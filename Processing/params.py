@@ -0,0 +1,505 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PARAMS_FILE = 'params.txt'
+HEADER = 'XBeach-G parameter file written by xb-gui'
+
+# Kinds of parameter: 'int', 'float', 'choice' (a value of choices), 'file' (a file name
+# relative to the run folder), 'str' and 'list' (a count followed by one item per line,
+# e.g. nglobalvar = 2 then zb and zs)
+Param = namedtuple('Param', 'name kind default low high choices section help')
+
+
+def _p(name, kind, default, low=None, high=None, choices=None, section='', help=''):
+    return Param(name, kind, default, low, high, tuple(choices) if choices else None, section, help)
+
+
+# XBeach-G parameters edited by the GUI, in the order they are written. Other keywords
+# of a params.txt are kept as text.
+SCHEMA = [
+    _p('nx', 'int', 100, 1, None, section='Grid', help='Number of cells, nodes in x.grd minus 1'),
+    _p('ny', 'int', 0, 0, 0, section='Grid', help='0 for a 1D profile model'),
+    _p('vardx', 'choice', 1, choices=(0, 1), section='Grid', help='1 for a variable grid read from xfile'),
+    _p('xfile', 'file', 'x.grd', section='Grid', help='Cross-shore positions of the nodes'),
+    _p('depfile', 'file', 'bed.dep', section='Grid', help='Bed levels on the nodes'),
+    _p('posdwn', 'choice', -1, choices=(-1, 1), section='Grid', help='-1 when the bed levels are positive up'),
+    _p('nonh', 'choice', 1, choices=(0, 1), section='Model', help='Non-hydrostatic flow, needed by XBeach-G'),
+    _p('nonhq3d', 'choice', 1, choices=(0, 1), section='Model', help='Reduced two-layer non-hydrostatic model'),
+    _p('swave', 'choice', 0, choices=(0, 1), section='Model', help='Short wave action balance, off for XBeach-G'),
+    _p('lwave', 'choice', 0, choices=(0, 1), section='Model', help='Short wave forcing of long waves'),
+    _p('gwflow', 'choice', 1, choices=(0, 1), section='Model', help='Groundwater flow in the gravel'),
+    _p('struct', 'choice', 0, choices=(0, 1), section='Model', help='Non-erodible layer from ne_layer'),
+    _p('ne_layer', 'file', 'nebed.dep', section='Model', help='Erodible thickness above the hard layer'),
+    _p('tstop', 'float', 3600.0, 0, None, section='Time', help='End of the simulation (s)'),
+    _p('CFL', 'float', 0.7, 0.05, 0.95, section='Time', help='Courant number of the time step'),
+    _p('front', 'choice', 'nonh_1d', choices=('nonh_1d', 'abs_1d', 'abs_2d', 'wall', 'wlevel'),
+       section='Boundaries', help='Offshore boundary'),
+    _p('back', 'choice', 'abs_1d', choices=('abs_1d', 'abs_2d', 'wall'), section='Boundaries',
+       help='Landward boundary'),
+    _p('wbctype', 'choice', 'jonstable', choices=('parametric', 'jonstable', 'ts_nonh', 'off'),
+       section='Boundaries', help='Type of wave boundary conditions'),
+    _p('bcfile', 'file', 'jonswap.txt', section='Boundaries', help='Wave boundary conditions'),
+    _p('random', 'choice', 1, choices=(0, 1), section='Boundaries', help='Random seed of the wave series'),
+    _p('zs0', 'float', 0.0, -100, 100, section='Water level', help='Initial water level (m)'),
+    _p('tideloc', 'choice', 0, choices=(0, 1, 2, 4), section='Water level',
+       help='Number of corners with a water level series'),
+    _p('zs0file', 'file', 'tide.txt', section='Water level', help='Water level series'),
+    _p('bedfriction', 'choice', 'cf', choices=('cf', 'chezy', 'manning', 'white-colebrook',
+                                               'white-colebrook-grainsize'),
+       section='Flow', help='Bed friction formulation'),
+    _p('bedfriccoef', 'float', 0.01, 0, None, section='Flow', help='Bed friction coefficient'),
+    _p('sedtrans', 'choice', 1, choices=(0, 1), section='Sediment', help='Sediment transport'),
+    _p('morphology', 'choice', 1, choices=(0, 1), section='Sediment', help='Bed level changes'),
+    _p('D50', 'float', 0.01, 0.0001, 0.5, section='Sediment', help='Median grain size (m)'),
+    _p('D90', 'float', 0.015, 0.0001, 1.0, section='Sediment', help='90% grain size (m)'),
+    _p('rhos', 'float', 2650.0, 1000, 4000, section='Sediment', help='Density of the sediment (kg/m3)'),
+    _p('por', 'float', 0.4, 0.05, 0.8, section='Sediment', help='Porosity'),
+    _p('morfac', 'float', 1.0, 0, 1000, section='Sediment', help='Morphological acceleration factor'),
+    _p('kx', 'float', 0.01, 0, 1, section='Groundwater', help='Horizontal hydraulic conductivity (m/s)'),
+    _p('kz', 'float', 0.01, 0, 1, section='Groundwater', help='Vertical hydraulic conductivity (m/s)'),
+    _p('gw0', 'float', 0.0, -100, 100, section='Groundwater', help='Initial groundwater level (m)'),
+    _p('outputformat', 'choice', 'netcdf', choices=('netcdf', 'fortran'), section='Output',
+       help='Format of the output files'),
+    _p('tstart', 'float', 0.0, 0, None, section='Output', help='Start of the output (s)'),
+    _p('tintg', 'float', 1.0, 0, None, section='Output', help='Interval of the global output (s)'),
+    _p('tintm', 'float', 3600.0, 0, None, section='Output', help='Interval of the mean output (s)'),
+    _p('tintp', 'float', 0.1, 0, None, section='Output', help='Interval of the point output (s)'),
+    _p('nglobalvar', 'list', ['zb', 'zs', 'u'], section='Output', help='Variables of the global output'),
+    _p('nmeanvar', 'list', [], section='Output', help='Variables of the mean output'),
+    _p('npointvar', 'list', [], section='Output', help='Variables of the point output'),
+    _p('npoints', 'list', [], section='Output', help='Output points, "x y" per point'),
+]
+
+# Parameter needed when another one has some values: (when, values, then)
+NEEDS = [
+    ('vardx', (1,), 'xfile'),
+    ('struct', (1,), 'ne_layer'),
+    ('wbctype', ('parametric', 'jonstable', 'ts_nonh'), 'bcfile'),
+    ('tideloc', (1, 2, 4), 'zs0file'),
+]
+# Parameters ignored unless another one has some values: (param, when, values)
+ONLY_WITH = [
+    ('xfile', 'vardx', (1,)),
+    ('ne_layer', 'struct', (1,)),
+    ('bcfile', 'wbctype', ('parametric', 'jonstable', 'ts_nonh')),
+    ('zs0file', 'tideloc', (1, 2, 4)),
+    ('kx', 'gwflow', (1,)),
+    ('kz', 'gwflow', (1,)),
+    ('gw0', 'gwflow', (1,)),
+    ('morphology', 'sedtrans', (1,)),
+    ('morfac', 'morphology', (1,)),
+]
+# Pairs that must be in increasing order
+ORDER = [('tstart', 'tstop'), ('D50', 'D90')]
+
+Issue = namedtuple('Issue', 'name message severity')
+
+
+class Schema:
+    """
+    The schema compiled for checking: parameters by name, the numeric ones as arrays of
+    bounds and the choices as sets, so a check is a dict lookup and one comparison.
+    Built once, see compiled_schema.
+    """
+    def __init__(self, params):
+        self.params = {p.name: p for p in params}
+        self.order = [p.name for p in params]
+        self.sections = list(dict.fromkeys(p.section for p in params))
+        self.numeric = [p.name for p in params if p.kind in ('int', 'float')]
+        self.low = np.array([-np.inf if self.params[n].low is None else self.params[n].low for n in self.numeric])
+        self.high = np.array([np.inf if self.params[n].high is None else self.params[n].high for n in self.numeric])
+        self.bounds = {n: (lo, hi) for n, lo, hi in zip(self.numeric, self.low, self.high)}
+        self.choices = {p.name: set(p.choices) for p in params if p.kind == 'choice'}
+        self.lists = {p.name for p in params if p.kind == 'list'}
+        self.width = max(len(n) for n in self.order) + 1
+
+    def defaults(self, active=True):
+        """ Default value of every parameter, by default only the ones with an effect with the other defaults """
+        params = {name: (list(p.default) if p.kind == 'list' else p.default) for name, p in self.params.items()}
+        return active_params(params) if active else params
+
+
+@lru_cache(maxsize=None)
+def compiled_schema():
+    return Schema(SCHEMA)
+
+
+def active_params(params):
+    """ The parameters without the ones ignored by the values of the others (see ONLY_WITH) """
+    params = dict(params)
+    for name, when, values in ONLY_WITH:
+        if name in params and not _is_set(params, when, values):
+            del params[name]
+    return params
+
+
+def active_frame(variants, base=None):
+    """
+    active_params for many parameter sets (see validate_frame for variants and base): a
+    parameter is kept in the rows where the merged values of the others give it an effect
+    and set to None in the others, or dropped from base when no row uses it.
+    Returns (variants, base) as new objects.
+    """
+    variants = variants.copy()
+    base = dict(base or {})
+    for name, when, values in ONLY_WITH:
+        if name not in variants and name not in base:
+            continue
+        if when in variants:
+            on = variants[when].isin(values).to_numpy()
+        else:
+            on = np.full(len(variants), _is_set(base, when, values))
+        if on.all():
+            continue
+        if name in variants:
+            column = variants[name].astype(object)
+        elif on.any():
+            column = pd.Series([base.pop(name)] * len(variants), index=variants.index, dtype=object)
+        else:
+            del base[name]
+            continue
+        column[~on] = None
+        variants[name] = column
+    return variants, base
+
+
+def parse_value(name, text):
+    """ Value of a parameter from its text, typed by the schema; unknown parameters stay text """
+    param = compiled_schema().params.get(name)
+    text = text.strip()
+    if param is None or param.kind in ('str', 'file'):
+        return text
+    if param.kind == 'choice':
+        for choice in param.choices:
+            if text == str(choice):
+                return choice
+        # Numbers given as 1.0 for a choice of 1
+        try:
+            number = float(text)
+            return next((c for c in param.choices if not isinstance(c, str) and c == number), text)
+        except ValueError:
+            return text
+    if param.kind == 'int':
+        number = float(text)
+        return int(number) if number.is_integer() else number
+    return float(text)
+
+
+def parse_params(text):
+    """
+    Parse the text of a params.txt. Comments start with % or # at the start of a line or
+    after a space, so file names may hold them (bcfile = my#file.txt); a list parameter
+    (nglobalvar, npoints, ...) is followed by as many lines as its count.
+    Returns a dict of name: value in the order of the file.
+    """
+    schema = compiled_schema()
+    params = {}
+    lines = (re.split(r'(?:^|\s)[%#]', line, maxsplit=1)[0].strip() for line in text.splitlines())
+    lines = [line for line in lines if line]
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if '=' not in line:
+            raise ValueError(f'Expected "name = value": {line}')
+        name, value = (part.strip() for part in line.split('=', 1))
+        if name in schema.lists:
+            count = int(float(value))
+            params[name] = lines[i:i + count]
+            if len(params[name]) < count:
+                raise ValueError(f'{name} lists {count} items, only {len(params[name])} found')
+            i += count
+        else:
+            try:
+                params[name] = parse_value(name, value)
+            except ValueError:
+                params[name] = value
+    return params
+
+
+def read_params(path):
+    with open(path, 'r') as f:
+        return parse_params(f.read())
+
+
+def format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return f'{value:.10g}'
+    return str(value)
+
+
+def _layout(names):
+    """
+    Order of a params.txt for a set of parameter names: the known ones by section in the
+    order of the schema, then the others. Yields section headers (str) and names (tuple).
+    """
+    schema = compiled_schema()
+    names = set(names)
+    section = None
+    for name in schema.order:
+        if name in names:
+            if schema.params[name].section != section:
+                section = schema.params[name].section
+                yield f'\n%%% {section} %%%\n'
+            yield (name,)
+    other = [name for name in names if name not in schema.params]
+    if other:
+        yield '\n%%% Other %%%\n'
+        for name in sorted(other):
+            yield (name,)
+
+
+def _value_text(name, value):
+    """ Text after 'name = ', with the items of a list parameter on the following lines """
+    if name in compiled_schema().lists:
+        return f'{len(value)}\n' + ''.join(f'{item}\n' for item in value)
+    return f'{format_value(value)}\n'
+
+
+def format_params(params, header=HEADER):
+    """ Text of a params.txt, the known parameters grouped by section in the order of the schema """
+    width = compiled_schema().width
+    text = [f'%%% {header} %%%\n']
+    for entry in _layout(params):
+        if isinstance(entry, str):
+            text.append(entry)
+        else:
+            name = entry[0]
+            text.append(f'{name:<{width}}= ' + _value_text(name, params[name]))
+    return ''.join(text)
+
+
+def write_params(path, params):
+    with open(path, 'w') as f:
+        f.write(format_params(params))
+
+
+def _is_set(params, name, values):
+    return name in params and params[name] in values
+
+
+def _check_values(params):
+    schema = compiled_schema()
+    issues = []
+    for name, value in params.items():
+        param = schema.params.get(name)
+        if param is None:
+            issues.append(Issue(name, 'Unknown parameter, written as is', 'warning'))
+        elif param.kind in ('int', 'float'):
+            if isinstance(value, str) or (param.kind == 'int' and not float(value).is_integer()):
+                issues.append(Issue(name, f'Expected {"an integer" if param.kind == "int" else "a number"}', 'error'))
+                continue
+            low, high = schema.bounds[name]
+            if not low <= value <= high:
+                issues.append(Issue(name, f'Outside [{format_value(low)}, {format_value(high)}]', 'error'))
+        elif param.kind == 'choice' and value not in schema.choices[name]:
+            issues.append(Issue(name, f'Expected one of {", ".join(map(str, param.choices))}', 'error'))
+        elif param.kind == 'file' and not str(value).strip():
+            issues.append(Issue(name, 'Empty file name', 'error'))
+    return issues
+
+
+def _check_rules(params, skip=()):
+    """ Dependency and order rules, except the rules on a parameter of skip """
+    issues = []
+    for when, values, then in NEEDS:
+        if when not in skip and then not in skip and _is_set(params, when, values) \
+                and not str(params.get(then, '')).strip():
+            issues.append(Issue(then, f'Needed when {when} is {" or ".join(map(str, values))}', 'error'))
+    for name, when, values in ONLY_WITH:
+        if name not in skip and when not in skip and name in params and not _is_set(params, when, values):
+            issues.append(Issue(name, f'Ignored unless {when} is {" or ".join(map(str, values))}', 'warning'))
+    for low, high in ORDER:
+        a, b = params.get(low), params.get(high)
+        if low not in skip and high not in skip and isinstance(a, (int, float)) and isinstance(b, (int, float)) \
+                and a > b:
+            issues.append(Issue(high, f'{high} must not be smaller than {low}', 'error'))
+    return issues
+
+
+def validate_params(params):
+    """ Check one parameter set, returns a list of Issue (severity 'error' or 'warning') """
+    return _check_values(params) + _check_rules(params)
+
+
+def validate_frame(variants, base=None):
+    """
+    Check many parameter sets at once: variants is a DataFrame with one row per set and
+    one column per varied parameter (None where a set leaves the parameter out), base
+    holds the parameters shared by every set. Every rule runs on whole columns. Returns a DataFrame of the issues with the row
+    label of their set.
+    """
+    schema = compiled_schema()
+    base = base or {}
+    n = len(variants)
+    rows = np.arange(n)
+    found = []
+
+    def add(mask, name, message, severity='error'):
+        for i in rows[mask]:
+            found.append((variants.index[i], name, message, severity))
+
+    def column(name):
+        if name in variants.columns:
+            return variants[name].to_numpy()
+        if name in base:
+            values = np.empty(n, dtype=object)
+            values[:] = [base[name]] * n
+            return values
+        return None
+
+    # The shared parameters, and the rules between them, are checked once for every set
+    shared = {k: v for k, v in base.items() if k not in variants.columns}
+    shared_issues = _check_values(shared) + _check_rules(shared, skip=set(variants.columns))
+    for name in variants.columns:
+        param = schema.params.get(name)
+        values = variants[name]
+        if param is None:
+            add(np.ones(n, dtype=bool), name, 'Unknown parameter, written as is', 'warning')
+        elif param.kind in ('int', 'float'):
+            numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+            bad = np.isnan(numbers) & values.notna().to_numpy()
+            if param.kind == 'int':
+                bad |= ~np.isnan(numbers) & (numbers != np.round(numbers))
+            add(bad, name, f'Expected {"an integer" if param.kind == "int" else "a number"}')
+            low, high = schema.bounds[name]
+            add((numbers < low) | (numbers > high), name, f'Outside [{format_value(low)}, {format_value(high)}]')
+        elif param.kind == 'choice':
+            add(~values.isin(param.choices).to_numpy() & values.notna().to_numpy(), name,
+                f'Expected one of {", ".join(map(str, param.choices))}')
+        elif param.kind == 'file':
+            add(values.astype(str).str.strip().eq('').to_numpy() & values.notna().to_numpy(), name, 'Empty file name')
+    varied = set(variants.columns)
+    for when, values, then in NEEDS:
+        if when not in varied and then not in varied:
+            continue
+        active = column(when)
+        target = column(then)
+        if active is None:
+            continue
+        active = pd.Series(active).isin(values).to_numpy()
+        present = (np.zeros(n, dtype=bool) if target is None
+                   else pd.Series(target).fillna('').astype(str).str.strip().ne('').to_numpy())
+        add(active & ~present, then, f'Needed when {when} is {" or ".join(map(str, values))}')
+    for name, when, values in ONLY_WITH:
+        if name not in varied and when not in varied:
+            continue
+        present = column(name)
+        active = column(when)
+        if present is None:
+            continue
+        active = np.zeros(n, dtype=bool) if active is None else pd.Series(active).isin(values).to_numpy()
+        add(~active & pd.Series(present).notna().to_numpy(), name, f'Ignored unless {when} is {" or ".join(map(str, values))}', 'warning')
+    for low, high in ORDER:
+        if low not in varied and high not in varied:
+            continue
+        a, b = column(low), column(high)
+        if a is None or b is None:
+            continue
+        a = pd.to_numeric(pd.Series(a), errors='coerce').to_numpy(dtype=float)
+        b = pd.to_numeric(pd.Series(b), errors='coerce').to_numpy(dtype=float)
+        add(a > b, high, f'{high} must not be smaller than {low}')
+    for issue in shared_issues:
+        found += [(label, *issue) for label in variants.index]
+    return pd.DataFrame(found, columns=['variant', *Issue._fields])
+
+
+def format_frame(variants, base=None, header=HEADER):
+    """
+    Text of the params.txt of every row of variants, with the parameters of base shared.
+    The text between the varied parameters is built once and the values of every varied
+    column are formatted in one pass, so thousands of files cost little more than their
+    size. A None (or NaN) value leaves the parameter out of its file.
+    Returns a list of strings, in the order of the rows.
+    """
+    base = base or {}
+    width = compiled_schema().width
+    # Constant pieces of text, with a slot for a varied column after each of them
+    pieces = [f'%%% {header} %%%\n']
+    slots = []
+    for entry in _layout(set(base) | set(variants.columns)):
+        if isinstance(entry, str):
+            pieces[-1] += entry
+            continue
+        name = entry[0]
+        if name in variants.columns:
+            slots.append(name)
+            pieces.append('')
+        else:
+            pieces[-1] += f'{name:<{width}}= ' + _value_text(name, base[name])
+    formatted = []
+    for name in slots:
+        prefix = f'{name:<{width}}= '
+        values = variants[name]
+        if name in compiled_schema().lists:
+            formatted.append([prefix + _value_text(name, v) if v is not None else '' for v in values])
+        elif values.dtype.kind == 'f':
+            formatted.append([prefix + f'{v:.10g}\n' if v == v else '' for v in values.to_numpy()])
+        else:
+            formatted.append([prefix + f'{v}\n' if v is not None and v == v else '' for v in values.to_numpy()])
+    if not slots:
+        return [pieces[0]] * len(variants)
+    last = pieces[-1]
+    return [''.join(piece + value for piece, value in zip(pieces, row)) + last for row in zip(*formatted)]
+
+
+def diff_params(old, new, rtol=1e-9):
+    """
+    Structural difference between two parameter sets: parameters added, removed and
+    changed; numbers are compared with a tolerance and list parameters item by item.
+    Returns {'added': {name: value}, 'removed': {name: value},
+             'changed': {name: (old, new)} with (removed items, added items) for lists}.
+    """
+    schema = compiled_schema()
+    diff = {'added': {k: new[k] for k in new if k not in old},
+            'removed': {k: old[k] for k in old if k not in new},
+            'changed': {}}
+    for name in old:
+        if name not in new:
+            continue
+        a, b = old[name], new[name]
+        if name in schema.lists:
+            removed = [item for item in a if item not in b]
+            added = [item for item in b if item not in a]
+            if removed or added or list(a) != list(b):
+                diff['changed'][name] = (removed, added)
+        elif isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if not np.isclose(a, b, rtol=rtol, atol=0):
+                diff['changed'][name] = (a, b)
+        elif a != b:
+            diff['changed'][name] = (a, b)
+    return diff
+
+
+def format_diff(diff):
+    """ Text of a diff, one line per change """
+    schema = compiled_schema()
+    lines = [f'+ {name} = {format_value(value)}' for name, value in diff['added'].items()]
+    lines += [f'- {name} = {format_value(value)}' for name, value in diff['removed'].items()]
+    for name, (a, b) in diff['changed'].items():
+        if name in schema.lists:
+            lines.append(f'~ {name}: ' + ', '.join([f'-{item}' for item in a] + [f'+{item}' for item in b] or ['order']))
+        else:
+            lines.append(f'~ {name}: {format_value(a)} -> {format_value(b)}')
+    return '\n'.join(lines)
@@ -0,0 +1,133 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+# Points per bucket of the index
+BUCKET_SIZE = 64
+
+
+class PointIndex:
+    """
+    Nearest point lookup for a plotted series, in screen space.
+    The points are kept ordered by x (no copy when x is already increasing, as for a
+    profile chainage or a time series) and grouped in buckets of BUCKET_SIZE points with
+    their bounding boxes. A query measures the distance to every box, a vectorized pass
+    over n / BUCKET_SIZE boxes, and only checks the points of the boxes that can hold the
+    nearest point. Distances are in pixels, from the size of a pixel in data units, so the
+    aspect ratio of the plot is respected.
+    Rows inserted, removed or moved along x are spliced in while x stays increasing, only
+    the buckets from the first changed row on are recomputed.
+    """
+    def __init__(self, x, y):
+        # Own copy, the columns of a table model are shifted in place by row edits
+        x = np.array(x, dtype=float)
+        if len(x) > 1 and not np.all(x[1:] >= x[:-1]):
+            self.order = np.argsort(x, kind='stable')
+            self.position = np.empty_like(self.order)
+            self.position[self.order] = np.arange(len(x))
+            self.x = x[self.order]
+        else:
+            self.order = None
+            self.x = x
+        self.n_buckets = -(-len(x) // BUCKET_SIZE)
+        self.box = np.full((4, self.n_buckets), np.nan)
+        self._bucket_bounds(self.x, self.box[0], self.box[1], 0)
+        self.set_y(y)
+
+    def _bucket_bounds(self, values, low, high, first):
+        """ Min and max of values per bucket, from bucket first on, NaN ignored """
+        pad = -len(values) % BUCKET_SIZE
+        blocks = np.pad(values, (0, pad), constant_values=np.nan).reshape(-1, BUCKET_SIZE)
+        low[first:first + len(blocks)] = np.fmin.reduce(blocks, axis=1)
+        high[first:first + len(blocks)] = np.fmax.reduce(blocks, axis=1)
+
+    def set_y(self, y):
+        """ New y values for every point, the order only depends on x """
+        y = np.asarray(y, dtype=float)
+        self.y = np.array(y) if self.order is None else y[self.order]
+        self._bucket_bounds(self.y, self.box[2], self.box[3], 0)
+
+    def update_y(self, rows, y):
+        """ Refresh the y of some rows, only the buckets holding them are recomputed """
+        rows = np.asarray(rows, dtype=int)
+        y = np.asarray(y, dtype=float)
+        positions = rows if self.order is None else self.position[rows]
+        self.y[positions] = y[rows]
+        for bucket in np.unique(positions // BUCKET_SIZE):
+            start = bucket * BUCKET_SIZE
+            self._bucket_bounds(self.y[start:start + BUCKET_SIZE], self.box[2], self.box[3], bucket)
+
+    def splice(self, start, stop, x, y):
+        """
+        Replace the points of rows start:stop by the points x, y (any number of them).
+        Only possible while x stays increasing (no reordering); returns False otherwise,
+        the index must then be built again.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self.order is not None:
+            return False
+        new_x = np.concatenate([self.x[:start], x, self.x[stop:]])
+        edges = new_x[max(start - 1, 0):start + len(x) + 1]
+        if not np.all(edges[1:] >= edges[:-1]):
+            return False
+        self.x = new_x
+        self.y = np.concatenate([self.y[:start], y, self.y[stop:]])
+        first = start // BUCKET_SIZE
+        self.n_buckets = -(-len(self.x) // BUCKET_SIZE)
+        box = np.full((4, self.n_buckets), np.nan)
+        box[:, :first] = self.box[:, :first]
+        self.box = box
+        start = first * BUCKET_SIZE
+        self._bucket_bounds(self.x[start:], self.box[0], self.box[1], first)
+        self._bucket_bounds(self.y[start:], self.box[2], self.box[3], first)
+        return True
+
+    def _distances(self, buckets, cx, cy, sx, sy):
+        positions = (buckets[:, None] * BUCKET_SIZE + np.arange(BUCKET_SIZE)).ravel()
+        positions = positions[positions < len(self.x)]
+        d2 = ((self.x[positions] - cx) / sx)**2 + ((self.y[positions] - cy) / sy)**2
+        return positions, d2
+
+    def nearest(self, cx, cy, sx, sy, max_pixels=None):
+        """
+        Row of the point closest to (cx, cy), with sx, sy the size of a pixel in data units.
+        Returns None when there are no points, or none within max_pixels.
+        """
+        if self.n_buckets == 0 or sx <= 0 or sy <= 0:
+            return None
+        x0, x1, y0, y1 = self.box
+        dx = np.maximum(np.maximum(x0 - cx, cx - x1), 0) / sx
+        dy = np.maximum(np.maximum(y0 - cy, cy - y1), 0) / sy
+        lower = dx * dx + dy * dy  # NaN for buckets without a valid point
+        if np.isnan(lower).all():
+            return None
+        # The closest box gives an upper bound, every box closer than it is a candidate
+        first = int(np.nanargmin(lower))
+        _, d2 = self._distances(np.array([first]), cx, cy, sx, sy)
+        bound = np.nanmin(d2)
+        if max_pixels is not None:
+            bound = min(bound, max_pixels**2)
+        positions, d2 = self._distances(np.flatnonzero(lower <= bound), cx, cy, sx, sy)
+        if positions.size == 0 or np.isnan(d2).all():
+            return None
+        best = np.nanargmin(d2)
+        if max_pixels is not None and d2[best] > max_pixels**2:
+            return None
+        position = int(positions[best])
+        return position if self.order is None else int(self.order[position])
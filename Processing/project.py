@@ -0,0 +1,196 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import io
+import json
+import re
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_SUFFIX = '.xbgp'
+FORMAT_NAME = 'xb-gui project'
+FORMAT_VERSION = 1
+MANIFEST_PATTERN = re.compile(r'manifest-(\d+)\.json$')
+
+
+def digest(arrays):
+    """ Content hash of a dict of arrays, used to skip writing parts that did not change """
+    h = hashlib.sha1()
+    for key in sorted(arrays):
+        a = np.ascontiguousarray(arrays[key])
+        h.update(f'{key}:{a.dtype.str}:{a.shape}'.encode())
+        h.update(a.tobytes() if a.dtype.kind != 'O' else repr(a.tolist()).encode())
+    return h.hexdigest()
+
+
+class Project:
+    """
+    A project file: a zip archive with a JSON manifest and one NPZ member (named arrays)
+    per part, e.g. the table of an input panel or the extraction lines.
+    Opening only reads the manifest, parts are read when asked for. Saving appends the
+    parts that changed and a new manifest revision, the newest manifest is the valid one;
+    the archive is compacted when superseded members take more space than the live ones.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.manifest = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'revision': 0, 'parts': {}}
+        self._pending = {}
+
+    @classmethod
+    def open(cls, path):
+        project = cls(path)
+        with zipfile.ZipFile(path, 'r') as zf:
+            revisions = [int(m.group(1)) for m in map(MANIFEST_PATTERN.match, zf.namelist()) if m]
+            if not revisions:
+                raise ValueError(f'{path} is not an xb-gui project')
+            manifest = json.loads(zf.read(f'manifest-{max(revisions)}.json'))
+        if manifest.get('format') != FORMAT_NAME or manifest.get('version', 0) > FORMAT_VERSION:
+            raise ValueError(f'{path} was written by an unsupported version')
+        project.manifest = manifest
+        return project
+
+    @property
+    def parts(self):
+        return list(self.manifest['parts'])
+
+    def meta(self, name):
+        return self.manifest['parts'][name]['meta']
+
+    def read_part(self, name):
+        """ (arrays, meta) of a part, reading only its member of the archive """
+        if name in self._pending:
+            arrays, meta, _ = self._pending[name]
+            return arrays, meta
+        part = self.manifest['parts'][name]
+        with zipfile.ZipFile(self.path, 'r') as zf:
+            with np.load(io.BytesIO(zf.read(part['member'])), allow_pickle=False) as npz:
+                arrays = {key: npz[key] for key in npz.files}
+        return arrays, part['meta']
+
+    def set_part(self, name, arrays, meta=None):
+        """ Stage a part for the next save, ignored when its content did not change """
+        # Compared as read back from the manifest, e.g. tuples become lists
+        meta = json.loads(json.dumps(meta or {}))
+        objects = [key for key, a in arrays.items() if np.asarray(a).dtype.kind == 'O']
+        if objects:
+            raise ValueError(f'The {name} part has arrays of Python objects ({", ".join(objects)}), '
+                             'they could not be read back')
+        key = digest(arrays)
+        part = self.manifest['parts'].get(name)
+        if part is not None and part['digest'] == key and part['meta'] == meta:
+            self._pending.pop(name, None)
+            return False
+        self._pending[name] = (arrays, meta, key)
+        return True
+
+    def remove_part(self, name):
+        self._pending.pop(name, None)
+        self.manifest['parts'].pop(name, None)
+
+    @property
+    def modified(self):
+        return bool(self._pending)
+
+    def _write_member(self, zf, name, arrays):
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        member = f'parts/{name}-{self.manifest["revision"]}.npz'
+        zf.writestr(member, buffer.getvalue(), compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        return member
+
+    def save(self, path=None):
+        """
+        Write the staged parts. Saving to another file writes a complete archive,
+        copying the members of the unchanged parts as they are.
+        """
+        path = Path(path) if path else self.path
+        if path is None:
+            raise ValueError('The project has no file yet')
+        # A project never saved replaces whatever file is at its path
+        if self.path is None or path != self.path or not path.exists() or self.manifest['revision'] == 0:
+            self._rewrite(path)
+        else:
+            self.manifest['revision'] += 1
+            with zipfile.ZipFile(path, 'a') as zf:
+                for name, (arrays, meta, key) in self._pending.items():
+                    member = self._write_member(zf, name, arrays)
+                    self.manifest['parts'][name] = {'member': member, 'meta': meta, 'digest': key}
+                zf.writestr(f'manifest-{self.manifest["revision"]}.json', json.dumps(self.manifest, indent=1))
+            if self._dead_fraction() > 0.5:
+                self._rewrite(path)
+        self.path = path
+        self._pending.clear()
+
+    def _dead_fraction(self):
+        with zipfile.ZipFile(self.path, 'r') as zf:
+            live = {p['member'] for p in self.manifest['parts'].values()}
+            live.add(f'manifest-{self.manifest["revision"]}.json')
+            sizes = [(info.filename in live, info.compress_size) for info in zf.infolist()]
+        total = sum(size for _, size in sizes)
+        return sum(size for is_live, size in sizes if not is_live) / total if total else 0
+
+    def _rewrite(self, path):
+        """ Write a compact archive with only the current members """
+        old = zipfile.ZipFile(self.path, 'r') if self.path is not None and self.path.exists() else None
+        kept = [name for name in self.manifest['parts'] if name not in self._pending]
+        if kept and old is None:
+            raise FileNotFoundError(f'{self.path} no longer exists, the unchanged parts '
+                                    f'({", ".join(kept)}) cannot be copied from it. Save every part again.')
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            self.manifest['revision'] += 1
+            with zipfile.ZipFile(tmp, 'w') as zf:
+                parts = {}
+                for name, part in self.manifest['parts'].items():
+                    if name in self._pending:
+                        continue
+                    member = f'parts/{name}-{self.manifest["revision"]}.npz'
+                    zf.writestr(member, old.read(part['member']), compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+                    parts[name] = dict(part, member=member)
+                for name, (arrays, meta, key) in self._pending.items():
+                    parts[name] = {'member': self._write_member(zf, name, arrays), 'meta': meta, 'digest': key}
+                self.manifest['parts'] = parts
+                zf.writestr(f'manifest-{self.manifest["revision"]}.json', json.dumps(self.manifest, indent=1))
+        finally:
+            if old is not None:
+                old.close()
+        tmp.replace(path)
+
+
+def table_arrays(df):
+    """
+    Columns of a DataFrame as arrays of a project part, with the names as meta.
+    Columns of Python objects, e.g. text, are stored as fixed-width strings with '' for missing values.
+    """
+    arrays = {}
+    for i in range(df.shape[1]):
+        a = df.iloc[:, i].to_numpy()
+        if a.dtype.kind == 'O':
+            missing = df.iloc[:, i].isna().to_numpy()
+            a = np.where(missing, '', a.astype(str)).astype(str)
+        arrays[f'c{i}'] = a
+    return arrays, {'columns': [str(c) for c in df.columns]}
+
+
+def arrays_table(arrays, meta):
+    """ Inverse of table_arrays """
+    import pandas as pd
+    columns = meta.get('columns', [])
+    return pd.DataFrame({c: arrays[f'c{i}'] for i, c in enumerate(columns)}, columns=columns)
@@ -0,0 +1,466 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from Processing.scenarios import INDEX_FILE
+
+DEFAULT_QUEUE_FILE = Path.home().joinpath('.xb-gui', 'run_queue.json')
+CONFIG_PATH = Path(__file__).parent.parent.joinpath('configuration.conf')
+DEFAULT_COMMAND = 'xbeach'
+LOG_FILE = 'xbeach.log'
+STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+FINISHED = ('done', 'failed', 'cancelled')
+# Memory left to the system and the GUI when runs are started
+MIN_FREE_MB = 512
+# Bytes of the end of a log searched for the progress of a run
+TAIL_BYTES = 4096
+# XBeach reports its progress as e.g. "  12.5% done" or "12.5 percent complete"
+PROGRESS_RE = re.compile(rb'(\d+(?:\.\d+)?)\s*(?:%|percent)', re.IGNORECASE)
+
+
+def available_memory_mb():
+    """ Memory available to new processes in MB, None when it cannot be read """
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def pid_alive(pid):
+    """ Whether a process with this id is running """
+    if not pid:
+        return False
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_log(directory, offset=0, max_bytes=1 << 20):
+    """ Text of the log of a run from byte offset on, and the offset to read the next part from """
+    path = Path(directory).joinpath(LOG_FILE)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(max_bytes)
+    except OSError:
+        return '', offset
+    return data.decode('utf-8', errors='replace'), offset + len(data)
+
+
+def log_progress(directory):
+    """ Last progress percentage written in the log of a run, None when there is none """
+    path = Path(directory).joinpath(LOG_FILE)
+    try:
+        with open(path, 'rb') as f:
+            f.seek(max(path.stat().st_size - TAIL_BYTES, 0))
+            matches = PROGRESS_RE.findall(f.read())
+    except OSError:
+        return None
+    return min(float(matches[-1]), 100.0) if matches else None
+
+
+class RunQueue:
+    """
+    Queue of model runs kept in a JSON file, saved on every change so that it survives
+    restarts. A job is a dict with the run folder, its status, timings and process id.
+    One instance at a time owns the queue, through a lock file next to it. Other instances
+    get it read only (read_only is True, owner is the process id of the owner) and can
+    only follow it with load().
+    Runs left running by an instance that is gone are queued again when the queue is
+    loaded, unless their process is still alive.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_QUEUE_FILE
+        self.lock_path = self.path.with_suffix('.lock')
+        self.jobs = []
+        self.next_id = 1
+        self.owner = self._acquire_lock()
+        self.read_only = self.owner is not None
+        if self.read_only:
+            print(f'The run queue {self.path} is used by process {self.owner}, it is read only')
+        self.load()
+
+    def _acquire_lock(self):
+        """ Take the lock file, returns the process id of the owner when another process has it """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    owner = int(self.lock_path.read_text() or 0)
+                except (OSError, ValueError):
+                    owner = 0
+                if owner != os.getpid() and pid_alive(owner):
+                    return owner
+                # Left by an instance that is gone
+                self.lock_path.unlink(missing_ok=True)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            atexit.register(self.close)
+            return None
+
+    def close(self):
+        """ Release the lock file """
+        if not self.read_only and self.lock_path.exists():
+            try:
+                if int(self.lock_path.read_text() or 0) == os.getpid():
+                    self.lock_path.unlink()
+            except (OSError, ValueError):
+                pass
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f'Could not read the run queue {self.path}: {e}')
+            return
+        self.jobs = data.get('jobs', [])
+        self.next_id = data.get('next_id', len(self.jobs) + 1)
+        if self.read_only:
+            return
+        interrupted = [job for job in self.jobs if job['status'] == 'running' and not pid_alive(job.get('pid'))]
+        for job in interrupted:
+            job.update(status='queued', started=None, pid=None, message='Interrupted, queued again')
+        if interrupted:
+            print(f'{len(interrupted)} interrupted runs queued again')
+            self.save()
+
+    def save(self):
+        """ Write the queue through a temporary file, a crash never leaves it half written """
+        if self.read_only:
+            raise RuntimeError(f'The run queue is used by process {self.owner}')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'next_id': self.next_id, 'jobs': self.jobs}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def job(self, job_id):
+        return next((job for job in self.jobs if job['id'] == job_id), None)
+
+    def add(self, directories, labels=None):
+        """ Queue run folders, folders already queued or running are skipped. Returns the new jobs """
+        pending = {job['directory'] for job in self.jobs if job['status'] in ('queued', 'running')}
+        labels = labels or [Path(d).name for d in directories]
+        added = []
+        for directory, label in zip(directories, labels):
+            directory = str(Path(directory).resolve())
+            if directory in pending:
+                continue
+            pending.add(directory)
+            added.append({'id': self.next_id, 'label': str(label), 'directory': directory, 'status': 'queued',
+                          'returncode': None, 'queued': time.time(), 'started': None, 'finished': None,
+                          'attempts': 0, 'pid': None, 'message': ''})
+            self.next_id += 1
+        if added:
+            self.jobs.extend(added)
+            self.save()
+        return added
+
+    def add_index(self, index_path):
+        """ Queue the runs of a scenario set, given its folder or its scenarios.csv """
+        index_path = Path(index_path)
+        if index_path.is_dir():
+            index_path = index_path.joinpath(INDEX_FILE)
+        index = pd.read_csv(index_path, dtype={'same_as': str}, keep_default_na=False)
+        # Runs the same as another one are not written, and not run
+        index = index[index['same_as'] == '']
+        return self.add([index_path.parent.joinpath(d) for d in index['directory']], list(index['run']))
+
+    def retry(self, job_ids):
+        """ Queue finished runs again """
+        for job in self.jobs:
+            if job['id'] in job_ids and job['status'] in FINISHED:
+                job.update(status='queued', returncode=None, started=None, finished=None, message='')
+        self.save()
+
+    def remove(self, job_ids):
+        """ Drop jobs that are not running """
+        self.jobs = [job for job in self.jobs if job['id'] not in job_ids or job['status'] == 'running']
+        self.save()
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        for job in self.jobs:
+            counts[job['status']] += 1
+        return counts
+
+
+class RunManager:
+    """
+    Runs the queued jobs with a command, in their folder, as local processes.
+    At most max_cores // cores_per_run runs go at once, fewer when memory_per_run_mb is set
+    and the memory available when the manager was started does not hold them all.
+    The output of every run streams to its xbeach.log. poll() starts and collects the
+    processes and is called periodically, by a timer of the GUI or by run_all.
+    """
+    def __init__(self, queue, command=DEFAULT_COMMAND, max_cores=None, cores_per_run=1, memory_per_run_mb=0):
+        self.queue = queue
+        self.command = command
+        self.max_cores = max_cores or os.cpu_count() or 1
+        self.cores_per_run = max(int(cores_per_run), 1)
+        self.memory_per_run_mb = memory_per_run_mb
+        self.running = False
+        self.processes = {}
+        self._memory_budget = None
+
+    @classmethod
+    def from_config(cls, queue=None, config_path=CONFIG_PATH):
+        """ Create the manager from the 'runs' section of configuration.conf """
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                settings = json.load(f).get('runs', {})
+        except Exception as e:
+            print(e)
+            settings = {}
+        return cls(queue if queue is not None else RunQueue(settings.get('queue_file') or None),
+                   command=settings.get('command') or DEFAULT_COMMAND,
+                   max_cores=settings.get('max_cores') or None,
+                   cores_per_run=settings.get('cores_per_run', 1),
+                   memory_per_run_mb=settings.get('memory_per_run_mb', 0))
+
+    def slots(self):
+        """ Number of runs that may go at once """
+        slots = max(self.max_cores // self.cores_per_run, 1)
+        if self.memory_per_run_mb and self._memory_budget is not None:
+            slots = min(slots, max(int(self._memory_budget // self.memory_per_run_mb), 1))
+        return slots
+
+    def start(self):
+        """ Start running the queue, the memory for the runs is measured now """
+        available = available_memory_mb()
+        if available is not None:
+            # Memory of the runs already going counts as available to them
+            self._memory_budget = available - MIN_FREE_MB + len(self.processes) * self.memory_per_run_mb
+        self.running = True
+
+    def pause(self):
+        """ No new runs are started, the running ones finish """
+        self.running = False
+
+    def stop(self):
+        """ Stop everything, the running jobs are queued again """
+        self.running = False
+        if self.processes:
+            self._terminate(list(self.processes), status='queued', message='Stopped, queued again')
+        if not self.queue.read_only:
+            self.queue.save()
+
+    def cancel(self, job_ids):
+        running = [job_id for job_id in job_ids if job_id in self.processes]
+        if running:
+            self._terminate(running, status='cancelled', message='Cancelled')
+        for job in self.queue.jobs:
+            if job['id'] in job_ids and job['status'] == 'queued':
+                job.update(status='cancelled', finished=time.time(), message='Cancelled')
+        self.queue.save()
+
+    def _terminate(self, job_ids, status, message, timeout=5):
+        """ Terminate the processes of jobs, all at once, and kill the ones still alive after timeout """
+        stopping = [(job_id, *self.processes.pop(job_id)) for job_id in job_ids]
+        for _, process, _ in stopping:
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for job_id, process, log in stopping:
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            log.close()
+            job = self.queue.job(job_id)
+            if job is not None:
+                job.update(status=status, returncode=process.returncode, message=message, pid=None,
+                           finished=time.time() if status in FINISHED else None)
+
+    def command_args(self, directory):
+        """ The command as arguments, {dir} is replaced by the run folder """
+        args = [arg.replace('{dir}', directory) for arg in shlex.split(self.command, posix=os.name != 'nt')]
+        if not args:
+            raise ValueError('No command to run the model with')
+        # A relative path to an executable resolves from the working folder of the GUI, not the run folder
+        if shutil.which(args[0]) is None and Path(args[0]).exists():
+            args[0] = str(Path(args[0]).resolve())
+        return args
+
+    def _launch(self, job):
+        directory = job['directory']
+        env = dict(os.environ, OMP_NUM_THREADS=str(self.cores_per_run))
+        job['attempts'] += 1
+        try:
+            args = self.command_args(directory)
+            log = open(Path(directory).joinpath(LOG_FILE), 'wb')
+        except (OSError, ValueError) as e:
+            job.update(status='failed', finished=time.time(), message=str(e))
+            return
+        try:
+            process = subprocess.Popen(args, cwd=directory, stdout=log, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL, env=env,
+                                       creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+        except OSError as e:
+            log.close()
+            job.update(status='failed', finished=time.time(), message=str(e))
+            return
+        self.processes[job['id']] = (process, log)
+        job.update(status='running', started=time.time(), finished=None, returncode=None, pid=process.pid,
+                   message='')
+
+    def poll(self):
+        """ Collect the finished processes and start queued jobs in the free slots. Returns the changed job ids """
+        changed = set()
+        if self.queue.read_only:
+            return changed
+        for job_id, (process, log) in list(self.processes.items()):
+            returncode = process.poll()
+            if returncode is None:
+                continue
+            log.close()
+            del self.processes[job_id]
+            job = self.queue.job(job_id)
+            if job is not None:
+                job.update(status='done' if returncode == 0 else 'failed', returncode=returncode, pid=None,
+                           finished=time.time(), message='' if returncode == 0 else f'Exit code {returncode}')
+                changed.add(job_id)
+        # Runs of an earlier session still alive hold their slot until they end
+        orphans = [job for job in self.queue.jobs if job['status'] == 'running' and job['id'] not in self.processes]
+        for job in orphans:
+            if not pid_alive(job.get('pid')):
+                job.update(status='failed', pid=None, finished=time.time(),
+                           message=f'Ended outside the queue, exit code unknown, see {LOG_FILE}')
+                changed.add(job['id'])
+        if self.running:
+            running = sum(job['status'] == 'running' for job in self.queue.jobs)
+            free = self.slots() - running
+            available = available_memory_mb() if self.memory_per_run_mb else None
+            for job in self.queue.jobs:
+                if free <= 0 or (available is not None and available < MIN_FREE_MB + self.memory_per_run_mb):
+                    break
+                if job['status'] == 'queued':
+                    self._launch(job)
+                    changed.add(job['id'])
+                    free -= 1
+            if not any(job['status'] in ('queued', 'running') for job in self.queue.jobs):
+                self.running = False
+        if changed:
+            self.queue.save()
+        return changed
+
+    def progress(self, job):
+        """ Progress of a job in percent, None when the run does not report it """
+        if job['status'] == 'done':
+            return 100.0
+        if job['status'] == 'running':
+            return log_progress(job['directory'])
+        return None
+
+    def run_all(self, interval=0.5, report=None):
+        """ Run the queue to the end, report(counts) is called when a job changes """
+        self.start()
+        try:
+            while self.running:
+                if self.poll() and report is not None:
+                    report(self.queue.counts())
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        return self.queue.counts()
+
+
+def main(argv=None):
+    """ Command line entry point, run from the repository root with `python -m Processing.runs` """
+    parser = argparse.ArgumentParser(description='Run XBeach-G run folders in parallel from a queue.')
+    parser.add_argument('runs', nargs='*', help='Scenario sets (folders with scenarios.csv) or run folders to queue')
+    parser.add_argument('--command', help=f'Command run in every run folder (default: {DEFAULT_COMMAND})')
+    parser.add_argument('--cores', type=int, help='Cores to use (default: all)')
+    parser.add_argument('--cores-per-run', type=int, help='Cores of every run (default: 1)')
+    parser.add_argument('--memory', type=float, help='Memory of every run in MB, limits the runs at once')
+    parser.add_argument('--queue', help=f'Queue file (default: {DEFAULT_QUEUE_FILE})')
+    args = parser.parse_args(argv)
+
+    manager = RunManager.from_config(RunQueue(args.queue) if args.queue else None)
+    if manager.queue.read_only:
+        parser.error(f'the queue {manager.queue.path} is used by process {manager.queue.owner}')
+    if args.command:
+        manager.command = args.command
+    if args.cores:
+        manager.max_cores = args.cores
+    if args.cores_per_run:
+        manager.cores_per_run = args.cores_per_run
+    if args.memory is not None:
+        manager.memory_per_run_mb = args.memory
+    for path in args.runs:
+        path = Path(path)
+        added = manager.queue.add_index(path) if path.joinpath(INDEX_FILE).exists() or path.suffix == '.csv' \
+            else manager.queue.add([path])
+        print(f'{len(added)} runs queued from {path}')
+    start = time.perf_counter()
+    manager.start()
+    print(f'Running {manager.queue.counts()["queued"]} runs, {manager.slots()} at once with "{manager.command}"')
+    counts = manager.run_all(report=lambda c: print(f'{c["done"]} done, {c["failed"]} failed, '
+                                                   f'{c["running"]} running, {c["queued"]} queued'))
+    print(f'{counts["done"]} done, {counts["failed"]} failed in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == "__main__":
+    main()
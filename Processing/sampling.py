@@ -0,0 +1,270 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+from rasterio.windows import Window
+
+INTERPOLATION_METHODS = ('nearest', 'bilinear', 'cubic')
+# Number of extra pixels needed around the samples by each method
+KERNEL_PAD = {'nearest': 0, 'bilinear': 1, 'cubic': 2}
+PROFILE_COLUMNS = ('label', 'chainage', 'x', 'y', 'z')
+# Largest side, in pixels, of a window read by sample_raster (8 MB of float64 at most)
+MAX_WINDOW_SIDE = 1024
+
+
+def point_interval(dist, point_interval_max):
+    """ Spacing of the samples along a line, same rule as the interactive extraction """
+    dist = np.asarray(dist, dtype=float)
+    interval = np.minimum(np.round(dist / 10, 1), point_interval_max)
+    # Very short lines round to a zero interval
+    return np.where(interval > 0, interval, np.maximum(dist, 1e-9))
+
+
+def _line_axis(lines_xy):
+    """
+    Lay polylines end to end on one distance axis.
+    Returns (vertices, axis, offset, dist): the stacked vertices, their position on the
+    axis, the start of every line on the axis and the length of every line. A point at
+    chainage c of line i is at offset[i] + c on the axis.
+    """
+    xy = [np.asarray(v, dtype=float).reshape(-1, 2) for v in lines_xy]
+    n_vertices = np.array([len(v) for v in xy], dtype=int)
+    vertices = np.concatenate(xy) if xy else np.empty((0, 2))
+    vertex_line = np.repeat(np.arange(len(xy)), n_vertices)
+
+    # Arc length of every vertex from the start of its own line
+    seg = np.hypot(*np.diff(vertices, axis=0).T)
+    seg[np.diff(vertex_line) != 0] = 0  # No segment between the end of a line and the next one
+    along = np.concatenate([[0.0], np.cumsum(seg)]) if len(vertices) else np.empty(0)
+    line_first = np.cumsum(n_vertices) - n_vertices
+    along -= np.repeat(along[line_first], n_vertices)
+    dist = along[np.cumsum(n_vertices) - 1]
+
+    # Offsetting each line by the length of the previous ones, plus a gap, keeps the
+    # distance axis increasing across lines
+    offset = np.cumsum(dist + 1) - (dist + 1)
+    axis = along + np.repeat(offset, n_vertices)
+    return vertices, axis, offset, dist
+
+
+def line_sample_points(lines_xy, point_interval_max):
+    """
+    Sample positions for many polylines at once.
+    lines_xy: sequence of (n_i, 2) vertex arrays, a straight line has two vertices.
+    Samples are evenly spaced along the arc length of every line, with the chainage being
+    the cumulative distance from the first vertex. All the lines are laid end to end on one
+    distance axis, so every sample of every segment is placed by a single interpolation.
+    Returns (line_id, chainage, x, y) arrays with one entry per sample.
+    """
+    vertices, axis, offset, dist = _line_axis(lines_xy)
+    interval = point_interval(dist, point_interval_max)
+    num_points = (np.floor(dist) / interval).astype(int) + 1
+    line_id = np.repeat(np.arange(len(dist)), num_points)
+    first = np.repeat(np.cumsum(num_points) - num_points, num_points)
+    step = np.arange(len(line_id)) - first
+    denom = np.maximum(num_points - 1, 1)[line_id]
+    chainage = step / denom * dist[line_id]
+
+    position = chainage + offset[line_id]
+    x = np.interp(position, axis, vertices[:, 0])
+    y = np.interp(position, axis, vertices[:, 1])
+    return line_id, chainage, x, y
+
+
+def points_at_chainage(lines_xy, line_id, chainage):
+    """
+    World positions of given chainages along many polylines, e.g. the nodes of model
+    grids. Chainages beyond the ends of a line are clamped to its ends.
+    Returns (x, y).
+    """
+    vertices, axis, offset, dist = _line_axis(lines_xy)
+    line_id = np.asarray(line_id, dtype=int)
+    position = np.clip(np.asarray(chainage, dtype=float), 0, dist[line_id]) + offset[line_id]
+    return np.interp(position, axis, vertices[:, 0]), np.interp(position, axis, vertices[:, 1])
+
+
+def _cubic_weights(t):
+    """ Keys cubic convolution weights (a=-0.5) for the offsets -1, 0, 1, 2 """
+    a = -0.5
+    d = np.stack([1 + t, t, 1 - t, 2 - t], axis=-1)
+    near = ((a + 2) * d - (a + 3)) * d * d + 1
+    far = ((a * d - 5 * a) * d + 8 * a) * d - 4 * a
+    return np.where(d <= 1, near, far)
+
+
+def sample_band(band, rows, cols, method='nearest'):
+    """
+    Interpolate a 2D array at fractional pixel positions.
+    rows, cols are in pixel units with pixel edges on the integers, as returned by the
+    inverse affine transform. NaN values in the band propagate to the samples, and
+    positions outside the band return NaN.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation '{method}', use one of {INTERPOLATION_METHODS}")
+    height, width = band.shape
+    rows = np.asarray(rows, dtype=float)
+    cols = np.asarray(cols, dtype=float)
+    inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+
+    if method == 'nearest':
+        r = np.clip(np.floor(rows).astype(int), 0, height - 1)
+        c = np.clip(np.floor(cols).astype(int), 0, width - 1)
+        z = band[r, c].astype(float)
+    else:
+        # Continuous coordinates with the pixel centres on the integers
+        rr = rows - 0.5
+        cc = cols - 0.5
+        r0 = np.floor(rr)
+        c0 = np.floor(cc)
+        fr = rr - r0
+        fc = cc - c0
+        if method == 'bilinear':
+            offsets = np.arange(2)
+            wr = np.stack([1 - fr, fr], axis=-1)
+            wc = np.stack([1 - fc, fc], axis=-1)
+        else:
+            offsets = np.arange(-1, 3)
+            wr = _cubic_weights(fr)
+            wc = _cubic_weights(fc)
+        r = np.clip(r0.astype(int)[:, None] + offsets, 0, height - 1)
+        c = np.clip(c0.astype(int)[:, None] + offsets, 0, width - 1)
+        values = band[r[:, :, None], c[:, None, :]].astype(float)
+        z = np.einsum('nij,ni,nj->n', values, wr, wc)
+    z[~inside] = np.nan
+    return z
+
+
+def world_to_pixel(transform, x, y):
+    """ Map arrays of world coordinates to fractional (row, col) with the inverse affine """
+    inv = ~transform
+    cols = inv.a * x + inv.b * y + inv.c
+    rows = inv.d * x + inv.e * y + inv.f
+    return rows, cols
+
+
+def nodata_to_nan(band, nodata, block_rows=256):
+    """
+    Set the nodata pixels of a float band to NaN in place.
+    The comparison runs a block of rows at a time, so the temporary boolean mask stays a
+    small fraction of the band instead of one byte per pixel of the whole band.
+    """
+    if nodata is None or np.isnan(nodata):
+        return band
+    for i in range(0, band.shape[0], block_rows):
+        block = band[i:i + block_rows]
+        block[block == nodata] = np.nan
+    return band
+
+
+def read_window_float(src, window, dtype='float64', **kwargs):
+    """
+    Read a window of band 1 as float with the nodata pixels set to NaN.
+    GDAL converts straight into the output type, no copy of the band in its own type is made.
+    """
+    band = src.read(1, window=window, out_dtype=dtype, **kwargs)
+    return nodata_to_nan(band, src.nodata)
+
+
+def window_runs(rows, cols, idx, max_side=None):
+    """
+    Split the samples idx, in their order along a line, into consecutive runs whose pixel
+    bounding box is at most max_side pixels a side. A long diagonal line reads a chain of
+    small windows instead of one window as large as the raster.
+    """
+    max_side = max_side or MAX_WINDOW_SIDE
+    pending = [idx]
+    while pending:
+        idx = pending.pop()
+        span = max(np.ptp(rows[idx]), np.ptp(cols[idx]))
+        if span <= max_side or len(idx) == 1:
+            yield idx
+        else:
+            pending.extend(np.array_split(idx, min(int(np.ceil(span / max_side)) + 1, len(idx))))
+
+
+def sample_raster(src, x, y, method='nearest', groups=None):
+    """
+    Sample band 1 of an open rasterio dataset at the world coordinates x, y.
+    Only the windows that contain the samples are read. groups is an optional integer
+    array (e.g. the line id) used to read one window per group instead of one window
+    around every sample, which keeps long, far apart lines cheap; a group spanning more
+    than MAX_WINDOW_SIDE pixels is read in several windows (see window_runs).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.full(x.shape, np.nan)
+    if x.size == 0:
+        return z
+    rows, cols = world_to_pixel(src.transform, x, y)
+    if groups is None:
+        groups = np.zeros(x.shape, dtype=int)
+
+    pad = KERNEL_PAD[method]
+    order = np.argsort(groups, kind='stable')
+    bounds = np.flatnonzero(np.diff(groups[order])) + 1
+    for idx in (run for group in np.split(order, bounds) for run in window_runs(rows, cols, group)):
+        r = rows[idx]
+        c = cols[idx]
+        row_off = max(int(np.floor(r.min())) - pad, 0)
+        col_off = max(int(np.floor(c.min())) - pad, 0)
+        row_end = min(int(np.floor(r.max())) + pad + 1, src.height)
+        col_end = min(int(np.floor(c.max())) + pad + 1, src.width)
+        if row_end <= row_off or col_end <= col_off:
+            continue  # The whole group is outside the raster
+        window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+        band = read_window_float(src, window)
+        # The window covers every sample inside the raster, the rest come back as NaN
+        z[idx] = sample_band(band, r - row_off, c - col_off, method)
+    return z
+
+
+def extract_profiles(src, lines, point_interval_max=10, method='nearest', as_gdf=False):
+    """
+    Extract elevation profiles along straight lines or polylines.
+    src is an open rasterio dataset or a TileCatalogue.
+    lines: sequence of (label, xy) where xy holds the vertices of the line.
+    Returns a dict of columns (label, chainage, x, y, z, and line_id, the index of the
+    line of every sample), or a GeoDataFrame when as_gdf is True.
+    """
+    labels = np.array([label for label, _ in lines], dtype=object)
+    line_id, chainage, x, y = line_sample_points([xy for _, xy in lines], point_interval_max)
+    if hasattr(src, 'sample_points'):
+        z = src.sample_points(x, y, method=method, groups=line_id)
+    else:
+        z = sample_raster(src, x, y, method=method, groups=line_id)
+    profiles = {'label': labels[line_id], 'chainage': chainage, 'x': x, 'y': y, 'z': z, 'line_id': line_id}
+    if as_gdf:
+        return profiles_to_gdf(profiles, src.crs)
+    return profiles
+
+
+def profiles_to_gdf(profiles, crs):
+    """ Build a point GeoDataFrame from the columnar profiles """
+    # geopandas is slow to import, only load it when a GeoDataFrame is requested
+    import geopandas as gpd
+    geometry = gpd.points_from_xy(profiles['x'], profiles['y'])
+    return gpd.GeoDataFrame({k: profiles[k] for k in PROFILE_COLUMNS}, geometry=geometry, crs=crs)
+
+
+def profile_table(profiles, label):
+    """
+    One extracted profile as a Chainage/Elevation DataFrame, the layout of the Profile
+    input panel. Samples without data are dropped.
+    """
+    import pandas as pd
+    sel = (profiles['label'] == label) & ~np.isnan(profiles['z'])
+    return pd.DataFrame({'Chainage': profiles['chainage'][sel], 'Elevation': profiles['z'][sel]})
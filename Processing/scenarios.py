@@ -0,0 +1,337 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Processing.grid import grid_from_settings
+from Processing.nonerodible import NE_FILE
+from Processing.params import (PARAMS_FILE, active_frame, compiled_schema, format_frame, parse_value, read_params,
+                               validate_frame)
+from Processing.xbeach_export import BED_FILE, GRID_FILE
+
+STORE_DIR = 'store'
+RUNS_DIR = 'runs'
+INDEX_FILE = 'scenarios.csv'
+BC_FILE = 'bc.txt'
+TIDE_FILE = 'tide.txt'
+# How the run folders get their input files: a hard link to the stored file (a copy when
+# links are not possible), a symbolic link, a copy, or no file at all with params.txt
+# referring to the store
+LINK_MODES = ('hardlink', 'symlink', 'copy', 'reference')
+# Grid settings for profiles given as Chainage/Elevation tables
+DEFAULT_GRID = {'criterion': 'Wavelength', 'dx_min': 0.05, 'dx_max': 1.0, 'a': 10.0, 'b': 50.0,
+                'water_level': 0.0, 'max_ratio': 1.05, 'orientation': 'Auto'}
+
+
+class InputStore:
+    """
+    Content-addressed store of the input files of a scenario set: every file is saved
+    once under store/<first 2 characters of its hash>/<hash>, whatever the number of runs
+    or of inputs with the same content.
+    """
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.root = self.out_dir.joinpath(STORE_DIR)
+        self.added = 0
+        self.stored = 0
+        self.bytes_stored = 0
+
+    def add(self, data):
+        """ Store bytes, returns their hash """
+        key = hashlib.sha1(data).hexdigest()
+        path = self.path(key)
+        self.added += 1
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + '.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(path)
+            self.stored += 1
+            self.bytes_stored += len(data)
+        return key
+
+    def path(self, key):
+        return self.root.joinpath(key[:2], key)
+
+
+def _table_text(table):
+    """ A table as whitespace separated rows without header, the layout of the XBeach-G input files """
+    buffer = io.StringIO()
+    np.savetxt(buffer, np.asarray(table, dtype=float), fmt='%.6g')
+    return buffer.getvalue().encode()
+
+
+def _read_table(source):
+    return source if isinstance(source, pd.DataFrame) else pd.read_csv(source)
+
+
+def _label(source, i):
+    return Path(source).stem if isinstance(source, (str, Path)) else f'{i + 1}'
+
+
+def prepare_profile(store, source, grid_settings=None):
+    """
+    Store the grid files of a profile: either a folder with x.grd and bed.dep (and
+    nebed.dep), e.g. written by Export XBeach-G or the Grid panel, or a Chainage/Elevation
+    table (CSV or DataFrame) gridded with grid_settings.
+    Returns ({file name: hash}, parameters).
+    """
+    if isinstance(source, (str, Path)) and Path(source).is_dir():
+        source = Path(source)
+        files = {name: store.add(source.joinpath(name).read_bytes())
+                 for name in (GRID_FILE, BED_FILE, NE_FILE) if source.joinpath(name).exists()}
+        nx = len(np.loadtxt(source.joinpath(GRID_FILE), ndmin=1)) - 1
+    else:
+        table = _read_table(source)
+        x, z = grid_from_settings(table.iloc[:, 0].to_numpy(dtype=float), table.iloc[:, 1].to_numpy(dtype=float),
+                                  grid_settings or DEFAULT_GRID)[:2]
+        files = {GRID_FILE: store.add(_table_text(x[None])), BED_FILE: store.add(_table_text(z[None]))}
+        nx = len(x) - 1
+    params = {'nx': nx, 'vardx': 1, 'xfile': GRID_FILE, 'depfile': BED_FILE,
+              'struct': int(NE_FILE in files), 'ne_layer': NE_FILE if NE_FILE in files else None}
+    return files, params
+
+
+def prepare_storm(store, source):
+    """ Store a wave boundary file: a table (CSV or DataFrame) in the column order of the bcfile, or any other file as is """
+    if isinstance(source, (str, Path)) and Path(source).suffix.lower() != '.csv':
+        key = store.add(Path(source).read_bytes())
+    else:
+        key = store.add(_table_text(_read_table(source)))
+    return {BC_FILE: key}, {'bcfile': BC_FILE}
+
+
+def prepare_water_level(store, source):
+    """ Store a water level series (time, level) as the zs0file, starting from its first level """
+    table = _read_table(source)
+    levels = table.iloc[:, :2].to_numpy(dtype=float)
+    return {TIDE_FILE: store.add(_table_text(levels))}, {'tideloc': 1, 'zs0file': TIDE_FILE, 'zs0': levels[0, 1]}
+
+
+def parse_sweep(text):
+    """ Sweeps from lines of 'name = v1, v2, ...', values typed by the parameter schema """
+    sweep = {}
+    for line in text.splitlines():
+        if line.strip():
+            name, values = (part.strip() for part in line.split('=', 1))
+            sweep[name] = [parse_value(name, v) for v in values.split(',') if v.strip()]
+    return sweep
+
+
+def _combinations(sizes, sample=None, seed=0):
+    """ Index of every axis for the whole product of the axes, or a random sample of it, without building the product """
+    total = int(np.prod(sizes))
+    if sample and sample < total:
+        flat = np.sort(np.random.default_rng(seed).choice(total, size=sample, replace=False))
+    else:
+        flat = np.arange(total)
+    return np.unravel_index(flat, sizes)
+
+
+def _write_runs(tasks):
+    """ Worker: create run folders, link their inputs and write params.txt """
+    for run_dir, text, files, mode in tasks:
+        run_dir = Path(run_dir)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        for name, stored in files:
+            target = run_dir.joinpath(name)
+            if target.exists() or target.is_symlink():
+                target.unlink()
+            if mode == 'hardlink':
+                try:
+                    os.link(stored, target)
+                    continue
+                except OSError:
+                    pass
+            elif mode == 'symlink':
+                os.symlink(os.path.relpath(stored, run_dir), target)
+                continue
+            shutil.copyfile(stored, target)
+        run_dir.joinpath(PARAMS_FILE).write_text(text)
+    return len(tasks)
+
+
+def generate_scenarios(out_dir, profiles, storms=(), water_levels=(), sweep=None, base=None, sample=None, seed=0,
+                       grid_settings=None, link='hardlink', workers=None, chunk_size=200, progress=None):
+    """
+    Write one XBeach-G run folder per combination of profile, storm, water level and
+    swept parameter values (the cartesian product, or a random sample of sample runs).
+    profiles, storms and water_levels are lists of (label, source) with source a path or
+    a DataFrame (see prepare_profile, prepare_storm and prepare_water_level); sweep maps
+    parameter names to their values; base holds the other parameters.
+    Every input is converted and stored once (see InputStore), runs with the same files and
+    parameters are written once, and the folders are written by a process pool.
+    progress is an optional callable receiving (runs written, total); when it returns True
+    the generation stops. Returns a summary dict, the runs are listed in scenarios.csv.
+    """
+    if link not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{link}', use one of {LINK_MODES}")
+    start = time.perf_counter()
+    out_dir = Path(out_dir)
+    store = InputStore(out_dir)
+    sweep = sweep or {}
+    axes = []  # (axis name, labels, [(files, params)])
+    axes.append(('profile', [label for label, _ in profiles],
+                 [prepare_profile(store, source, grid_settings) for _, source in profiles]))
+    for name, items, prepare in (('storm', storms, prepare_storm), ('water_level', water_levels, prepare_water_level)):
+        if items:
+            axes.append((name, [label for label, _ in items], [prepare(store, source) for _, source in items]))
+    for name, values in sweep.items():
+        axes.append((name, list(values), [({}, {name: value}) for value in values]))
+    if not profiles or any(not labels for _, labels, _ in axes):
+        raise ValueError('Every input set and sweep needs at least one value')
+    combos = _combinations([len(labels) for _, labels, _ in axes], sample, seed)
+    n = len(combos[0])
+
+    # Parameters of every run, one column per parameter set by an axis
+    columns = {}
+    index = {}
+    files = {}
+    for (name, labels, prepared), idx in zip(axes, combos):
+        index[name] = np.asarray(labels, dtype=object)[idx]
+        for item_files, item_params in prepared:
+            for key in item_params:
+                columns.setdefault(key, np.full(n, None, dtype=object))
+            for key in item_files:
+                files.setdefault(key, np.full(n, None, dtype=object))
+        for i, (item_files, item_params) in enumerate(prepared):
+            rows = idx == i
+            for key, value in item_params.items():
+                columns[key][rows] = value
+            for key, value in item_files.items():
+                files[key][rows] = value
+    variants = pd.DataFrame(columns)
+    for key in variants.columns:
+        # Numeric columns without gaps are formatted as numbers
+        if variants[key].notna().all():
+            variants[key] = variants[key].infer_objects()
+    given = base
+    base = {k: v for k, v in (base or compiled_schema().defaults(active=False)).items() if k not in variants}
+    # Parameters follow the swept values they depend on, run by run
+    variants, base = active_frame(variants, base)
+    if given:
+        defaults = compiled_schema().defaults(active=False)
+        ignored = sorted(k for k in given if k not in base and k not in variants and given[k] != defaults.get(k))
+        if ignored:
+            print(f"Ignored in every run, no effect with the other parameters: {', '.join(ignored)}")
+    if link == 'reference':
+        # The parameters name the stored files, relative to the run folders
+        for key, param in (('xfile', GRID_FILE), ('depfile', BED_FILE), ('ne_layer', NE_FILE), ('bcfile', BC_FILE),
+                           ('zs0file', TIDE_FILE)):
+            if param in files and key in variants:
+                variants[key] = [None if h is None else f'../../{STORE_DIR}/{h[:2]}/{h}' for h in files[param]]
+
+    issues = validate_frame(variants, base)
+    errors = issues[issues['severity'] == 'error']
+    if len(errors):
+        first = errors.drop_duplicates(['name', 'message']).head(5)
+        raise ValueError(f'{errors["variant"].nunique()} of {n} runs have invalid parameters: ' +
+                         '; '.join(f'{r.name}: {r.message}' for r in first.itertuples()))
+    texts = format_frame(variants, base)
+
+    # Runs with the same files and parameters are written once
+    file_names = list(files)
+    keys = [hashlib.sha1((text + '|'.join(f'{name}:{files[name][i]}' for name in file_names)).encode()).hexdigest()
+            for i, text in enumerate(texts)]
+    first_run = {}
+    run_ids = [f'r{i + 1:06d}' for i in range(n)]
+    same_as = [first_run.setdefault(key, run_id) for key, run_id in zip(keys, run_ids)]
+    unique = [i for i in range(n) if same_as[i] == run_ids[i]]
+
+    runs_dir = out_dir.joinpath(RUNS_DIR)
+    tasks = []
+    for i in unique:
+        run_files = [] if link == 'reference' else [(name, str(store.path(files[name][i]))) for name in file_names
+                                                    if files[name][i] is not None]
+        tasks.append((str(runs_dir.joinpath(run_ids[i])), texts[i], run_files, link))
+    workers = workers or os.cpu_count() or 1
+    done = 0
+    cancelled = False
+    # Spawned workers, forking the GUI would copy the state of its threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_write_runs, tasks[i:i + chunk_size]): i for i in range(0, len(tasks), chunk_size)}
+        for future in as_completed(futures):
+            done += future.result()
+            if progress is not None and progress(done, len(tasks)):
+                cancelled = True
+                for f in futures:
+                    f.cancel()
+                break
+    # Chunks that ran, with the ones still running when the generation was cancelled
+    written = set()
+    for future, i in futures.items():
+        if not future.cancelled() and future.exception() is None:
+            written.update(Path(run_dir).name for run_dir, *_ in tasks[i:i + chunk_size])
+    done = len(written)
+
+    table = pd.DataFrame({'run': run_ids, 'directory': [f'{RUNS_DIR}/{run_ids[i]}' if same_as[i] == run_ids[i]
+                                                        else f'{RUNS_DIR}/{same_as[i]}' for i in range(n)],
+                          'same_as': [s if s != r else '' for s, r in zip(same_as, run_ids)],
+                          'key': keys, **index})
+    if cancelled:
+        # Only the runs whose folder was written
+        table = table[[s in written for s in same_as]]
+    table.to_csv(out_dir.joinpath(INDEX_FILE), index=False)
+    elapsed = time.perf_counter() - start
+    summary = {'runs': n, 'unique_runs': len(unique), 'written': done, 'cancelled': cancelled,
+               'files_referenced': int(sum(pd.notna(files[name]).sum() for name in file_names)),
+               'files_stored': store.stored, 'bytes_stored': store.bytes_stored,
+               'warnings': int((issues['severity'] == 'warning').sum()), 'seconds': elapsed,
+               'runs_per_second': done / elapsed if elapsed else 0.0}
+    print(f"{n} runs ({len(unique)} unique), {done} folders written in {elapsed:.1f}s "
+          f"({summary['runs_per_second']:.0f} runs/s); {store.stored} input files stored once for "
+          f"{summary['files_referenced']} references -> {out_dir}")
+    return summary
+
+
+def _inputs(paths):
+    return [(_label(path, i), path) for i, path in enumerate(paths or [])]
+
+
+def main(argv=None):
+    """ Command line entry point, run from the repository root with `python -m Processing.scenarios` """
+    parser = argparse.ArgumentParser(description='Write XBeach-G run folders for every combination of inputs.')
+    parser.add_argument('output', help='Folder of the scenario set')
+    parser.add_argument('--profiles', nargs='+', required=True,
+                        help='Profile folders (x.grd, bed.dep) or Chainage/Elevation CSV files')
+    parser.add_argument('--storms', nargs='*', help='Wave boundary files (CSV tables or bcfiles)')
+    parser.add_argument('--water-levels', nargs='*', help='Water level series (CSV with time, level)')
+    parser.add_argument('--sweep', action='append', default=[], help='Swept parameter, e.g. D50=0.01,0.02 (repeatable)')
+    parser.add_argument('--params', help='params.txt with the other parameters (default: the GUI defaults)')
+    parser.add_argument('--sample', type=int, default=None, help='Random sample of the combinations')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the sample (default: 0)')
+    parser.add_argument('--link', choices=LINK_MODES, default='hardlink', help='Inputs of the run folders (default: hardlink)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    args = parser.parse_args(argv)
+    generate_scenarios(args.output, _inputs(args.profiles), _inputs(args.storms), _inputs(args.water_levels),
+                       sweep=parse_sweep('\n'.join(args.sweep)), base=read_params(args.params) if args.params else None,
+                       sample=args.sample, seed=args.seed, link=args.link, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
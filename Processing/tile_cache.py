@@ -0,0 +1,248 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import contextily as ctx
+import mercantile
+import numpy as np
+import requests
+from PIL import Image
+from rasterio.warp import transform_bounds
+
+DEFAULT_CACHE_DIR = Path.home().joinpath('.xb-gui', 'tiles')
+CONFIG_PATH = Path(__file__).parent.parent.joinpath('configuration.conf')
+TILE_SIZE = 256
+GRAY_WEIGHTS = np.array([0.2989, 0.5870, 0.1140])
+
+
+class TileCache:
+    """
+    Disk backed cache of XYZ basemap tiles with least recently used eviction.
+    Tiles are stored as <cache_dir>/<provider>/<z>/<x>/<y>.tile with the bytes served by
+    the provider, and their grayscale version next to them as <y>.gray.png.
+    In offline mode only the cache and the optional local tile directory
+    (laid out as <local_dir>/<z>/<x>/<y>.png or .jpg) are used.
+    One cache is shared by the loader threads, the index and the size are changed under a lock.
+    """
+    def __init__(self, cache_dir=None, max_size_mb=500, offline=False, local_dir=None, timeout=10):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.offline = offline
+        self.local_dir = Path(local_dir) if local_dir else None
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._scan()
+        self.evict()
+
+    @classmethod
+    def from_config(cls, config_path=CONFIG_PATH):
+        """ Create the cache from the 'tile_cache' section of configuration.conf """
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                settings = json.load(f).get('tile_cache', {})
+        except Exception as e:
+            print(e)
+            settings = {}
+        return cls(cache_dir=settings.get('cache_dir') or None,
+                   max_size_mb=settings.get('max_size_mb', 500),
+                   offline=settings.get('offline', False),
+                   local_dir=settings.get('local_dir') or None)
+
+    def _scan(self):
+        """ Index the files on disk once, oldest access first """
+        files = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.cache_dir.rglob('*') if p.is_file()]
+        files.sort(key=lambda f: f[0])
+        self._index = OrderedDict((p, size) for _, size, p in files)
+        self.size = sum(self._index.values())
+
+    def _tile_path(self, provider, z, x, y, gray=False):
+        name = re.sub(r'[^\w.-]', '_', provider.get('name', 'provider'))
+        return self.cache_dir.joinpath(name, str(z), str(x), f'{y}.gray.png' if gray else f'{y}.tile')
+
+    def _touch(self, path):
+        """ Mark a cached tile as just used, False when it is not in the cache (any more) """
+        with self._lock:
+            if path not in self._index:
+                return False
+            self._index.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def _store(self, path, content):
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            self.size += len(content) - self._index.get(path, 0)
+            self._index[path] = len(content)
+            self._index.move_to_end(path)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self.size -= size
+
+    def evict(self):
+        """ Delete the least recently used tiles until the cache fits its size limit """
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            for path in list(self._index):
+                path.unlink(missing_ok=True)
+            self._index.clear()
+            self.size = 0
+
+    def _local_tile(self, z, x, y):
+        if self.local_dir is None:
+            return None
+        for ext in ('png', 'jpg', 'jpeg'):
+            path = self.local_dir.joinpath(str(z), str(x), f'{y}.{ext}')
+            if path.exists():
+                return path.read_bytes()
+        return None
+
+    def _fetch(self, provider, z, x, y):
+        url = provider.build_url(x=x, y=y, z=z)
+        response = requests.get(url, timeout=self.timeout, headers={'user-agent': 'xb-gui'})
+        response.raise_for_status()
+        return response.content
+
+    def get_tile(self, provider, z, x, y, gray=False):
+        """
+        Tile as a uint8 array, (256, 256, 4) RGBA or (256, 256) grayscale.
+        Returns None when the tile is not available, e.g. not cached in offline mode.
+        """
+        path = self._tile_path(provider, z, x, y, gray)
+        if self._touch(path):
+            try:
+                with Image.open(path) as image:
+                    arr = np.asarray(image if gray else image.convert('RGBA'))
+                self.hits += 1
+                return arr
+            except OSError:
+                pass  # Evicted by another thread meanwhile, read again
+
+        if gray:
+            rgba = self.get_tile(provider, z, x, y)
+            if rgba is None:
+                return None
+            arr = np.dot(rgba[..., :3], GRAY_WEIGHTS).round().astype(np.uint8)
+            buffer = io.BytesIO()
+            Image.fromarray(arr).save(buffer, format='PNG')
+            self._store(path, buffer.getvalue())
+            return arr
+
+        self.misses += 1
+        content = self._local_tile(z, x, y)
+        if content is None and not self.offline:
+            try:
+                content = self._fetch(provider, z, x, y)
+            except requests.RequestException as e:
+                print(f'Tile {z}/{x}/{y} not available: {e}')
+        if content is None:
+            return None
+        self._store(path, content)
+        return np.asarray(Image.open(io.BytesIO(content)).convert('RGBA'))
+
+    def mosaic(self, provider, bounds, crs, zoom='auto', gray=False, cancelled=None):
+        """
+        Merge the tiles covering bounds (left, bottom, right, top in crs).
+        Returns the image and its extent [minX, maxX, minY, maxY] in Web Mercator.
+        Tiles that are not available are left transparent (RGBA) or black (grayscale).
+        cancelled is an optional callable checked before every tile; when it returns True
+        the mosaic is abandoned and (None, None) is returned.
+        """
+        west, south, east, north = transform_bounds(crs, 'EPSG:4326', *bounds)
+        if zoom == 'auto':
+            zoom = auto_zoom(west, south, east, north)
+        zoom = int(min(zoom, provider.get('max_zoom', 19)))
+        tiles = list(mercantile.tiles(west, south, east, north, zooms=zoom))
+        xs = [t.x for t in tiles]
+        ys = [t.y for t in tiles]
+        x0, y0 = min(xs), min(ys)
+        shape = ((max(ys) - y0 + 1) * TILE_SIZE, (max(xs) - x0 + 1) * TILE_SIZE)
+        img = np.zeros(shape if gray else shape + (4,), dtype=np.uint8)
+        for t in tiles:
+            if cancelled is not None and cancelled():
+                return None, None
+            arr = self.get_tile(provider, t.z, t.x, t.y, gray=gray)
+            if arr is None or arr.shape[:2] != (TILE_SIZE, TILE_SIZE):
+                continue
+            row, col = (t.y - y0) * TILE_SIZE, (t.x - x0) * TILE_SIZE
+            img[row:row + TILE_SIZE, col:col + TILE_SIZE] = arr
+        left, top = mercantile.xy_bounds(mercantile.Tile(x0, y0, zoom))[0::3]
+        right, bottom = mercantile.xy_bounds(mercantile.Tile(max(xs), max(ys), zoom))[2:0:-1]
+        return img, (left, right, bottom, top)
+
+
+def auto_zoom(west, south, east, north):
+    """ Same zoom rule as contextily's zoom='auto' """
+    zoom_lon = np.ceil(np.log2(360 * 2.0 / abs(east - west)))
+    zoom_lat = np.ceil(np.log2(360 * 2.0 / abs(north - south)))
+    return int(min(zoom_lon, zoom_lat))
+
+
+def basemap_image(cache, bounds, crs, source=ctx.providers.Esri.WorldImagery, gray=True, cancelled=None):
+    """
+    Cached basemap covering bounds (left, bottom, right, top), warped to crs.
+    Returns (img, extent) ready for imshow, or None when cancelled.
+    Does not touch matplotlib, so it can run in a worker thread.
+    """
+    img, extent = cache.mosaic(source, bounds, crs, gray=gray, cancelled=cancelled)
+    if img is None:
+        return None
+    img, extent = ctx.warp_tiles(img[..., None] if gray else img, extent, t_crs=crs)
+    print(f'Basemap tiles: {cache.hits} cache hits, {cache.misses} misses, cache size {cache.size / 1e6:.1f}MB')
+    return (img[..., 0] if gray else img), extent
+
+
+def show_basemap(ax, img, extent, alpha=0.5):
+    """ Draw a basemap image below every other artist without changing the axes limits """
+    xlim = ax.get_xlim()
+    ylim = ax.get_ylim()
+    im = ax.imshow(img, extent=extent, cmap='gray' if img.ndim == 2 else None, alpha=alpha,
+                   interpolation='bilinear', zorder=-1)
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+    return im
+
+
+def add_basemap(ax, crs, cache, source=ctx.providers.Esri.WorldImagery, gray=True, alpha=0.5):
+    """
+    Draw a cached basemap under the current axes limits, warped to crs.
+    Replacement for contextily.add_basemap that goes through the TileCache.
+    """
+    xlim = ax.get_xlim()
+    ylim = ax.get_ylim()
+    img, extent = basemap_image(cache, (xlim[0], ylim[0], xlim[1], ylim[1]), crs, source=source, gray=gray)
+    return show_basemap(ax, img, extent, alpha=alpha)
@@ -0,0 +1,250 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import rasterio
+import shapely
+from rasterio.coords import BoundingBox
+from rasterio.crs import CRS
+from rasterio.warp import Resampling
+from rasterio.windows import Window, from_bounds
+
+from Processing.sampling import KERNEL_PAD, sample_band, sample_raster, world_to_pixel
+
+INDEX_NAME = '.xbgui_catalogue.json'
+INDEX_VERSION = 1
+
+
+class TileCatalogue:
+    """
+    A directory of DEM tiles used as one raster, without merging them.
+    The tile footprints and metadata are persisted in <directory>/.xbgui_catalogue.json,
+    so a directory is only scanned once; a shapely STRtree over the footprints is rebuilt
+    from it on load. Tiles are opened on demand and kept in a small LRU pool of handles.
+    Exposes the parts of the rasterio dataset API used by RasterLineApp (crs, bounds, res,
+    width, height, nodata, overviews, close).
+    """
+    def __init__(self, directory, tiles, crs, max_open=16):
+        self.directory = Path(directory)
+        self.tiles = tiles
+        self.crs = CRS.from_user_input(crs)
+        self.max_open = max_open
+        self.nodata = None  # Reads are returned as float with NaN for nodata
+        self._pool = OrderedDict()
+
+        self.tile_bounds = np.array([t['bounds'] for t in tiles], dtype=float).reshape(-1, 4)
+        self._tree = shapely.STRtree(shapely.box(*self.tile_bounds.T))
+        left, bottom = self.tile_bounds[:, :2].min(axis=0)
+        right, top = self.tile_bounds[:, 2:].max(axis=0)
+        self.bounds = BoundingBox(left, bottom, right, top)
+        self.res = tuple(np.min([t['res'] for t in tiles], axis=0))
+        # Size of the mosaic at the finest tile resolution
+        self.width = int(round((right - left) / self.res[0]))
+        self.height = int(round((top - bottom) / self.res[1]))
+
+    @classmethod
+    def scan(cls, directory, pattern='*.tif', max_open=16):
+        """
+        Catalogue every raster matching pattern in directory. Tiles already in the index
+        with the same size and modification time are not opened again. Tiles with a CRS
+        different from the first one are skipped.
+        """
+        directory = Path(directory)
+        index_path = directory.joinpath(INDEX_NAME)
+        known = {}
+        if index_path.exists():
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == INDEX_VERSION:
+                    known = {t['path']: t for t in index['tiles']}
+            except Exception as e:
+                print(e)
+
+        tiles = []
+        crs = None
+        changed = False
+        for path in sorted(directory.glob(pattern)):
+            stat = path.stat()
+            entry = known.get(path.name)
+            if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                changed = True
+                with rasterio.open(path) as src:
+                    entry = {'path': path.name, 'bounds': list(src.bounds), 'res': list(src.res),
+                             'width': src.width, 'height': src.height, 'nodata': src.nodata,
+                             'dtype': src.dtypes[0], 'crs': src.crs.to_wkt() if src.crs else None,
+                             'mtime': stat.st_mtime, 'size': stat.st_size}
+            if crs is None:
+                crs = entry['crs']
+            elif entry['crs'] != crs:
+                print(f'Skipping {path.name}: CRS differs from the other tiles')
+                continue
+            tiles.append(entry)
+        if not tiles:
+            raise ValueError(f'No rasters matching {pattern} in {directory}')
+
+        if changed or len(tiles) != len(known):
+            try:
+                with open(index_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': INDEX_VERSION, 'tiles': tiles}, f)
+            except OSError as e:
+                # Read-only folder or share, the tiles are scanned again next time
+                print(f'Catalogue index not saved: {e}')
+        print(f'Catalogue of {len(tiles)} tiles in {directory}')
+        return cls(directory, tiles, crs, max_open=max_open)
+
+    def open(self, i):
+        """ Handle of tile i, from the pool of open tiles """
+        if i in self._pool:
+            self._pool.move_to_end(i)
+            return self._pool[i]
+        src = rasterio.open(self.directory.joinpath(self.tiles[i]['path']), mode='r')
+        self._pool[i] = src
+        while len(self._pool) > self.max_open:
+            _, old = self._pool.popitem(last=False)
+            old.close()
+        return src
+
+    def close(self):
+        for src in self._pool.values():
+            src.close()
+        self._pool.clear()
+
+    def overviews(self, bidx):
+        return []
+
+    def query(self, geometry):
+        """ Indices of the tiles whose footprint intersects a shapely geometry """
+        return self._tree.query(geometry, predicate='intersects')
+
+    def sample_points(self, x, y, method='nearest', groups=None):
+        """
+        Sample the tiles at the world coordinates x, y, same contract as sampling.sample_raster.
+        Only the tiles crossed by the bounding box of each group are opened. A sample on a
+        tile seam, or on nodata in one tile, takes its value from the next tile that has data.
+        Bilinear and cubic samples near the edge of a tile read the pixels of the kernel
+        beyond the edge from the neighbouring tiles, so there are no seams at tile borders.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        z = np.full(x.shape, np.nan)
+        if x.size == 0:
+            return z
+        if groups is None:
+            groups = np.zeros(x.shape, dtype=int)
+        order = np.argsort(groups, kind='stable')
+        splits = np.flatnonzero(np.diff(groups[order])) + 1
+        members = np.split(order, splits)
+        boxes = shapely.box([x[m].min() for m in members], [y[m].min() for m in members],
+                            [x[m].max() for m in members], [y[m].max() for m in members])
+        group_idx, tile_idx = self._tree.query(boxes, predicate='intersects')
+
+        for tile in np.unique(tile_idx):
+            idx = np.concatenate([members[g] for g in group_idx[tile_idx == tile]])
+            left, bottom, right, top = self.tile_bounds[tile]
+            idx = idx[np.isnan(z[idx]) & (x[idx] >= left) & (x[idx] <= right) & (y[idx] >= bottom) & (y[idx] <= top)]
+            if idx.size == 0:
+                continue
+            pad = KERNEL_PAD[method]
+            if pad:
+                src = self.open(tile)
+                rows, cols = world_to_pixel(src.transform, x[idx], y[idx])
+                sides = np.stack([rows < pad, rows >= src.height - pad, cols < pad, cols >= src.width - pad])
+                edge = sides.any(axis=0)
+                # One window per group along each side, a line crossing the tile does not read all of it
+                key = groups[idx] * 4 + np.argmax(sides, axis=0)
+                for k in np.unique(key[edge]):
+                    sel = edge & (key == k)
+                    z[idx[sel]] = self._sample_edge(tile, rows[sel], cols[sel], method)
+                idx = idx[~edge]
+            if idx.size:
+                # Opened again, reading the neighbours may have closed it
+                z[idx] = sample_raster(self.open(tile), x[idx], y[idx], method=method, groups=groups[idx])
+        return z
+
+    def _sample_edge(self, tile, rows, cols, method):
+        """
+        Interpolate at pixel positions of a tile near its edge, on a window of the tile grid
+        that reaches past the edge, the pixels beyond it read from the neighbouring tiles.
+        """
+        src = self.open(tile)
+        tile_height, tile_width = src.height, src.width
+        pad = KERNEL_PAD[method]
+        row_off = int(np.floor(rows.min())) - pad
+        col_off = int(np.floor(cols.min())) - pad
+        height = int(np.floor(rows.max())) + pad + 1 - row_off
+        width = int(np.floor(cols.max())) + pad + 1 - col_off
+        window = Window(col_off, row_off, width, height)
+        band = src.read(1, window=window, out_dtype='float64', boundless=True, masked=True).filled(np.nan)
+        bounds = src.window_bounds(window)
+        for other in self.query(shapely.box(*bounds)):
+            if other == tile or not np.isnan(band).any():
+                continue
+            neighbour = self.open(other)
+            data = neighbour.read(1, window=from_bounds(*bounds, transform=neighbour.transform), out_shape=band.shape,
+                                  boundless=True, masked=True, resampling=Resampling.nearest)
+            values = data.astype(float).filled(np.nan)
+            fill = np.isnan(band)
+            band[fill] = values[fill]
+        z = sample_band(band, rows - row_off, cols - col_off, method)
+        # Outside the tile the sample belongs to a neighbour, or to no tile
+        z[(rows < 0) | (rows > tile_height) | (cols < 0) | (cols > tile_width)] = np.nan
+        return z
+
+    def read_view(self, xlim, ylim, canvas_size):
+        """
+        Mosaic of the tiles inside the axes limits, same contract as raster_extract.read_view.
+        Every tile is read decimated straight into its part of a canvas sized grid.
+        """
+        xlim = sorted(xlim)
+        ylim = sorted(ylim)
+        left = max(xlim[0], self.bounds.left)
+        right = min(xlim[1], self.bounds.right)
+        bottom = max(ylim[0], self.bounds.bottom)
+        top = min(ylim[1], self.bounds.top)
+        if left >= right or bottom >= top:
+            return None
+
+        canvas_w, canvas_h = canvas_size
+        res = max((xlim[1] - xlim[0]) / canvas_w, (ylim[1] - ylim[0]) / canvas_h, min(self.res))
+        out_w = max(int(np.ceil((right - left) / res)), 1)
+        out_h = max(int(np.ceil((top - bottom) / res)), 1)
+        right = left + out_w * res
+        bottom = top - out_h * res
+        out = np.full((out_h, out_w), np.nan, dtype=np.float32)
+
+        for tile in self.query(shapely.box(left, bottom, right, top)):
+            t_left, t_bottom, t_right, t_top = self.tile_bounds[tile]
+            c0 = max(int(np.floor((t_left - left) / res)), 0)
+            c1 = min(int(np.ceil((t_right - left) / res)), out_w)
+            r0 = max(int(np.floor((top - t_top) / res)), 0)
+            r1 = min(int(np.ceil((top - t_bottom) / res)), out_h)
+            if c1 <= c0 or r1 <= r0:
+                continue
+            src = self.open(tile)
+            win = from_bounds(left + c0 * res, top - r1 * res, left + c1 * res, top - r0 * res, transform=src.transform)
+            data = src.read(1, window=win, out_shape=(r1 - r0, c1 - c0), boundless=True, masked=True,
+                            resampling=Resampling.nearest)
+            values = data.astype(np.float32).filled(np.nan)
+            block = out[r0:r1, c0:c1]
+            fill = np.isnan(block)
+            block[fill] = values[fill]
+        return out, (left, right, bottom, top), res
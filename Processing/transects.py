@@ -0,0 +1,95 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+
+def arc_length(xy):
+    """ Cumulative distance along a polyline, starting at 0 """
+    xy = np.asarray(xy, dtype=float)
+    return np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))])
+
+
+def drop_repeats(xy):
+    """ The polyline without vertices repeating the previous one, i.e. without zero-length segments """
+    xy = np.asarray(xy, dtype=float)
+    keep = np.concatenate([[True], np.any(np.diff(xy, axis=0) != 0, axis=1)])
+    return xy[keep]
+
+
+def resample_polyline(xy, spacing):
+    """ Points at a constant spacing along a polyline, the last vertex included """
+    xy = drop_repeats(xy)
+    s = arc_length(xy)
+    # A station rounding to the end of the line would repeat the last vertex
+    stations = np.append(np.arange(0, s[-1] - 1e-9 * max(s[-1], 1), spacing), s[-1])
+    return np.column_stack([np.interp(stations, s, xy[:, 0]), np.interp(stations, s, xy[:, 1])])
+
+
+def smooth_polyline(xy, window):
+    """
+    Moving average of the vertices of a polyline over window points.
+    The ends are padded by reflection so the line keeps its length.
+    """
+    xy = np.asarray(xy, dtype=float)
+    if window < 2 or len(xy) < 3:
+        return xy
+    window = min(int(window), len(xy))
+    half = window // 2
+    padded = np.concatenate([2 * xy[0] - xy[half:0:-1], xy, 2 * xy[-1] - xy[-2:-half - 2:-1]])
+    kernel = np.ones(window) / window
+    smooth = np.column_stack([np.convolve(padded[:, i], kernel, mode='same') for i in range(2)])
+    return smooth[half:half + len(xy)]
+
+
+def shore_normal_transects(shoreline, spacing, offshore, onshore, smoothing=0, sea_side='left', prefix='T'):
+    """
+    Transects normal to a shoreline polyline.
+    Transects are placed every `spacing` metres along the shoreline and extend `offshore`
+    metres to the sea and `onshore` metres inland. The normals are taken from the shoreline
+    smoothed over `smoothing` metres (0 uses the digitised line as is). sea_side is the side
+    of the sea when walking along the shoreline in the digitised direction.
+    Each transect starts offshore and ends onshore, as XBeach-G profiles do.
+    Returns (labels, starts, ends, stations) with starts and ends as (n, 2) arrays.
+    """
+    shoreline = drop_repeats(shoreline)
+    if len(shoreline) < 2:
+        raise ValueError('The shoreline needs at least two distinct vertices')
+    if spacing <= 0:
+        raise ValueError('The transect spacing must be positive')
+
+    # A fine, evenly spaced version of the line makes the smoothing window a distance
+    step = min(spacing, arc_length(shoreline)[-1]) / 10
+    fine = resample_polyline(shoreline, step)
+    smooth = drop_repeats(smooth_polyline(fine, smoothing / step))
+    s = arc_length(smooth)
+
+    stations = np.arange(0, s[-1] + 1e-9, spacing)
+    origins = np.column_stack([np.interp(stations, s, smooth[:, 0]), np.interp(stations, s, smooth[:, 1])])
+    tangents = np.gradient(smooth, s, axis=0)
+    tangents = np.column_stack([np.interp(stations, s, tangents[:, 0]), np.interp(stations, s, tangents[:, 1])])
+    tangents /= np.hypot(*tangents.T)[:, None]
+
+    # Left normal of the walking direction
+    normals = np.column_stack([-tangents[:, 1], tangents[:, 0]])
+    if sea_side == 'right':
+        normals = -normals
+    starts = origins + offshore * normals
+    ends = origins - onshore * normals
+    width = len(str(len(stations)))
+    labels = [f'{prefix}{i + 1:0{width}d}' for i in range(len(stations))]
+    return labels, starts, ends, stations
@@ -0,0 +1,70 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+# Column transforms of the input tables. Every function takes whole arrays and returns
+# the new values, NaN samples stay NaN unless the transform fills them.
+
+
+def offset(values, amount):
+    return values + amount
+
+
+def scale(values, factor, origin=0.0):
+    """ Scale around origin, e.g. exaggerate a profile around mean sea level """
+    return origin + (values - origin) * factor
+
+
+def clamp(values, low, high):
+    return np.clip(values, min(low, high), max(low, high))
+
+
+def datum_shift(values, old_datum, new_datum):
+    """ Levels relative to old_datum made relative to new_datum, both given on the same reference """
+    return values + (old_datum - new_datum)
+
+
+def rezero(values, origin=None):
+    """ Distances from origin, by default the first value, e.g. to restart a chainage at 0 """
+    if origin is None:
+        finite = values[np.isfinite(values)]
+        origin = finite[0] if finite.size else 0.0
+    return values - origin
+
+
+def interpolate_gaps(x, values):
+    """ Fill the NaN values by linear interpolation over x, the ends take the nearest value """
+    values = np.array(values, dtype=float)
+    gaps = np.isnan(values)
+    known = ~gaps & np.isfinite(x)
+    if gaps.any() and known.any():
+        order = np.argsort(x[known], kind='stable')
+        values[gaps] = np.interp(x[gaps], x[known][order], values[known][order])
+    return values
+
+
+# Name: (labels of the parameters, function of (x, values, a, b)), in the order of the UI.
+# x is the first column of the table, values the column being transformed.
+TRANSFORMS = {
+    'Offset': (('Amount',), lambda x, values, a, b: offset(values, a)),
+    'Scale': (('Factor', 'Origin'), lambda x, values, a, b: scale(values, a, b)),
+    'Clamp': (('Min', 'Max'), lambda x, values, a, b: clamp(values, a, b)),
+    'Datum shift': (('Old datum', 'New datum'), lambda x, values, a, b: datum_shift(values, a, b)),
+    'Re-zero': ((), lambda x, values, a, b: rezero(values)),
+    'Interpolate gaps': ((), lambda x, values, a, b: interpolate_gaps(x, values)),
+}
@@ -0,0 +1,149 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import csv
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from Processing.sampling import extract_profiles
+
+GRID_FILE = 'x.grd'
+BED_FILE = 'bed.dep'
+INDEX_FILE = 'profiles.csv'
+INDEX_COLUMNS = ('label', 'directory', 'nx', 'length', 'zmin', 'zmax', 'x_start', 'y_start', 'x_end', 'y_end')
+WRITE_BUFFER = 1 << 16
+
+
+def profile_dirname(label):
+    """ Directory name of a profile, the label with the characters not allowed in paths replaced """
+    return re.sub(r'[^\w.-]', '_', str(label)) or 'profile'
+
+
+def profile_runs(profiles):
+    """
+    Split columnar profiles (as returned by extract_profiles) into one slice per profile.
+    The samples of a profile are contiguous, so no copy of the columns is made. Profiles
+    are told apart by their line, two lines may have the same label.
+    """
+    labels = profiles['label']
+    if len(labels) == 0:
+        return
+    ids = profiles['line_id'] if 'line_id' in profiles else labels
+    starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+    ends = np.append(starts[1:], len(labels))
+    for start, end in zip(starts, ends):
+        yield labels[start], slice(start, end)
+
+
+def write_profile_files(directory, chainage, z, fmt='%.3f'):
+    """
+    Write one 1D XBeach-G profile: the cross-shore grid in x.grd and the bed levels in
+    bed.dep, one row each. Bed levels are positive up, so the params file needs posdwn = -1.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory.joinpath(GRID_FILE), 'w', buffering=WRITE_BUFFER) as f:
+        np.savetxt(f, np.asarray(chainage)[None], fmt=fmt)
+    with open(directory.joinpath(BED_FILE), 'w', buffering=WRITE_BUFFER) as f:
+        np.savetxt(f, np.asarray(z)[None], fmt=fmt)
+
+
+class ProfileSetWriter:
+    """
+    Streaming writer of extracted profiles as XBeach-G inputs.
+    Every profile goes to <out_dir>/<label>/ (x.grd and bed.dep) as soon as its chunk is
+    written, and a row is added to <out_dir>/profiles.csv, so only the current chunk is
+    ever in memory. Samples without raster data are dropped; profiles left with fewer
+    than two samples are skipped and reported.
+    Use as a context manager, or call close() when done.
+    """
+    def __init__(self, out_dir, fmt='%.3f'):
+        self.out_dir = Path(out_dir)
+        self.fmt = fmt
+        self.written = 0
+        self.skipped = []
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._index = open(self.out_dir.joinpath(INDEX_FILE), 'w', newline='', buffering=WRITE_BUFFER)
+        # Labels are quoted when they hold commas, quotes or line breaks
+        self._rows = csv.writer(self._index, lineterminator='\n')
+        self._rows.writerow(INDEX_COLUMNS)
+        self._dirs = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not self._index.closed:
+            self._index.close()
+
+    def _directory(self, label):
+        # Labels that only differ in characters replaced in the name get a suffix
+        name = profile_dirname(label)
+        unique = name
+        i = 1
+        while unique in self._dirs:
+            i += 1
+            unique = f'{name}_{i}'
+        self._dirs.add(unique)
+        return unique
+
+    def write(self, profiles):
+        """ Write every profile of a chunk of columnar profiles, returns the number written """
+        n = 0
+        for label, run in profile_runs(profiles):
+            z = profiles['z'][run]
+            valid = ~np.isnan(z)
+            if valid.sum() < 2:
+                self.skipped.append(label)
+                print(f'Skipping profile {label}: less than two samples with raster data')
+                continue
+            chainage = profiles['chainage'][run][valid]
+            x = profiles['x'][run][valid]
+            y = profiles['y'][run][valid]
+            z = z[valid]
+            name = self._directory(label)
+            write_profile_files(self.out_dir.joinpath(name), chainage, z, fmt=self.fmt)
+            values = (chainage[-1] - chainage[0], z.min(), z.max(), x[0], y[0], x[-1], y[-1])
+            self._rows.writerow([label, name, len(z)] + [f'{v:.3f}' for v in values])
+            n += 1
+        self.written += n
+        return n
+
+
+def export_profiles(src, lines, out_dir, point_interval_max=10, method='nearest', chunk_size=100, progress=None):
+    """
+    Extract the profiles along lines (a list of (label, xy)) and write them as XBeach-G
+    input file sets, chunk_size lines at a time.
+    progress is an optional callable receiving the number of lines done; when it returns
+    True the export stops. Returns the ProfileSetWriter, with the written and skipped counts.
+    """
+    start = time.perf_counter()
+    with ProfileSetWriter(out_dir) as writer:
+        for i in range(0, len(lines), chunk_size):
+            chunk = lines[i:i + chunk_size]
+            writer.write(extract_profiles(src, chunk, point_interval_max, method=method))
+            if progress is not None and progress(i + len(chunk)):
+                print('Export cancelled')
+                break
+    print(f'{writer.written} profiles written to {out_dir} in {time.perf_counter() - start:.1f}s')
+    return writer
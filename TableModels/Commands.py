@@ -0,0 +1,97 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import QUndoCommand
+
+# Undo commands for the edits of a PandasModel. Each command keeps only what the edit
+# touches (the old and new cells, the removed rows, or the permutation of a sort), so
+# the memory of the undo stack grows with the edits and not with the table.
+
+
+class SetValuesCommand(QUndoCommand):
+    """ New values for some cells of one column, e.g. a cell edit or a bulk transform """
+    def __init__(self, model, rows, col, values, text='Edit'):
+        super().__init__(text)
+        self.model = model
+        self.rows = np.asarray(rows, dtype=int)
+        self.col = col
+        self.new = np.asarray(values, dtype=model.column(col).dtype)
+        self.old = model.column(col)[self.rows].copy()
+
+    def redo(self):
+        self.model.set_values(self.rows, self.col, self.new)
+
+    def undo(self):
+        # Reversed, so a row listed twice gets back its first old value
+        self.model.set_values(self.rows[::-1], self.col, self.old[::-1])
+
+
+class InsertRowsCommand(QUndoCommand):
+    """ count new rows before row, zero or taken from values """
+    def __init__(self, model, row, count=1, values=None, text='Insert rows'):
+        super().__init__(text)
+        self.model = model
+        self.row = min(max(row, 0), model.rowCount())
+        self.count = count
+        self.values = values
+
+    def redo(self):
+        self.model.insert_rows(self.row, self.count, self.values)
+
+    def undo(self):
+        self.model.remove_rows(np.arange(self.row, self.row + self.count))
+
+
+class RemoveRowsCommand(QUndoCommand):
+    """ Remove rows, keeping only their values to put them back """
+    def __init__(self, model, rows, text='Delete rows'):
+        super().__init__(text)
+        self.model = model
+        rows = np.unique(np.asarray(rows, dtype=int))
+        self.rows = rows[(rows >= 0) & (rows < model.rowCount())]
+        self.values = [model.column(c)[self.rows].copy() for c in range(model.columnCount())]
+
+    def redo(self):
+        self.model.remove_rows(self.rows)
+
+    def undo(self):
+        # Runs of consecutive rows are inserted back in increasing order, so every run
+        # lands at its original position
+        if self.rows.size == 0:
+            return
+        breaks = np.flatnonzero(np.diff(self.rows) > 1) + 1
+        for run in np.split(np.arange(self.rows.size), breaks):
+            values = pd.DataFrame({c: v[run] for c, v in enumerate(self.values)})
+            self.model.insert_rows(int(self.rows[run[0]]), len(run), values)
+
+
+class PermuteRowsCommand(QUndoCommand):
+    """ Reorder the rows, e.g. a sort, stored as the permutation only """
+    def __init__(self, model, order, text='Sort'):
+        super().__init__(text)
+        self.model = model
+        self.order = np.asarray(order, dtype=int)
+
+    def redo(self):
+        self.model.permute_rows(self.order)
+
+    def undo(self):
+        inverse = np.empty_like(self.order)
+        inverse[self.order] = np.arange(len(self.order))
+        self.model.permute_rows(inverse)
@@ -15,29 +15,227 @@ Copyright (C) 2025  Nikolaos Andreakos
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 from PyQt5 import QtCore
 
+from TableModels.Commands import SetValuesCommand
+
+# Rows formatted at once when a cell of a block is first displayed
+BLOCK_ROWS = 256
+# Formatted blocks kept in memory, per model
+MAX_BLOCKS = 512
+
+
 class PandasModel(QtCore.QAbstractTableModel):
     """
-    Class to populate a table view with a pandas dataframe
+    Class to populate a table view with a pandas dataframe.
+    The frame is held as one contiguous NumPy array per column. Cells are formatted a
+    block of BLOCK_ROWS rows of a column at a time, with a vectorized conversion, the
+    first time the view asks for them, and the strings are cached until an edit or a new
+    frame touches the block. Scrolling through millions of rows only formats what is shown.
+    The arrays have spare capacity at the end, so appending rows is amortised O(1) and
+    inserting or removing rows in the middle only moves the rows after them. Row changes
+    are announced with beginInsertRows/beginRemoveRows, views keep their scroll position
+    and selection.
+    decimals only rounds the displayed float cells, the stored values keep full precision.
+    With an undo_stack (QUndoStack) set, edits made in the view are pushed as commands.
     """
-    def __init__(self, data, parent=None):
+    def __init__(self, data=None, parent=None, editable=True, decimals=None):
         QtCore.QAbstractTableModel.__init__(self, parent)
-        self._data = data
+        self.editable = editable
+        self.decimals = decimals
+        self.undo_stack = None
+        self._names = []
+        self._buffers = []
+        self._n = 0
+        self._frame = None
+        self._cache = OrderedDict()
+        if data is not None:
+            self._load(data)
+
+    def _load(self, df):
+        self._names = list(df.columns)
+        # Own copies, the arrays of a frame can be read-only views
+        self._buffers = [np.array(df[c].to_numpy(), copy=True, order='C') for c in df.columns]
+        self._n = len(df)
+        self._frame = None
+        self._cache.clear()
+
+    def _reserve(self, n):
+        """ Grow the buffers geometrically to hold at least n rows """
+        capacity = len(self._buffers[0]) if self._buffers else 0
+        if n <= capacity:
+            return
+        capacity = max(n, int(capacity * 1.5), 16)
+        for i, buf in enumerate(self._buffers):
+            grown = np.zeros(capacity, dtype=buf.dtype)
+            grown[:self._n] = buf[:self._n]
+            self._buffers[i] = grown
+
+    def _invalidate_from(self, row):
+        """ Drop the formatted blocks from the one holding row to the end, rows after it moved """
+        first = row // BLOCK_ROWS
+        for key in [k for k in self._cache if k[0] >= first]:
+            del self._cache[key]
+        self._frame = None
+
+    def set_frame(self, df):
+        """ Replace the content of the model with a DataFrame """
+        self.beginResetModel()
+        self._load(df)
+        self.endResetModel()
+
+    def to_frame(self):
+        """
+        A copy of the content of the model as a DataFrame, writes to it do not reach the
+        model: changes go through set_frame, setData or insert_rows/remove_rows.
+        The frame is assembled only after edits, every call returns its own copy.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: self.column(i) for i, name in enumerate(self._names)}, columns=self._names)
+        return self._frame.copy()
+
+    def column(self, col):
+        """ Array of a column, without copy """
+        return self._buffers[col][:self._n]
 
     def rowCount(self, parent=None):
-        return len(self._data.values)
+        return self._n
 
     def columnCount(self, parent=None):
-        return self._data.columns.size
+        return len(self._buffers)
+
+    def insert_rows(self, row, count=1, values=None):
+        """
+        Insert count rows before row (row == rowCount() appends).
+        values is an optional (count, columns) array or DataFrame, the new rows are zero otherwise.
+        """
+        if count < 1 or not self._buffers:
+            return False
+        if isinstance(values, pd.DataFrame):
+            # Column by column, keeps the type of every column
+            values = [values.iloc[:, i].to_numpy() for i in range(values.shape[1])]
+        elif values is not None:
+            values = np.asarray(values).T
+        row = min(max(row, 0), self._n)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row + count - 1)
+        self._reserve(self._n + count)
+        for i, buf in enumerate(self._buffers):
+            # numpy handles the overlap of the shifted ranges
+            buf[row + count:self._n + count] = buf[row:self._n]
+            buf[row:row + count] = 0 if values is None else values[i]
+        self._n += count
+        self._invalidate_from(row)
+        self.endInsertRows()
+        return True
+
+    def remove_rows(self, rows):
+        """
+        Remove the rows at the given indices. Every run of consecutive rows is removed with
+        one move of the rows after it, starting from the end so the indices stay valid.
+        """
+        rows = np.unique(np.asarray(rows, dtype=int))
+        rows = rows[(rows >= 0) & (rows < self._n)]
+        if rows.size == 0:
+            return False
+        breaks = np.flatnonzero(np.diff(rows) > 1)
+        firsts = np.append(rows[0], rows[breaks + 1])
+        lasts = np.append(rows[breaks], rows[-1])
+        for first, last in zip(firsts[::-1], lasts[::-1]):
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            count = last - first + 1
+            for buf in self._buffers:
+                buf[first:self._n - count] = buf[last + 1:self._n]
+            self._n -= count
+            self._invalidate_from(first)
+            self.endRemoveRows()
+        return True
+
+    def set_values(self, rows, col, values):
+        """ Set the cells of a column at the given rows, one dataChanged for their span """
+        rows = np.asarray(rows, dtype=int)
+        if rows.size == 0:
+            return
+        self.column(col)[rows] = values
+        for block in np.unique(rows // BLOCK_ROWS):
+            self._cache.pop((block, col), None)
+        self._frame = None
+        self.dataChanged.emit(self.index(int(rows.min()), col), self.index(int(rows.max()), col))
+
+    def permute_rows(self, order):
+        """
+        Reorder the rows, row i takes the content of row order[i] (e.g. an argsort).
+        Selections and other persistent indexes follow their rows.
+        """
+        order = np.asarray(order, dtype=int)
+        self.layoutAboutToBeChanged.emit()
+        for buf in self._buffers:
+            buf[:self._n] = buf[:self._n][order]
+        new_row = np.empty_like(order)
+        new_row[order] = np.arange(len(order))
+        old = self.persistentIndexList()
+        self.changePersistentIndexList(old, [self.index(int(new_row[i.row()]), i.column()) for i in old])
+        self._cache.clear()
+        self._frame = None
+        self.layoutChanged.emit()
+
+    def insertRows(self, row, count, parent=QtCore.QModelIndex()):
+        return self.insert_rows(row, count)
+
+    def removeRows(self, row, count, parent=QtCore.QModelIndex()):
+        return self.remove_rows(np.arange(row, row + count))
+
+    def _block(self, block, col):
+        key = (block, col)
+        strings = self._cache.get(key)
+        if strings is None:
+            values = self.column(col)[block * BLOCK_ROWS:(block + 1) * BLOCK_ROWS]
+            if self.decimals is not None and values.dtype.kind == 'f':
+                values = values.round(self.decimals)
+            strings = values.astype(str)
+            self._cache[key] = strings
+            if len(self._cache) > MAX_BLOCKS:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return strings
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if index.isValid():
             if role == QtCore.Qt.DisplayRole:
-                return str(self._data.iloc[index.row()][index.column()])
+                row = index.row()
+                return str(self._block(row // BLOCK_ROWS, index.column())[row % BLOCK_ROWS])
         return None
 
-    def headerData(self, col, orientation, role):
-        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
-            return self._data.columns[col]
-        return None
\ No newline at end of file
+    def headerData(self, col, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole:
+            return str(self._names[col]) if orientation == QtCore.Qt.Horizontal else str(col)
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        """ Edits from the view, recorded on undo_stack when the model has one """
+        if role == QtCore.Qt.EditRole and index.isValid():
+            column = self.column(index.column())
+            try:
+                # Convert the value to the type of the column
+                if column.dtype.kind == 'f':
+                    value = float(value)
+                elif column.dtype.kind in 'iu':
+                    value = int(value)
+            except ValueError:
+                return False  # Prevent setting an invalid dtype
+            if self.undo_stack is not None:
+                self.undo_stack.push(SetValuesCommand(self, [index.row()], index.column(), [value]))
+            else:
+                self.set_values([index.row()], index.column(), [value])
+            return True
+        return False
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if self.editable:
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
@@ -21,29 +21,43 @@ from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QMainWindow, QApplication, QComboBox, QDialog, QDialogButtonBox, QFrame, QGroupBox, QHBoxLayout,
                              QLabel, QListWidget, QListView, QPushButton, QRadioButton, QSplitter, QStackedLayout,
-                             QVBoxLayout, QWidget, QTreeWidget, QTreeWidgetItem)
+                             QVBoxLayout, QWidget, QTreeWidget, QTreeWidgetItem, QFileDialog, QMessageBox)
 
 from GUIPanels.InitialConditionsGUI import ICPanel
 from GUIPanels.emptyGUI import EmptyPanel
 from GUIPanels.ExtractFromRaster import ExtractRaster
+from GUIPanels.GridGUI import GridPanel
+from GUIPanels.NonErodibleGUI import NEPanel
+from GUIPanels.ParametersGUI import ParamsPanel
+from GUIPanels.RunsGUI import RunPanel
+from GUIPanels.ScenariosGUI import ScenarioPanel
 from GUIPanels.about_dialog import AboutDialog
+from Processing.params import compiled_schema
+from Processing.project import PROJECT_SUFFIX, Project
 
 
 class MainPanel(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.profile_gui = ICPanel('Input: Profile')
-        self.stormgui = ICPanel('Input: Storm')
-        self.water_level_gui = ICPanel('Input: Water Elevation')
+        self.stormgui = ICPanel('Input: Storm', lod=True)
+        self.water_level_gui = ICPanel('Input: Water Elevation', lod=True)
 
-        self.grid_panel = EmptyPanel('Domain: Grid')
-        self.ne_panel = EmptyPanel('Domain: Non-erodible layer')
-        self.params_panel = EmptyPanel('Setup: Parameters')
-        self.outputs_panel = EmptyPanel('Output configuration')
+        self.grid_panel = GridPanel('Domain: Grid', self.profile_gui)
+        # The output settings are a page of their own, both pages edit one parameter set
+        self.params_panel = ParamsPanel('Setup: Parameters',
+                                        [s for s in compiled_schema().sections if s != 'Output'])
+        self.outputs_panel = ParamsPanel('Output configuration', ['Output'], shared=self.params_panel)
 
         self.analyse_panel = EmptyPanel('Model results: Analyse')
+        self.runs_panel = RunPanel('Model results: Runs')
 
         self.raster_gui = ExtractRaster()
+        self.ne_panel = NEPanel('Domain: Non-erodible layer', self.grid_panel, self.raster_gui)
+        self.raster_gui.profile_ready.connect(self.profile_gui.set_data)
+        self.scenario_panel = ScenarioPanel('Setup: Scenarios', self.params_panel, self.grid_panel,
+                                            {'profiles': self.profile_gui, 'storms': self.stormgui,
+                                             'water_levels': self.water_level_gui})
 
         self.stackLayout = QStackedLayout()
         self.stackLayout.addWidget(self.profile_gui) # -- id 1
@@ -57,16 +71,36 @@ class MainPanel(QWidget):
         self.stackLayout.addWidget(self.analyse_panel) # -- id 8
 
         self.stackLayout.addWidget(self.raster_gui) # -- id 9
+        self.stackLayout.addWidget(self.scenario_panel) # -- id 10
+        self.stackLayout.addWidget(self.runs_panel) # -- id 11
         self.setLayout(self.stackLayout)
 
         self.stackLayout.currentChanged.connect(parent.autoResize)
 
+        # Panels saved in a project file, by part name
+        self.project_panels = {'profile': self.profile_gui, 'storm': self.stormgui,
+                               'water_level': self.water_level_gui, 'grid': self.grid_panel,
+                               'non_erodible': self.ne_panel, 'parameters': self.params_panel,
+                               'scenarios': self.scenario_panel, 'runs': self.runs_panel,
+                               'raster': self.raster_gui}
+        # Parts read by the panel of a part, loaded before it
+        self.part_dependencies = {'grid': ['profile'], 'non_erodible': ['grid'],
+                                  'scenarios': ['parameters', 'grid', 'profile', 'storm', 'water_level']}
+        # Pages editing the part of another panel, as (part name, page)
+        self.shared_pages = [('parameters', self.outputs_panel)]
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("XBeach-G GUI [unofficial]")
 
         self.panel = MainPanel(self)
+        self.project = None
+        # Parts of the open project not loaded in their panel yet, loaded when the panel is shown
+        self._unloaded_parts = set()
+        self.panel.stackLayout.currentChanged.connect(self.load_panel_part)
+        # A profile sent from the raster panel replaces the one of the project
+        self.panel.raster_gui.profile_ready.connect(lambda *args: self._unloaded_parts.discard('profile'))
         self.menu = self.menuBar()
         self.main_widget = QWidget(self)
 
@@ -77,10 +111,10 @@ class MainWindow(QMainWindow):
         pages = {'Model Setup': {
                     'Inputs':['Profile_1', 'Storm_2', 'Water level_3'],
                     'Domain': ['Grid_4', 'Non-erodible layer_5'],
-                    'Setup': ['Model parameters_6'],
+                    'Setup': ['Model parameters_6', 'Scenarios_10'],
                     'Output': ['Output configuration_7'],
                     },
-                  'Model Results':['Analyse_8'],
+                  'Model Results':['Runs_11', 'Analyse_8'],
                   'Extra tools':['Extract from raster_9']
                 }
         
@@ -179,6 +213,79 @@ class MainWindow(QMainWindow):
         elif name == 'About':
             dlg = AboutDialog()
             dlg.exec_()
+        elif name == 'Create project':
+            self.create_project()
+        elif name == 'Open project':
+            self.open_project()
+        elif name == 'Save project':
+            self.save_project()
+        elif name == 'Save project as':
+            self.save_project(save_as=True)
+
+    def _set_project(self, project):
+        self.project = project
+        self._unloaded_parts = set(project.parts)
+        for panel in self.panel.project_panels.values():
+            panel.set_project_data()
+        self.setWindowTitle(f"XBeach-G GUI [unofficial] - {project.path.name}")
+        self.load_panel_part(self.panel.stackLayout.currentIndex())
+
+    def create_project(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Create project", "", f"xb-gui project (*{PROJECT_SUFFIX})")
+        if file_path:
+            if not file_path.endswith(PROJECT_SUFFIX):
+                file_path += PROJECT_SUFFIX
+            project = Project(file_path)
+            project.save()
+            self._set_project(project)
+
+    def open_project(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open project", "", f"xb-gui project (*{PROJECT_SUFFIX})")
+        if file_path:
+            try:
+                project = Project.open(file_path)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Could not open the project.\n{e}")
+                return
+            self._set_project(project)
+
+    def load_panel_part(self, index):
+        """ Load the project data of a panel the first time it is shown """
+        widget = self.panel.stackLayout.widget(index)
+        for name, panel in list(self.panel.project_panels.items()) + self.panel.shared_pages:
+            if panel is widget:
+                self.load_part(name)
+
+    def load_part(self, name):
+        """ Load a part of the project in its panel, after the parts the panel reads """
+        if name not in self._unloaded_parts:
+            return
+        self._unloaded_parts.discard(name)
+        for dependency in self.panel.part_dependencies.get(name, []):
+            self.load_part(dependency)
+        self.panel.project_panels[name].set_project_data(*self.project.read_part(name))
+
+    def save_project(self, save_as=False):
+        if self.project is None or save_as:
+            file_path, _ = QFileDialog.getSaveFileName(self, "Save project as", "", f"xb-gui project (*{PROJECT_SUFFIX})")
+            if not file_path:
+                return
+            if not file_path.endswith(PROJECT_SUFFIX):
+                file_path += PROJECT_SUFFIX
+            if self.project is None:
+                self.project = Project()
+        else:
+            file_path = None
+        try:
+            # Panels never shown keep the part already in the file
+            for name, panel in self.panel.project_panels.items():
+                if name not in self._unloaded_parts:
+                    self.project.set_part(name, *panel.project_data())
+            self.project.save(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not save the project.\n{e}")
+            return
+        self.setWindowTitle(f"XBeach-G GUI [unofficial] - {self.project.path.name}")
 
 if __name__ == '__main__':
     from pathlib import Path
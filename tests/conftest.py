@@ -0,0 +1,26 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Widgets are built without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# The packages of the GUI are imported from the repository root
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,36 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+from Processing.batch_extract import read_lines
+
+
+def test_vertex_rows_group_consecutive_labels(tmp_path):
+    path = tmp_path / 'lines.csv'
+    path.write_text("label,x,y\nA,0,0\nA,1,0\nB,0,1\nB,1,1\nA,5,5\nA,6,5\n")
+    lines = read_lines(path)
+    assert [label for label, _ in lines] == ['A', 'B', 'A']
+    np.testing.assert_array_equal(lines[2][1], [[5, 5], [6, 5]])
+
+
+def test_segment_rows(tmp_path):
+    path = tmp_path / 'lines.csv'
+    path.write_text("x0,y0,x1,y1\n0,0,1,1\n2,2,3,3\n")
+    lines = read_lines(path)
+    assert [label for label, _ in lines] == ['P1', 'P2']
+    assert lines[1][1].shape == (2, 2)
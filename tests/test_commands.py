@@ -0,0 +1,59 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from PyQt5.QtWidgets import QUndoStack
+
+from TableModels.Commands import InsertRowsCommand, PermuteRowsCommand, RemoveRowsCommand, SetValuesCommand
+from TableModels.Models import PandasModel
+
+
+@pytest.fixture
+def model():
+    model = PandasModel(pd.DataFrame({'x': np.arange(10.0), 'z': np.arange(10.0) ** 2}))
+    model.undo_stack = QUndoStack()
+    return model
+
+
+def _undo_redo(model, command):
+    before = model.to_frame()
+    model.undo_stack.push(command)
+    after = model.to_frame()
+    model.undo_stack.undo()
+    pd.testing.assert_frame_equal(model.to_frame(), before)
+    model.undo_stack.redo()
+    pd.testing.assert_frame_equal(model.to_frame(), after)
+    return after
+
+
+def test_set_values(model):
+    after = _undo_redo(model, SetValuesCommand(model, [2, 5, 2], 1, [-1.0, -2.0, -3.0]))
+    assert list(after['z'][[2, 5]]) == [-3.0, -2.0]
+
+
+def test_insert_and_remove_rows(model):
+    after = _undo_redo(model, InsertRowsCommand(model, 3, 2, pd.DataFrame({'x': [2.5, 2.7], 'z': [0.0, 0.0]})))
+    assert list(after['x'][2:6]) == [2.0, 2.5, 2.7, 3.0]
+    after = _undo_redo(model, RemoveRowsCommand(model, [0, 4, 5, 6, 11]))
+    assert len(after) == 7 and 0.0 not in list(after['x'])
+
+
+def test_permute_rows(model):
+    order = np.random.default_rng(0).permutation(10)
+    after = _undo_redo(model, PermuteRowsCommand(model, order))
+    np.testing.assert_array_equal(after['x'], np.arange(10.0)[order])
@@ -0,0 +1,52 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from Processing.grid import MAX_CELLS, build_grid, limit_growth
+
+
+def test_uniform_grid_ignores_the_dry_part():
+    x, z, dx, _ = build_grid([0, 2000], [-20, 5], 0.02, 5, 'Uniform')
+    assert len(dx) == 400
+    assert np.allclose(dx, 5)
+
+
+def test_depth_grid_is_finer_on_land():
+    x, z, dx, chainage = build_grid([0, 100], [-10, 2], 0.1, 2, 'Depth', 1.0, max_ratio=1.1)
+    assert x[0] == 0 and np.isclose(x[-1], 100)
+    assert np.all(dx > 0)
+    assert dx[0] > dx[-1]
+    assert np.all(dx[1:] / dx[:-1] < 1.1 + 0.01)
+
+
+def test_profile_starting_on_land_is_reversed():
+    _, z, _, chainage = build_grid([0, 100], [3, -10], 0.5, 2, 'Depth', 1.0)
+    assert z[0] < z[-1]
+    assert chainage[0] == 100 and chainage[-1] == 0
+
+
+def test_too_many_cells():
+    with pytest.raises(ValueError, match=str(MAX_CELLS)):
+        build_grid([0, 1e6], [-20, 5], 0.001, 10, 'Depth', 1.0)
+
+
+def test_limit_growth():
+    s = np.arange(10.0)
+    dx = limit_growth(s, np.array([1, 1, 1, 9, 9, 9, 9, 9, 1, 1.0]), 1.5)
+    assert np.all(np.abs(np.diff(dx)) <= 0.5 + 1e-12)
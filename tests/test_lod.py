@@ -0,0 +1,64 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import numpy as np
+import pytest
+
+from Processing.lod import SeriesPyramid
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(1)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 5000))
+    y = np.sin(x / 50) + rng.normal(0, 0.2, len(x))
+    y[rng.integers(0, len(x), 100)] = np.nan
+    return x, y
+
+
+def test_stats_match_brute_force(series):
+    x, y = series
+    pyramid = SeriesPyramid(x, y)
+    dt = np.append(np.diff(x), 0)
+    rng = np.random.default_rng(2)
+    for x0, x1 in np.sort(rng.uniform(x[0] - 10, x[-1] + 10, (30, 2)), axis=1):
+        inside = (x >= x0) & (x <= x1)
+        values = y[inside]
+        stats = pyramid.stats(x0, x1, threshold=0.5)
+        assert stats['samples'] == inside.sum()
+        if np.isnan(values).all():
+            assert np.isnan(stats['peak'])
+            continue
+        assert stats['peak'] == np.nanmax(values)
+        assert stats['min'] == np.nanmin(values)
+        assert stats['mean'] == pytest.approx(np.nanmean(values))
+        assert stats['duration_above'] == pytest.approx(dt[inside][values >= 0.5].sum())
+
+
+def test_query_keeps_the_peaks(series):
+    x, y = series
+    pyramid = SeriesPyramid(x, y)
+    qx, qy = pyramid.query(x[0], x[-1], 200)
+    assert len(qx) <= 400 and np.all(np.diff(qx) >= 0)
+    assert np.nanmax(qy) == np.nanmax(y) and np.nanmin(qy) == np.nanmin(y)
+    # Few samples in the view come back as they are, with one sample beyond each edge
+    qx, qy = pyramid.query(x[100], x[150], 200)
+    np.testing.assert_array_equal(qx, x[99:152])
+
+
+def test_needs_increasing_x():
+    with pytest.raises(ValueError):
+        SeriesPyramid([0.0, 2.0, 1.0], [1.0, 2.0, 3.0])
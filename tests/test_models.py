@@ -0,0 +1,64 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pandas as pd
+
+from Processing.point_index import PointIndex
+from TableModels.Models import PandasModel
+
+
+def test_frame_is_a_copy_written_back_with_set_frame():
+    model = PandasModel(pd.DataFrame({'x': [0.0, 1.0, 2.0], 'z': [1.0, 2.0, 3.0]}))
+    df = model.to_frame()
+    df.loc[1, 'z'] = 10.0
+    np.testing.assert_array_equal(model.column(1), [1.0, 2.0, 3.0])
+    model.set_frame(df)
+    np.testing.assert_array_equal(model.column(1), [1.0, 10.0, 3.0])
+    assert model.to_frame().loc[1, 'z'] == 10.0
+
+
+def test_writes_to_panel_frame_do_not_reach_saved_data():
+    from PyQt5.QtWidgets import QApplication
+    from GUIPanels.InitialConditionsGUI import ICPanel
+    app = QApplication.instance() or QApplication([])
+    panel = ICPanel('Profile')
+    panel.df = pd.DataFrame({'x': [0.0, 1.0, 2.0], 'z': [1.0, 2.0, 3.0]})
+    df = panel.df
+    df.loc[1, 'z'] = 99.0
+    assert panel.get_data().loc[1, 'z'] == 2.0
+    assert panel.model.column(1)[1] == 2.0
+
+
+def test_panel_converts_text_columns_once_and_follows_edits():
+    from PyQt5.QtWidgets import QApplication
+    from GUIPanels.InitialConditionsGUI import ICPanel, numeric_column
+    app = QApplication.instance() or QApplication([])
+    panel = ICPanel('Water level')
+    times = pd.date_range('2020-01-01', periods=300, freq='min').astype(str).to_numpy(dtype=object)
+    panel.df = pd.DataFrame({'time': times, 'wl': np.linspace(0, 1, 300)})
+    x = panel.numeric(0)
+    assert panel.numeric(0) is x
+    panel._pick_index = PointIndex(panel.numeric(0), panel.numeric(1))
+    assert x[1] - x[0] == 60
+    panel.model.insert_rows(10, 2, pd.DataFrame({'time': ['2020-01-01 00:09:20', '2020-01-01 00:09:40'],
+                                                 'wl': [5.0, 6.0]}))
+    panel.model.remove_rows([0, 1, 2])
+    panel.model.set_values([4], 0, ['2020-01-01 00:07:30'])
+    np.testing.assert_array_equal(panel.numeric(0), numeric_column(panel.model.column(0)))
+    assert panel._pick_index is not None
+    np.testing.assert_array_equal(panel._pick_index.box, PointIndex(panel.numeric(0), panel.numeric(1)).box)
@@ -0,0 +1,46 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from Processing.nonerodible import NE_FILE, batch_ne_layers
+from Processing.xbeach_export import export_profiles
+
+
+def _raster(path, function):
+    rows, cols = np.mgrid[0:200, 0:300]
+    z = function(1000 + 2 * cols + 1, 5000 - 2 * rows - 1)
+    with rasterio.open(path, 'w', driver='GTiff', width=300, height=200, count=1, dtype='float64',
+                       crs='EPSG:32630', transform=from_origin(1000, 5000, 2, 2)) as dst:
+        dst.write(z, 1)
+    return path
+
+
+def test_lines_with_the_same_label_keep_their_geometry(tmp_path):
+    bed = _raster(tmp_path / 'bed.tif', lambda x, y: np.full(np.shape(x), 5.0))
+    bedrock = _raster(tmp_path / 'bedrock.tif', lambda x, y: 0.002 * (x - 1000))
+    lines = [('P', np.array([[1101.0, 4950.0], [1101.0, 4700.0]])),
+             ('Q', np.array([[1301.0, 4950.0], [1301.0, 4700.0]])),
+             ('P', np.array([[1501.0, 4950.0], [1501.0, 4700.0]]))]
+    with rasterio.open(bed) as src:
+        export_profiles(src, lines, tmp_path / 'out', point_interval_max=5)
+    assert batch_ne_layers(tmp_path / 'out', raster=bedrock, lines=lines) == 3
+    for directory, x in (('P', 1101.0), ('Q', 1301.0), ('P_2', 1501.0)):
+        thickness = np.loadtxt(tmp_path / 'out' / directory / NE_FILE)
+        np.testing.assert_allclose(thickness, 5.0 - 0.002 * (x - 1000), atol=1e-6)
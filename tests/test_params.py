@@ -0,0 +1,100 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from Processing.params import (active_frame, compiled_schema, diff_params, format_frame, format_params, parse_params,
+                               validate_frame, validate_params)
+
+
+def _issues(issues):
+    return sorted((issue.name, issue.message, issue.severity) for issue in issues)
+
+
+def test_parse_format_round_trip():
+    params = compiled_schema().defaults()
+    params.update({'D50': 0.02, 'D90': 0.03, 'nglobalvar': ['zb', 'zs'], 'npoints': ['10 0', '20 0'],
+                   'custom': 'kept as text'})
+    assert parse_params(format_params(params)) == params
+
+
+def test_comments_start_at_a_line_or_after_a_space():
+    params = parse_params("%%% header %%%\n# comment\nbcfile = my#file.txt % the waves\nD50 = 0.02#no space\n"
+                          "tstop = 100 # seconds\n")
+    assert params == {'bcfile': 'my#file.txt', 'D50': '0.02#no space', 'tstop': 100.0}
+
+
+def test_validate_params():
+    assert validate_params(compiled_schema().defaults()) == []
+    issues = _issues(validate_params({'CFL': 2.0, 'D50': 0.02, 'D90': 0.01, 'front': 'sea', 'gwflow': 0, 'kx': 0.1}))
+    assert [name for name, _, severity in issues if severity == 'error'] == ['CFL', 'D90', 'front']
+    assert ('kx', 'Ignored unless gwflow is 1', 'warning') in issues
+
+
+def test_validate_frame_agrees_with_validate_params():
+    base = compiled_schema().defaults()
+    variants = pd.DataFrame({'CFL': [0.5, 2.0, 0.7, 0.7], 'D90': [0.02, 0.02, 0.005, 0.02],
+                             'wbctype': ['jonstable', 'off', 'parametric', 'bad']})
+    issues = validate_frame(variants, base)
+    for label, row in variants.iterrows():
+        params = {**base, **row.to_dict()}
+        expected = _issues(validate_params(params))
+        found = sorted(issues[issues['variant'] == label][['name', 'message', 'severity']].itertuples(index=False,
+                                                                                                    name=None))
+        assert found == expected
+
+
+def test_format_frame_matches_format_params():
+    base = compiled_schema().defaults()
+    variants = pd.DataFrame({'D50': [0.005, 0.01], 'morfac': [1.0, None], 'nglobalvar': [['zb'], ['zb', 'u']]})
+    texts = format_frame(variants, {k: v for k, v in base.items() if k not in variants})
+    for text, (_, row) in zip(texts, variants.iterrows()):
+        # A missing value leaves the parameter out
+        params = {**base, **{k: v for k, v in row.items() if k != 'morfac' or v == v}}
+        if row['morfac'] != row['morfac']:
+            params.pop('morfac')
+        assert text == format_params(params)
+
+
+def test_active_frame():
+    variants = pd.DataFrame({'gwflow': [0, 1]})
+    variants, base = active_frame(variants, {'kx': 0.05, 'D50': 0.01, 'struct': 0, 'ne_layer': 'nebed.dep'})
+    assert list(variants['kx']) == [None, 0.05]
+    assert base == {'D50': 0.01, 'struct': 0}
+
+
+def test_diff_params():
+    old = {'D50': 0.01, 'tstop': 3600.0, 'front': 'abs_1d', 'nglobalvar': ['zb', 'zs']}
+    new = {'D50': 0.01 * (1 + 1e-12), 'tstop': 7200.0, 'nglobalvar': ['zb', 'u'], 'morfac': 5.0}
+    assert diff_params(old, new) == {'added': {'morfac': 5.0}, 'removed': {'front': 'abs_1d'},
+                                     'changed': {'tstop': (3600.0, 7200.0), 'nglobalvar': (['zs'], ['u'])}}
+
+
+def test_ten_thousand_variants_in_seconds():
+    rng = np.random.default_rng(0)
+    n = 10_000
+    variants = pd.DataFrame({'D50': rng.uniform(0.001, 0.01, n), 'CFL': rng.uniform(0.3, 0.9, n),
+                             'morfac': rng.integers(1, 10, n).astype(float)})
+    base = {k: v for k, v in compiled_schema().defaults().items() if k not in variants}
+    start = time.perf_counter()
+    issues = validate_frame(variants, base)
+    texts = format_frame(variants, base)
+    assert time.perf_counter() - start < 5
+    assert len(texts) == n and (issues['severity'] == 'error').sum() == 0
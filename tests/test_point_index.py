@@ -0,0 +1,51 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+from Processing.point_index import PointIndex
+
+
+def _brute_force(x, y, cx, cy, sx, sy):
+    return int(np.nanargmin(((x - cx) / sx)**2 + ((y - cy) / sy)**2))
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 100, 1000), rng.uniform(-5, 5, 1000)
+    index = PointIndex(x, y)
+    for cx, cy in rng.uniform((0, -5), (100, 5), (50, 2)):
+        assert index.nearest(cx, cy, 0.1, 0.01) == _brute_force(x, y, cx, cy, 0.1, 0.01)
+
+
+def test_splice_matches_a_rebuilt_index():
+    x = np.arange(500.0)
+    y = np.sin(x / 10)
+    index = PointIndex(x, y)
+    # Insert, remove and move rows, x stays increasing
+    assert index.splice(100, 100, [99.2, 99.6], [3.0, -3.0])
+    x, y = np.insert(x, 100, [99.2, 99.6]), np.insert(y, 100, [3.0, -3.0])
+    assert index.splice(10, 80, [], [])
+    x, y = np.delete(x, np.s_[10:80]), np.delete(y, np.s_[10:80])
+    assert index.splice(5, 6, [5.5], [2.0])
+    x[5], y[5] = 5.5, 2.0
+    rebuilt = PointIndex(x, y)
+    np.testing.assert_array_equal(index.box, rebuilt.box)
+    for cx, cy in ((99.5, 2.9), (5.4, 1.5), (300.0, 0.0)):
+        assert index.nearest(cx, cy, 0.1, 0.1) == _brute_force(x, y, cx, cy, 0.1, 0.1)
+    # A point out of order needs a new index
+    assert not index.splice(20, 21, [1000.0], [0.0])
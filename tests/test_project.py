@@ -0,0 +1,68 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Processing.project import Project, arrays_table, table_arrays
+
+
+def test_table_round_trip(tmp_path):
+    df = pd.DataFrame({'Time': [0.0, 3600.0, 7200.0], 'Hs': [1.5, 2.0, np.nan],
+                       'Date': ['2024-01-01 00:00', None, '2024-01-01 02:00']})
+    project = Project(tmp_path / 'p.xbgp')
+    project.set_part('storm', *table_arrays(df))
+    project.save()
+
+    arrays, meta = Project.open(tmp_path / 'p.xbgp').read_part('storm')
+    table = arrays_table(arrays, meta)
+    assert list(table.columns) == ['Time', 'Hs', 'Date']
+    assert np.allclose(table['Time'], df['Time'])
+    assert np.isnan(table['Hs'][2])
+    assert list(table['Date']) == ['2024-01-01 00:00', '', '2024-01-01 02:00']
+
+
+def test_unchanged_part_is_not_rewritten(tmp_path):
+    project = Project(tmp_path / 'p.xbgp')
+    meta = {'profiles': [('a', 'a.csv')], 'sample': 0}
+    project.set_part('scenarios', {'x': np.arange(3.0)}, meta)
+    project.save()
+    project = Project.open(tmp_path / 'p.xbgp')
+    assert not project.set_part('scenarios', {'x': np.arange(3.0)}, meta)
+    assert project.set_part('scenarios', {'x': np.arange(4.0)}, meta)
+
+
+def test_object_arrays_are_rejected():
+    with pytest.raises(ValueError):
+        Project().set_part('lines', {'labels': np.array(['a', None], dtype=object)})
+
+
+def test_save_after_the_file_was_deleted(tmp_path):
+    project = Project(tmp_path / 'p.xbgp')
+    project.set_part('profile', {'x': np.arange(3.0)})
+    project.set_part('storm', {'t': np.arange(2.0)})
+    project.save()
+    project = Project.open(tmp_path / 'p.xbgp')
+    (tmp_path / 'p.xbgp').unlink()
+    project.set_part('storm', {'t': np.arange(5.0)})
+    with pytest.raises(FileNotFoundError, match='profile'):
+        project.save(tmp_path / 'copy.xbgp')
+    # With every part staged again nothing is needed from the old file
+    project.set_part('profile', {'x': np.arange(4.0)})
+    project.save(tmp_path / 'copy.xbgp')
+    assert len(Project.open(tmp_path / 'copy.xbgp').read_part('profile')[0]['x']) == 4
@@ -0,0 +1,105 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import subprocess
+import sys
+import time
+
+from Processing.runs import RunManager, RunQueue, log_progress
+
+STUB = "import sys; print('50.0% done', flush=True); sys.exit(1 if sys.argv[1].endswith('bad') else 0)"
+
+
+def _command(script):
+    return f'"{sys.executable}" -c "{script}" {{dir}}'
+
+
+def test_queue_runs_every_folder(tmp_path):
+    folders = [tmp_path / name for name in ('a', 'b', 'bad')]
+    for folder in folders:
+        folder.mkdir()
+    queue = RunQueue(tmp_path / 'queue.json')
+    queue.add(folders)
+    manager = RunManager(queue, _command(STUB), max_cores=2)
+    counts = manager.run_all(interval=0.05)
+    assert counts['done'] == 2 and counts['failed'] == 1
+    assert log_progress(folders[0]) == 50.0
+    queue.close()
+
+    # The saved queue has the results, and nothing to run again
+    queue = RunQueue(tmp_path / 'queue.json')
+    assert queue.counts()['done'] == 2
+    queue.close()
+
+
+def test_stop_queues_the_running_jobs_again(tmp_path):
+    queue = RunQueue(tmp_path / 'queue.json')
+    queue.add([tmp_path])
+    manager = RunManager(queue, _command('import time; time.sleep(30)'))
+    manager.start()
+    manager.poll()
+    assert queue.counts()['running'] == 1
+    start = time.monotonic()
+    manager.stop()
+    assert time.monotonic() - start < 5
+    assert queue.counts()['queued'] == 1
+    queue.close()
+
+
+def test_second_instance_is_read_only(tmp_path):
+    queue = RunQueue(tmp_path / 'queue.json')
+    # The lock of a live process, e.g. another GUI
+    queue.lock_path.write_text('1')
+    other = RunQueue(tmp_path / 'queue.json')
+    assert other.read_only and other.owner == 1
+    assert RunManager(other).poll() == set()
+
+
+def test_panel_polls_runs_left_by_an_earlier_session(tmp_path):
+    from PyQt5.QtWidgets import QApplication
+    from GUIPanels.RunsGUI import RunPanel
+    app = QApplication.instance() or QApplication([])
+    run = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    queue = RunQueue(tmp_path / 'queue.json')
+    job = queue.add([tmp_path])[0]
+    job.update(status='running', pid=run.pid, started=time.time())
+    queue.save()
+    queue.close()
+
+    panel = RunPanel('Runs', RunManager(RunQueue(tmp_path / 'queue.json'), _command(STUB)))
+    assert panel._poll_timer.isActive()
+    run.kill()
+    run.wait()
+    panel.poll()
+    assert panel.manager.queue.jobs[0]['status'] == 'failed'
+    assert not panel._poll_timer.isActive()
+    panel.manager.queue.close()
+
+
+def test_follower_keeps_the_log_of_the_selected_run(tmp_path):
+    from PyQt5.QtWidgets import QApplication
+    from GUIPanels.RunsGUI import RunPanel
+    app = QApplication.instance() or QApplication([])
+    queue = RunQueue(tmp_path / 'queue.json')
+    queue.add([tmp_path])
+    queue.lock_path.write_text('1')
+    panel = RunPanel('Runs', RunManager(RunQueue(tmp_path / 'queue.json')))
+    panel.table.selectRow(0)
+    old = panel.log_job
+    panel.follow()
+    assert panel.log_job is panel.manager.queue.jobs[0] and panel.log_job is not old
+    queue.close()
@@ -0,0 +1,91 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from Processing import sampling
+from Processing.sampling import extract_profiles, sample_band, sample_raster
+
+NODATA = -9999.0
+
+
+def plane(x, y):
+    return 0.5 * x - 0.25 * y + 10
+
+
+@pytest.fixture
+def dem(tmp_path):
+    """ 300 x 200 pixels of 2 m on a plane, one nodata pixel at row 50, column 100 """
+    rows, cols = np.mgrid[0:200, 0:300]
+    z = plane(1000 + 2 * cols + 1, 5000 - 2 * rows - 1)
+    z[50, 100] = NODATA
+    path = tmp_path / 'dem.tif'
+    with rasterio.open(path, 'w', driver='GTiff', width=300, height=200, count=1, dtype='float64',
+                       crs='EPSG:32630', transform=from_origin(1000, 5000, 2, 2), nodata=NODATA) as dst:
+        dst.write(z, 1)
+    with rasterio.open(path) as src:
+        yield src
+
+
+def test_sample_band_on_a_plane():
+    rows, cols = np.mgrid[0:10, 0:10]
+    band = 3.0 * rows + 2.0 * cols
+    r = np.array([2.5, 4.75, 7.1])
+    c = np.array([3.5, 1.6, 7.4])
+    # Pixel centres on the half integers
+    expected = 3.0 * (r - 0.5) + 2.0 * (c - 0.5)
+    np.testing.assert_allclose(sample_band(band, r, c, 'bilinear'), expected)
+    np.testing.assert_allclose(sample_band(band, r, c, 'cubic'), expected)
+    np.testing.assert_array_equal(sample_band(band, r, c, 'nearest'), band[r.astype(int), c.astype(int)])
+    assert np.isnan(sample_band(band, [-0.1, 10.0], [5.0, 5.0], 'bilinear')).all()
+
+
+@pytest.mark.parametrize('method', ['bilinear', 'cubic'])
+def test_sample_raster_on_a_plane(dem, method):
+    x = np.linspace(1010, 1580, 50)
+    y = np.linspace(4990, 4610, 50)
+    np.testing.assert_allclose(sample_raster(dem, x, y, method), plane(x, y), atol=1e-9)
+
+
+def test_nodata_becomes_nan(dem):
+    # Centre of the nodata pixel and a sample that needs it for bilinear
+    x = np.array([1201.0, 1202.0, 1300.0])
+    y = np.array([4899.0, 4898.0, 4800.0])
+    assert np.isnan(sample_raster(dem, x[:1], y[:1], 'nearest')).all()
+    z = sample_raster(dem, x, y, 'bilinear')
+    assert np.isnan(z[:2]).all() and z[2] == pytest.approx(plane(1300.0, 4800.0))
+
+
+def test_long_lines_read_small_windows(dem, monkeypatch):
+    sides = []
+    read = sampling.read_window_float
+
+    def recording(src, window, **kwargs):
+        sides.append(max(window.width, window.height))
+        return read(src, window, **kwargs)
+    monkeypatch.setattr(sampling, 'read_window_float', recording)
+    monkeypatch.setattr(sampling, 'MAX_WINDOW_SIDE', 32)
+    lines = [('diagonal', np.array([[1005.0, 4995.0], [1595.0, 4605.0]])),
+             ('short', np.array([[1100.0, 4700.0], [1120.0, 4710.0]]))]
+    profiles = extract_profiles(dem, lines, point_interval_max=1, method='bilinear')
+    valid = ~np.isnan(profiles['z'])
+    assert valid.sum() > len(valid) - 5  # Only the samples around the nodata pixel
+    np.testing.assert_allclose(profiles['z'][valid], plane(profiles['x'], profiles['y'])[valid], atol=1e-9)
+    assert len(sides) > 2 and max(sides) <= 32 + 3
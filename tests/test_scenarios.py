@@ -0,0 +1,61 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pandas as pd
+
+from Processing.params import read_params
+from Processing.scenarios import INDEX_FILE, generate_scenarios, parse_sweep
+
+
+def _profile(offset=0.0):
+    x = np.linspace(0, 100, 21)
+    return pd.DataFrame({'Chainage': x, 'Elevation': -5 + 0.08 * x + offset})
+
+
+def test_every_combination_is_written(tmp_path):
+    summary = generate_scenarios(tmp_path, [('a', _profile()), ('b', _profile(0.5))],
+                                 sweep=parse_sweep('D50 = 0.005, 0.01\nmorfac = 1, 1'), workers=2, chunk_size=2)
+    index = pd.read_csv(tmp_path / INDEX_FILE, keep_default_na=False)
+    assert summary['runs'] == 8 and summary['unique_runs'] == 4
+    assert len(index) == 8
+    assert all((tmp_path / d / 'params.txt').exists() for d in index['directory'])
+
+
+def test_cancelled_index_has_only_written_runs(tmp_path):
+    # Enough chunks that the pool cannot have started all of them when the first one ends
+    d50 = ', '.join(f'{0.0001 * (i + 1):g}' for i in range(40))
+    summary = generate_scenarios(tmp_path, [('a', _profile())], sweep=parse_sweep(f'D50 = {d50}'),
+                                 workers=1, chunk_size=1, progress=lambda done, total: True)
+    index = pd.read_csv(tmp_path / INDEX_FILE, keep_default_na=False)
+    assert summary['cancelled']
+    assert 1 <= len(index) < 40 and len(index) == summary['written']
+    assert all((tmp_path / d / 'params.txt').exists() for d in index['directory'])
+
+
+def test_parameters_follow_the_swept_values_they_depend_on(tmp_path):
+    generate_scenarios(tmp_path, [('a', _profile())], sweep=parse_sweep('gwflow = 0, 1\nsedtrans = 0, 1'),
+                       base={'kx': 0.05, 'gw0': 0.2, 'morphology': 1, 'morfac': 5}, workers=1)
+    index = pd.read_csv(tmp_path / INDEX_FILE, keep_default_na=False)
+    for row in index.itertuples():
+        params = read_params(tmp_path / row.directory / 'params.txt')
+        assert ('kx' in params) == (row.gwflow == 1)
+        assert ('morfac' in params) == (row.sedtrans == 1)
+        if row.gwflow == 1:
+            assert params['kx'] == 0.05 and params['gw0'] == 0.2
+        if row.sedtrans == 1:
+            assert params['morfac'] == 5
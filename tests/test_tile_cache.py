@@ -0,0 +1,87 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import threading
+
+import numpy as np
+import pytest
+import xyzservices
+from PIL import Image
+
+from Processing.tile_cache import TileCache
+
+PROVIDER = xyzservices.TileProvider(name='Test', url='https://tiles.invalid/{z}/{x}/{y}.png', attribution='')
+
+
+def _png(seed):
+    rgb = np.random.default_rng(seed).integers(0, 255, (256, 256, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def local_dir(tmp_path):
+    for x in range(8):
+        path = tmp_path / 'local' / '3' / str(x) / '1.png'
+        path.parent.mkdir(parents=True)
+        path.write_bytes(_png(x))
+    return tmp_path / 'local'
+
+
+def _cache(tmp_path, local_dir, tiles):
+    size = len(_png(0))
+    return TileCache(tmp_path / 'cache', max_size_mb=tiles * size * 1.05 / 2**20, offline=True, local_dir=local_dir)
+
+
+def test_least_recently_used_tiles_are_evicted(tmp_path, local_dir):
+    cache = _cache(tmp_path, local_dir, tiles=2)
+    cache.get_tile(PROVIDER, 3, 0, 1)
+    cache.get_tile(PROVIDER, 3, 1, 1)
+    cache.get_tile(PROVIDER, 3, 0, 1)  # 0 is now used more recently than 1
+    cache.get_tile(PROVIDER, 3, 2, 1)
+    cached = sorted(int(p.parent.name) for p in (tmp_path / 'cache').rglob('*.tile'))
+    assert cached == [0, 2]
+    assert cache.hits == 1 and cache.misses == 3
+    assert cache.size == sum(p.stat().st_size for p in (tmp_path / 'cache').rglob('*.tile'))
+
+
+def test_offline_uses_cache_and_local_tiles_only(tmp_path, local_dir):
+    cache = _cache(tmp_path, local_dir, tiles=4)
+    tile = cache.get_tile(PROVIDER, 3, 5, 1)
+    assert tile.shape == (256, 256, 4)
+    assert cache.get_tile(PROVIDER, 3, 5, 2) is None  # Neither cached nor local, and no download
+    (local_dir / '3' / '5' / '1.png').unlink()
+    np.testing.assert_array_equal(cache.get_tile(PROVIDER, 3, 5, 1), tile)
+    assert cache.get_tile(PROVIDER, 3, 5, 1, gray=True).shape == (256, 256)
+
+
+def test_shared_by_threads(tmp_path, local_dir):
+    cache = _cache(tmp_path, local_dir, tiles=3)
+
+    def load(seed):
+        for x in np.random.default_rng(seed).integers(0, 8, 40):
+            assert cache.get_tile(PROVIDER, 3, int(x), 1, gray=bool(x % 2)) is not None
+    threads = [threading.Thread(target=load, args=(seed,)) for seed in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    on_disk = [p for p in (tmp_path / 'cache').rglob('*') if p.is_file()]
+    assert sorted(on_disk) == sorted(cache._index)
+    assert cache.size == sum(p.stat().st_size for p in on_disk) <= cache.max_bytes
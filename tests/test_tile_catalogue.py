@@ -0,0 +1,67 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from Processing import tile_catalogue
+from Processing.tile_catalogue import INDEX_NAME, TileCatalogue
+
+
+def plane(x, y):
+    return 2 * x + 3 * y
+
+
+def _write_tile(path, left, top, width, height, nodata=None):
+    rows, cols = np.mgrid[0:height, 0:width]
+    z = plane(left + cols + 0.5, top - rows - 0.5).astype('float32')
+    with rasterio.open(path, 'w', driver='GTiff', width=width, height=height, count=1, dtype='float32',
+                       crs='EPSG:32630', transform=from_origin(left, top, 1, 1), nodata=nodata) as dst:
+        dst.write(z, 1)
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    _write_tile(tmp_path / 'a.tif', 0, 20, 20, 20)
+    _write_tile(tmp_path / 'b.tif', 20, 20, 20, 20)
+    return tmp_path
+
+
+@pytest.mark.parametrize('method', ['bilinear', 'cubic'])
+def test_no_seam_at_tile_borders(tiles, method):
+    catalogue = TileCatalogue.scan(tiles)
+    x = np.linspace(2.5, 37.5, 141)
+    y = np.full_like(x, 10.3)
+    z = catalogue.sample_points(x, y, method=method, groups=np.zeros(len(x), dtype=int))
+    np.testing.assert_allclose(z, plane(x, y), rtol=0, atol=1e-6)
+
+
+def test_index_is_reused_and_optional(tiles, monkeypatch):
+    TileCatalogue.scan(tiles)
+    index = json.loads((tiles / INDEX_NAME).read_text())
+    assert [t['path'] for t in index['tiles']] == ['a.tif', 'b.tif']
+    _write_tile(tiles / 'c.tif', 40, 20, 20, 20)
+
+    def read_only(*args, **kwargs):
+        raise PermissionError('read-only')
+    monkeypatch.setattr(tile_catalogue.json, 'dump', read_only)
+    catalogue = TileCatalogue.scan(tiles)
+    assert len(catalogue.tiles) == 3 and catalogue.width == 60
@@ -0,0 +1,49 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from Processing.transects import arc_length, resample_polyline, shore_normal_transects
+
+
+def test_resample_keeps_the_ends_once():
+    points = resample_polyline([[0, 0], [3.3, 0]], 3.3 / 3)
+    assert np.allclose(points[[0, -1]], [[0, 0], [3.3, 0]])
+    assert np.all(np.diff(arc_length(points)) > 0)
+
+
+@pytest.mark.parametrize('length', [1.0, 3.3, 7.7, 123.4])
+@pytest.mark.parametrize('n', [3, 7, 10])
+def test_transects_of_a_straight_shoreline(length, n):
+    labels, starts, ends, stations = shore_normal_transects([[0, 0], [length, 0]], length / n, 50, 20)
+    assert len(labels) == n + 1
+    assert np.all(np.isfinite(starts)) and np.all(np.isfinite(ends))
+    # The sea is on the left of the digitised direction, +y here
+    assert np.allclose(starts[:, 1], 50) and np.allclose(ends[:, 1], -20)
+    assert np.allclose(starts[:, 0], stations)
+
+
+def test_repeated_vertices_are_ignored():
+    labels, starts, ends, _ = shore_normal_transects([[0, 0], [0, 0], [10, 0], [10, 0]], 2, 5, 5, sea_side='right')
+    assert np.all(np.isfinite(starts))
+    assert np.allclose(starts[:, 1], -5)
+
+
+def test_shoreline_of_zero_length():
+    with pytest.raises(ValueError):
+        shore_normal_transects([[1, 1], [1, 1]], 1, 10, 10)
@@ -0,0 +1,46 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import numpy as np
+
+from Processing.transforms import TRANSFORMS, clamp, datum_shift, interpolate_gaps, offset, rezero, scale
+
+
+def test_transforms():
+    values = np.array([1.0, np.nan, 3.0, 5.0])
+    np.testing.assert_array_equal(offset(values, 2), [3.0, np.nan, 5.0, 7.0])
+    np.testing.assert_array_equal(scale(values, 2, origin=1), [1.0, np.nan, 5.0, 9.0])
+    np.testing.assert_array_equal(clamp(values, 4, 2), [2.0, np.nan, 3.0, 4.0])
+    np.testing.assert_array_equal(datum_shift(values, 0.5, 1.5), [0.0, np.nan, 2.0, 4.0])
+    np.testing.assert_array_equal(rezero(np.array([np.nan, 10.0, 12.5])), [np.nan, 0.0, 2.5])
+    np.testing.assert_array_equal(rezero(values, origin=1), [0.0, np.nan, 2.0, 4.0])
+
+
+def test_interpolate_gaps():
+    x = np.array([0.0, 1.0, 2.0, 4.0, 5.0])
+    values = np.array([np.nan, 1.0, np.nan, 5.0, np.nan])
+    np.testing.assert_allclose(interpolate_gaps(x, values), [1.0, 1.0, 1.0 + 4.0 / 3.0, 5.0, 5.0])
+    # Unsorted x
+    order = np.array([3, 0, 4, 1, 2])
+    np.testing.assert_allclose(interpolate_gaps(x[order], values[order]), interpolate_gaps(x, values)[order])
+    assert np.isnan(interpolate_gaps(x, np.full(5, np.nan))).all()
+
+
+def test_every_transform_of_the_ui():
+    x = np.arange(4.0)
+    values = np.array([1.0, np.nan, 3.0, 5.0])
+    for name, (labels, function) in TRANSFORMS.items():
+        assert function(x, values, 1.0, 2.0).shape == values.shape, name
@@ -0,0 +1,50 @@
+"""
+Copyright (C) 2025  Nikolaos Andreakos
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pandas as pd
+
+from Processing.xbeach_export import INDEX_COLUMNS, INDEX_FILE, ProfileSetWriter, profile_runs
+
+
+def _profiles(labels, line_id):
+    n = len(labels)
+    return {'label': np.array(labels, dtype=object), 'chainage': np.tile([0.0, 1.0, 2.0], n // 3),
+            'x': np.zeros(n), 'y': np.zeros(n), 'z': np.linspace(-5, 5, n), 'line_id': np.array(line_id)}
+
+
+def test_adjacent_lines_with_the_same_label_stay_apart():
+    profiles = _profiles(['P1'] * 6, [0, 0, 0, 1, 1, 1])
+    assert [(label, run.start, run.stop) for label, run in profile_runs(profiles)] == [('P1', 0, 3), ('P1', 3, 6)]
+
+
+def test_writer_gives_duplicate_labels_their_own_folder(tmp_path):
+    with ProfileSetWriter(tmp_path) as writer:
+        writer.write(_profiles(['P1'] * 6, [0, 0, 0, 1, 1, 1]))
+    assert writer.written == 2
+    for name in ('P1', 'P1_2'):
+        assert np.all(np.diff(np.loadtxt(tmp_path / name / 'x.grd')) > 0)
+
+
+def test_index_quotes_labels(tmp_path):
+    labels = ['Bay, north', 'Pier "A"']
+    with ProfileSetWriter(tmp_path) as writer:
+        writer.write(_profiles([labels[0]] * 3 + [labels[1]] * 3, [0, 0, 0, 1, 1, 1]))
+    index = pd.read_csv(tmp_path / INDEX_FILE)
+    assert list(index.columns) == list(INDEX_COLUMNS)
+    assert list(index['label']) == labels and list(index['nx']) == [3, 3]
+    assert all((tmp_path / name / 'bed.dep').exists() for name in index['directory'])